@@ -1,12 +1,15 @@
 import streamlit as st
-import json
-import pandas as pd
-from datetime import datetime
-from dateutil import parser
-from dateutil.parser import parse
-import re
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import os
+import time
+from startup import PROFILE, FirstPaint, LazyModule, cache_path
+from profiling import PROFILER, file_name
 os.environ["STREAMLIT_WATCH_DIRECTORIES"] = "false"
+rerun_started = time.perf_counter()
+# ?profile=1 runs this rerun under cProfile; with CMBS_PROFILE_THRESHOLD set,
+# reruns slower than that many seconds are stack-sampled from then on.
+profile_requested = st.query_params.get("profile", "0") not in ("", "0", "false")
+rerun_profile = PROFILER.begin(profile_requested)
 
 
 st.set_page_config(page_title="Loan Summary Table", layout="wide")
@@ -53,15 +56,166 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+TABLE_CSS = """
+<style>
+.custom-table-container {
+    overflow-x: auto;
+    margin-top: 20px;
+    margin-bottom: 40px;
+}
+.custom-table {
+    width: 100%;
+    border-collapse: collapse;
+    font-family: Arial, sans-serif;
+    font-size: 15px;
+}
+.custom-table th {
+    background-color: #1F3B57;
+    color: white;
+    padding: 12px;
+    text-align: center;
+    border: 1px solid #ddd;
+    font-weight: bold;
+}
+.custom-table td {
+    padding: 10px 12px;
+    border: 1px solid #ddd;
+    text-align: center;
+    vertical-align: middle;
+}
+.custom-table tr:nth-child(even) {
+    background-color: #f9f9f9;
+}
+.custom-table tr:hover {
+    background-color: #f1f1f1;
+}
+.custom-table td:first-child, .custom-table th:first-child {
+    text-align: left;
+}
+</style>
+"""
 
-
-
-
-with open("data/master_combined_loans.json", "r", encoding="utf-8") as f:
-    raw_data = json.load(f)
+# A combined JSON file or a directory of deal files (one JSON per deal or loan),
+# polled for adds, changes and removals.
+DATA_PATH = os.environ.get("CMBS_DATA_PATH", "data")
+POLL_SECONDS = float(os.environ.get("CMBS_POLL_SECONDS", "2"))
+
+# ------------------ First Paint ------------------
+
+# Until this process has rendered once, paint the last saved summary straight
+# away and load modules and data underneath it.
+@st.cache_resource(show_spinner=False)
+def get_first_paint(path):
+    return FirstPaint(cache_path(path, "first_paint.json"))
+
+first_paint = get_first_paint(DATA_PATH)
+first_paint_slot = st.empty()
+if not PROFILE.reached("rendered"):
+    snapshot = first_paint.load()
+    if snapshot:
+        with first_paint_slot.container():
+            st.title("📋 Loan Summary Table")
+            st.caption(f"Summary as of {time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot['saved_at']))}, loading the latest data...")
+            snapshot_cols = st.columns(len(snapshot["metrics"]))
+            for col, (label, value) in zip(snapshot_cols, snapshot["metrics"]):
+                col.metric(label, value)
+            st.markdown(TABLE_CSS, unsafe_allow_html=True)
+            st.markdown(snapshot["table_html"], unsafe_allow_html=True)
+        PROFILE.mark("first_paint")
+
+# Heavy modules load after the first paint; the first run times each import.
+with PROFILE.imports():
+    import json
+    import re
+    from datetime import datetime
+    import pandas as pd
+    from dateutil.parser import parse
+    from ingest import loan_property_type, property_type_category, to_date, to_state
+    from dataset import Dataset
+    from cache import SharedCache
+    from timing import TIMER, STAGES, configure_log
+    from monitoring import MetricsRegistry, LATENCY_BUCKETS, BYTE_BUCKETS, serve, write_file, cache_collector, dataset_collector, session_collector
+    from tables import TableStore
+    from portfolio import PortfolioStats, freeze_filters, sort_order, SORT_COLUMNS
+    from maturity import MaturityWall, GRANULARITIES, BREAKDOWNS
+    from stress import StressEngine, scenario_grid, DEFAULT_THRESHOLDS
+    from schedule import Schedules, annual_debt_service, loan_schedule
+    from exposure import rollover_by_year
+    from similar import LoanIndex
+    from search import load_search_index, index_path, path_label, leaf_value
+    from metrics import build_reported_metrics, build_metrics, METRICS
+    from prepayment import prepayment_costs, segment_label
+    from simulate import simulation_inputs, simulate, loan_results, portfolio_results, loss_distribution, DEFAULT_PARAMS
+# Only the tenant heatmap uses altair directly; it loads when first drawn.
+alt = LazyModule("altair")
+# dateutil parsing is timed as its own stage wherever it runs.
+parse = TIMER.timed("date_parsing")(parse)
+
+# Per-stage timings (sidebar panel plus one JSON log line per rerun) for every
+# session with CMBS_DIAGNOSTICS=1, or for one session with ?diagnostics=1.
+# Untimed reruns pay one thread-local lookup per instrumented call.
+DIAGNOSTICS = os.environ.get("CMBS_DIAGNOSTICS", "0") != "0"
+diagnostics = DIAGNOSTICS or st.query_params.get("diagnostics", "0") not in ("", "0", "false")
+if diagnostics:
+    configure_log(os.environ.get("CMBS_DIAGNOSTICS_LOG"))
+TIMER.begin(diagnostics)
+
+# Hold loans packed (tables as columns, deflated against one preset dictionary
+# of common keys and strings shared by every loan) and unpack on access.
+COMPACT_LOANS = os.environ.get("CMBS_COMPACT", "1") != "0"
+
+@st.cache_resource(show_spinner=False)
+def get_dataset(path):
+    # Shared across sessions; each rerun reads the latest version it finds.
+    dataset = Dataset(path, compact=COMPACT_LOANS)
+    dataset.watch(POLL_SECONDS)
+    return dataset
+
+dataset = get_dataset(DATA_PATH)
+dataset_version, raw_data = dataset.snapshot()
+PROFILE.mark("data_loaded")
+
+# Process-wide cache for per-version results (summary rows, rendered HTML,
+# metrics, simulations) so sessions share one copy; budget in CMBS_CACHE_MB.
+CACHE_BUDGET_MB = float(os.environ.get("CMBS_CACHE_MB", "512"))
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    return SharedCache(int(CACHE_BUDGET_MB * 1024 * 1024))
+
+shared_cache = get_shared_cache()
+# Keys are (kind, dataset version, ...); older versions are no longer served.
+shared_cache.discard(lambda key: key[1] < dataset_version)
+
+# Prometheus-text metrics, served at http://127.0.0.1:<CMBS_METRICS_PORT>/metrics
+# and/or rewritten to CMBS_METRICS_FILE every CMBS_METRICS_INTERVAL seconds.
+METRICS_PORT = os.environ.get("CMBS_METRICS_PORT")
+METRICS_FILE = os.environ.get("CMBS_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("CMBS_METRICS_INTERVAL", "15"))
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_registry(port, path):
+    # One per process; reruns observe into it, gauges are read at scrape time.
+    registry = MetricsRegistry()
+    registry.collect(cache_collector(shared_cache))
+    registry.collect(dataset_collector(dataset))
+    registry.collect(session_collector())
+    if port:
+        serve(registry, int(port))
+    if path:
+        write_file(registry, path, METRICS_INTERVAL)
+    return registry
+
+metrics_registry = get_metrics_registry(METRICS_PORT, METRICS_FILE)
 
 # ------------------ Helper Functions ------------------
 
+def markdown_html(html):
+    # st.markdown for raw HTML; the payload size goes into the rerun timings.
+    TIMER.payload(len(html.encode("utf-8")))
+    st.markdown(html, unsafe_allow_html=True)
+
+@TIMER.timed("find_nested")
 def find_nested(data, paths):
     for path in paths:
         keys = path.split(".")
@@ -112,6 +266,7 @@ def extract_debt_yield_value(dy_str):
     except:
         return None
 
+@TIMER.timed("tenant_ranking")
 def get_top_tenant(data):
     sources = [
         ("top_largest_tenants_by_ubr.tenants", "percent_of_total_base_rent", "tenant"),
@@ -141,24 +296,28 @@ manual_ratings = {
     "n3791_x3": "S&P: BBB+ / Moody's: Baa1 / Fitch: A-"
 }
 
+@TIMER.timed("formatting")
 def fmt_currency(val):
     try:
         return f"${float(val):,.0f}" if pd.notna(val) else ""
     except:
         return ""
 
+@TIMER.timed("formatting")
 def fmt_percent(val):
     try:
         return f"{float(val):.2f}%" if pd.notna(val) else ""
     except:
         return ""
 
+@TIMER.timed("formatting")
 def fmt_number(val):
     try:
         return f"{float(val):.2f}" if pd.notna(val) else ""
     except:
         return ""
 
+@TIMER.timed("formatting")
 def fmt_date(val):
     try:
         dt = parse(val, dayfirst=False, fuzzy=True)
@@ -193,8 +352,8 @@ def compute_loan_term(data):
     end = data.get("mortgage_loan_information", {}).get("maturity_date") or data.get("maturity_date")
     try:
         if start and end:
-            start_date = parser.parse(start)
-            end_date = parser.parse(end)
+            start_date = parse(start)
+            end_date = parse(end)
             diff_months = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
             return f"{diff_months // 12} Years"
     except:
@@ -203,8 +362,6 @@ def compute_loan_term(data):
 
 # ------------------ Build Records ------------------
 
-records = []
-
 deal_names = {
     "n1967-x4": "Series 2020-BNK25",
     "n2405-x1": "BENCHMARK 2021-B23",
@@ -214,185 +371,398 @@ deal_names = {
     "n3791_x3": "Series 2023-C22",
 }
 
+def build_summary(raw_data, display=True):
+    # Display rows (df, None without `display`) and the typed summary, built
+    # once per dataset version and shared by every session through the shared
+    # cache.
+    records = []
+    summary_records = []
+
+    for loan_id, data in raw_data.items():
+
+        deal_name = deal_names.get(loan_id, "")
+
+        purpose = find_nested(data, [
+            "loan_purpose", "loan_summary.loan_purpose", "mortgage_loan_information.loan_purpose",
+            "loan_metadata.loan_purpose", "mortgaged_property_information.loan_purpose", "details.loan_purpose"
+        ])
+        borrower = find_nested(data, [
+            "borrower", "mortgage_loan_information.borrower", "borrower_sponsor",
+            "mortgaged_property_information.borrower_sponsor"
+        ])
+        tenant = get_top_tenant(data)
+
+        tenant_lists = [
+            find_nested(data, ["major_tenant.tenants"]),
+            find_nested(data, ["tenant_summary.tenants"]),
+            find_nested(data, ["largest_tenants_based_on_uw_base_rent.tenants"])
+        ]
+        tenant_lists = [lst if isinstance(lst, list) else [] for lst in tenant_lists]
+        combined_tenants = tenant_lists[0] + tenant_lists[1] + tenant_lists[2]
+        tenant_rating = manual_ratings.get(loan_id, "")
+        if not tenant_rating:
+            for t in combined_tenants:
+                name = t.get("name") or t.get("tenant") or t.get("tenant_name")
+                cr = t.get("credit_rating", {})
+                if name == tenant and isinstance(cr, dict):
+                    parts = []
+                    for agency in ["S&P", "Moody's", "Fitch"]:
+                        val = cr.get(agency) or cr.get(agency.lower()) or cr.get(agency.upper())
+                        if val and val.upper() != "NR":
+                            parts.append(f"{agency}: {val}")
+                    tenant_rating = " / ".join(parts)
+                    break
+
+        original_balance = extract_numeric(find_nested(data, [
+            "original_principal_balance", "loan_summary.original_principal_balance",
+            "mortgage_loan_information.original_balance", "mortgage_loan_information.cut_off_date_principal_balance"
+        ]))
+        interest_rate_raw = find_nested(data, [
+            "interest_rate", "mortgage_loan_information.interest_rate",
+            "mortgage_loan_information.interest_rate_percent", "mortgage_loan_information.mortgage_rate", "mortgage_rate"
+        ])
+        try:
+            interest_rate = float(str(interest_rate_raw).replace("%", "").strip())
+        except:
+            interest_rate = None
+
+        dscr = extract_dscr_value(find_nested(data, [
+            "underwriting_and_financial_information.uw_ncf_dscr",
+            "underwriting_financial_info.uw_dscr_based_on_noi_ncf",
+            "cash_flow_analysis.uw.ncf_dscr",
+            "cash_flow_analysis.ttm_09302019.ncf_dscr",
+            "mortgaged_property_information.dscr_based_on_underwritten_noi_ncf",
+            "financial_information.uw_ncf_dscr.whole_loan",
+            "financial_information.whole_loan.uw_dscr.ncf",
+            "financial_information.uw_ncf_dscr"
+        ]))
+
+        debt_yield = extract_debt_yield_value(find_nested(data, [
+            "underwriting_and_financial_information.uw_noi_debt_yield",
+            "underwriting_financial_info.uw_debt_yield_based_on_noi_ncf",
+            "cash_flow_analysis.uw.ncf_debt_yield",
+            "cash_flow_analysis.ttm_09302019.ncf_debt_yield",
+            "financial_information.uw_noi_debt_yield",
+            "financial_information.uw_noi_debt_yield_percent.whole_loan",
+            "financial_information.uw_debt_yield_percent.whole_loan",
+            "financial_information.whole_loan.uw_debt_yield.cut_off.ncf",
+            "financial_information.uw_ncf_debt_yield",
+            "mortgaged_property_information.debt_yield_based_on_underwritten_noi_ncf"
+        ]))
+
+        ltv = extract_numeric(find_nested(data, [
+            "underwriting_financial_info.cut_off_date_ltv_ratio",
+            "mortgaged_property_information.cut_off_date_ltv_ratio",
+            "financial_information.cut_off_date_ltv_percent.whole_loan",
+            "financial_information.cut_off_date_ltv",
+            "underwriting_and_financial_information.ltv_ratios.cut_off_date",
+            "financial_information.whole_loan.ltv.cut_off",
+            "loan_summary.cut_off_ltv"
+        ]))
+
+        maturity_ltv = extract_numeric(find_nested(data, [
+            "underwriting_financial_info.ltv_ratio_at_maturity",
+            "underwriting_financial_information.ltv_ratios.maturity_date",
+            "underwriting_and_financial_information.ltv_ratios.maturity_date",
+            "financial_information.maturity_date_ltv",
+            "mortgaged_property_information.maturity_date_ltv_ratio",
+            "financial_information.maturity_date_ltv_percent.whole_loan",
+            "financial_information.whole_loan.ltv.balloon"
+        ]))
+
+        occupancy = extract_numeric(find_nested(data, [
+            "property_information.occupancy",
+            "mortgaged_property_info.current_occupancy_as_of",
+            "mortgaged_property_information.current_occupancy_as_of",
+            "mortgaged_property_information.total_occupancy_as_of_12_30_2020",
+            "occupancy_history.2023.current",
+            "underwriting_and_financial_information.occupancy_history.0.occupancy",
+            "historical_occupancy.most_recent.percent",
+            "financial_information.occupancy",
+            "property_information.occupancy_percent",
+            "property_information.occupancy_rate"
+        ]))
+
+        location = strip_zip(find_nested(data, [
+            "property_information.location",
+            "mortgaged_property_info.location",
+            "mortgaged_property_information.location",
+            "location"
+        ]))
+
+        sqft = find_nested(data, [
+            "property_information.size_sqft",
+            "property_information.total_sq_ft",
+            "mortgaged_property_info.size",
+            "mortgaged_property_information.size_sqft",
+            "mortgaged_property_information.size",
+            "property_information.net_rentable_area_sf"
+        ])
+        sqft = extract_numeric(sqft)
+
+        maturity_date = find_nested(data, [
+            "maturity_date", "loan_summary.maturity_date", "mortgage_loan_information.maturity_date"
+        ])
+
+        issuer_map = {
+        "GACC": "Goldman Sachs",
+        "MSMCH": "Morgan Stanley Mortgage Capital Holdings",
+        "GSMC": "Goldman Sachs Mortgage Company",
+        "JPMCB": "J.P. Morgan Chase Bank"
 
+    }
 
-for loan_id, data in raw_data.items():
-
-    deal_name = deal_names.get(loan_id, "")
-
-    purpose = find_nested(data, [
-        "loan_purpose", "loan_summary.loan_purpose", "mortgage_loan_information.loan_purpose",
-        "loan_metadata.loan_purpose", "mortgaged_property_information.loan_purpose", "details.loan_purpose"
-    ])
-    borrower = find_nested(data, [
-        "borrower", "mortgage_loan_information.borrower", "borrower_sponsor",
-        "mortgaged_property_information.borrower_sponsor"
-    ])
-    tenant = get_top_tenant(data)
-
-    tenant_lists = [
-        find_nested(data, ["major_tenant.tenants"]),
-        find_nested(data, ["tenant_summary.tenants"]),
-        find_nested(data, ["largest_tenants_based_on_uw_base_rent.tenants"])
-    ]
-    tenant_lists = [lst if isinstance(lst, list) else [] for lst in tenant_lists]
-    combined_tenants = tenant_lists[0] + tenant_lists[1] + tenant_lists[2]
-    tenant_rating = manual_ratings.get(loan_id, "")
-    if not tenant_rating:
-        for t in combined_tenants:
-            name = t.get("name") or t.get("tenant") or t.get("tenant_name")
-            cr = t.get("credit_rating", {})
-            if name == tenant and isinstance(cr, dict):
-                parts = []
-                for agency in ["S&P", "Moody's", "Fitch"]:
-                    val = cr.get(agency) or cr.get(agency.lower()) or cr.get(agency.upper())
-                    if val and val.upper() != "NR":
-                        parts.append(f"{agency}: {val}")
-                tenant_rating = " / ".join(parts)
-                break
-
-    original_balance = extract_numeric(find_nested(data, [
-        "original_principal_balance", "loan_summary.original_principal_balance",
-        "mortgage_loan_information.original_balance", "mortgage_loan_information.cut_off_date_principal_balance"
-    ]))
-    interest_rate_raw = find_nested(data, [
-        "interest_rate", "mortgage_loan_information.interest_rate",
-        "mortgage_loan_information.interest_rate_percent", "mortgage_loan_information.mortgage_rate", "mortgage_rate"
-    ])
-    try:
-        interest_rate = float(str(interest_rate_raw).replace("%", "").strip())
-    except:
-        interest_rate = None
-
-    dscr = extract_dscr_value(find_nested(data, [
-        "underwriting_and_financial_information.uw_ncf_dscr",
-        "underwriting_financial_info.uw_dscr_based_on_noi_ncf",
-        "cash_flow_analysis.uw.ncf_dscr",
-        "cash_flow_analysis.ttm_09302019.ncf_dscr",
-        "mortgaged_property_information.dscr_based_on_underwritten_noi_ncf",
-        "financial_information.uw_ncf_dscr.whole_loan",
-        "financial_information.whole_loan.uw_dscr.ncf",
-        "financial_information.uw_ncf_dscr"
-    ]))
-
-    debt_yield = extract_debt_yield_value(find_nested(data, [
-        "underwriting_and_financial_information.uw_noi_debt_yield",
-        "underwriting_financial_info.uw_debt_yield_based_on_noi_ncf",
-        "cash_flow_analysis.uw.ncf_debt_yield",
-        "cash_flow_analysis.ttm_09302019.ncf_debt_yield",
-        "financial_information.uw_noi_debt_yield",
-        "financial_information.uw_noi_debt_yield_percent.whole_loan",
-        "financial_information.uw_debt_yield_percent.whole_loan",
-        "financial_information.whole_loan.uw_debt_yield.cut_off.ncf",
-        "financial_information.uw_ncf_debt_yield",
-        "mortgaged_property_information.debt_yield_based_on_underwritten_noi_ncf"
-    ]))
-
-    ltv = extract_numeric(find_nested(data, [
-        "underwriting_financial_info.cut_off_date_ltv_ratio",
-        "mortgaged_property_information.cut_off_date_ltv_ratio",
-        "financial_information.cut_off_date_ltv_percent.whole_loan",
-        "financial_information.cut_off_date_ltv",
-        "underwriting_and_financial_information.ltv_ratios.cut_off_date",
-        "financial_information.whole_loan.ltv.cut_off",
-        "loan_summary.cut_off_ltv"
-    ]))
-
-    maturity_ltv = extract_numeric(find_nested(data, [
-        "underwriting_financial_info.ltv_ratio_at_maturity",
-        "underwriting_financial_information.ltv_ratios.maturity_date",
-        "underwriting_and_financial_information.ltv_ratios.maturity_date",
-        "financial_information.maturity_date_ltv",
-        "mortgaged_property_information.maturity_date_ltv_ratio",
-        "financial_information.maturity_date_ltv_percent.whole_loan",
-        "financial_information.whole_loan.ltv.balloon"
-    ]))
-
-    occupancy = extract_numeric(find_nested(data, [
-        "property_information.occupancy",
-        "mortgaged_property_info.current_occupancy_as_of",
-        "mortgaged_property_information.current_occupancy_as_of",
-        "mortgaged_property_information.total_occupancy_as_of_12_30_2020",
-        "occupancy_history.2023.current",
-        "underwriting_and_financial_information.occupancy_history.0.occupancy",
-        "historical_occupancy.most_recent.percent",
-        "financial_information.occupancy",
-        "property_information.occupancy_percent",
-        "property_information.occupancy_rate"
-    ]))
-
-    location = strip_zip(find_nested(data, [
-        "property_information.location",
-        "mortgaged_property_info.location",
-        "mortgaged_property_information.location",
-        "location"
-    ]))
-
-    sqft = find_nested(data, [
-        "property_information.size_sqft",
-        "property_information.total_sq_ft",
-        "mortgaged_property_info.size",
-        "mortgaged_property_information.size_sqft",
-        "mortgaged_property_information.size",
-        "property_information.net_rentable_area_sf"
-    ])
-    sqft = extract_numeric(sqft)
-
-    maturity_date = find_nested(data, [
-        "maturity_date", "loan_summary.maturity_date", "mortgage_loan_information.maturity_date"
+        issuer_raw = find_nested(data, [
+        "issuer",
+        "loan_summary.issuer",
+        "deal.issuer",
+        "collateral.issuer",
+        "offering.issuer",
+        "mortgage_loan_information.loan_seller",
+        "mortgage_loan_information.mortgage_loan_seller",
+        "loan_seller"
     ])
 
-    issuer_map = {
-    "GACC": "Goldman Sachs",
-    "MSMCH": "Morgan Stanley Mortgage Capital Holdings",
-    "GSMC": "Goldman Sachs Mortgage Company",
-    "JPMCB": "J.P. Morgan Chase Bank"
-    
-}
-
-    issuer_raw = find_nested(data, [
-    "issuer",
-    "loan_summary.issuer",
-    "deal.issuer",
-    "collateral.issuer",
-    "offering.issuer",
-    "mortgage_loan_information.loan_seller",
-    "mortgage_loan_information.mortgage_loan_seller",
-    "loan_seller"
-])
-
-    issuer = issuer_map.get(issuer_raw, issuer_raw) if issuer_raw else ""
-
-
-
-
-    loan_term = compute_loan_term(data)
-
-    records.append({
-        "Loan ID": loan_id,
-        "Deal Name": deal_name,
-        "Purpose": purpose,
-        "Issuer": issuer,
-        "Borrower": borrower,
-        "Top Tenant": tenant,
-        "Tenant Credit Rating": tenant_rating,
-        "Original Balance": fmt_currency(original_balance),
-        "Interest Rate": fmt_percent(interest_rate),
-        "DSCR": fmt_number(dscr),
-        "Debt Yield": fmt_percent(debt_yield),
-        "Cut-off LTV": fmt_percent(ltv),
-        "Maturity LTV": fmt_percent(maturity_ltv),
-        "Occupancy Rate": fmt_percent(occupancy),
-        "Location": location,
-        "SQFT": f"{int(sqft):,}" if pd.notna(sqft) else "",
-        "Loan Term": loan_term,
-        "Maturity Date": fmt_date(maturity_date),
-    })
-
-df = pd.DataFrame(records)
+        issuer = issuer_map.get(issuer_raw, issuer_raw) if issuer_raw else ""
+
+
+
+
+        loan_term = compute_loan_term(data)
+
+        summary_records.append({
+            "loan_id": loan_id,
+            "deal": deal_name,
+            "issuer": issuer,
+            "purpose": purpose,
+            "property_type": property_type_category(loan_property_type(data)),
+            "balance": original_balance,
+            "interest_rate": interest_rate,
+            "dscr": dscr,
+            "debt_yield": debt_yield,
+            "ltv": ltv,
+            "maturity_ltv": maturity_ltv,
+            "occupancy": occupancy,
+            "sqft": sqft,
+            "maturity_date": to_date(maturity_date),
+            "state": to_state(location),
+        })
+
+        if not display:
+            continue
+        records.append({
+            "Loan ID": loan_id,
+            "Deal Name": deal_name,
+            "Purpose": purpose,
+            "Issuer": issuer,
+            "Borrower": borrower,
+            "Top Tenant": tenant,
+            "Tenant Credit Rating": tenant_rating,
+            "Original Balance": fmt_currency(original_balance),
+            "Interest Rate": fmt_percent(interest_rate),
+            "DSCR": fmt_number(dscr),
+            "Debt Yield": fmt_percent(debt_yield),
+            "Cut-off LTV": fmt_percent(ltv),
+            "Maturity LTV": fmt_percent(maturity_ltv),
+            "Occupancy Rate": fmt_percent(occupancy),
+            "Location": location,
+            "SQFT": f"{int(sqft):,}" if pd.notna(sqft) else "",
+            "Loan Term": loan_term,
+            "Maturity Date": fmt_date(maturity_date),
+        })
+
+    df = pd.DataFrame(records) if display else None
+
+    # Typed copy of the summary columns for portfolio math.
+    summary = pd.DataFrame(summary_records)
+    for column in ["balance", "interest_rate", "dscr", "debt_yield", "ltv", "maturity_ltv", "occupancy", "sqft"]:
+        summary[column] = pd.to_numeric(summary[column], errors="coerce").astype("float64")
+    summary["maturity_date"] = pd.to_datetime(summary["maturity_date"].to_numpy(dtype="datetime64[D]"))
+    return df, summary
+
+# Optional partitioned Parquet copy (CMBS_PARQUET_PATH, partitioned by
+# CMBS_PARQUET_PARTITION: vintage or deal). Queries read only the needed
+# columns, partitions and row groups; it takes over from SQLite when both are
+# set, and the summary table's formatted rows are read from it rather than
+# built for the whole book.
+PARQUET_PATH = os.environ.get("CMBS_PARQUET_PATH")
+PARQUET_PARTITION = os.environ.get("CMBS_PARQUET_PARTITION", "vintage")
+
+df, summary = shared_cache.get(("summary", dataset_version), lambda: build_summary(raw_data, display=not PARQUET_PATH))
+
+# ------------------ Ingest Tables ------------------
+
+@st.cache_resource(show_spinner=False)
+def get_table_store(path):
+    # Shared across sessions; a new dataset version re-parses only the loans
+    # touched since the last one.
+    return TableStore(manual_ratings)
+
+tables = get_table_store(DATA_PATH).get(dataset, dataset_version, raw_data)
+
+@st.cache_resource(show_spinner=False)
+def get_schedules():
+    # Shared across sessions and datasets; rows are cached by loan-terms hash.
+    return Schedules()
+
+schedule = get_schedules().build(tables["loan_terms"])
+
+def load_metrics(raw_data, summary, tables, schedule):
+    # Reported NOI/NCF DSCR, debt yield and LTVs next to values recomputed
+    # from UW NOI/NCF, scheduled debt service, balance and appraised value.
+    reported = build_reported_metrics(raw_data, summary)
+    return build_metrics(reported, tables["financials"], tables["loan_terms"], schedule)
+
+loan_metrics = shared_cache.get(("metrics", dataset_version), lambda: load_metrics(raw_data, summary, tables, schedule))
+
+# The summary table still shows and sorts by the term-sheet figures; the
+# stores keep them under these names.
+REPORTED_COLUMNS = {"dscr": "dscr_reported", "debt_yield": "debt_yield_reported"}
+
+def recomputed_summary(summary, loan_metrics):
+    # Portfolio statistics use the recomputed NCF DSCR and NOI debt yield
+    # rather than the figures lifted from the term sheets.
+    frame = summary.copy()
+    for column, reported in REPORTED_COLUMNS.items():
+        frame[reported] = frame[column]
+    for column, metric in [("dscr", "dscr_ncf_recomputed"), ("debt_yield", "debt_yield_noi_recomputed")]:
+        values = loan_metrics[metric].reindex(frame["loan_id"]).replace([float("inf"), -float("inf")], float("nan"))
+        frame[column] = values.to_numpy(dtype="float64")
+    return frame
+
+portfolio_summary = shared_cache.get(("portfolio_summary", dataset_version), lambda: recomputed_summary(summary, loan_metrics))
+
+def apply_rows(engine, frame):
+    # Dataset.sync callback for engines patched one loan at a time.
+    def apply(changed, removed):
+        rows = frame.set_index("loan_id")
+        for loan_id in removed:
+            engine.remove(loan_id)
+        for loan_id in changed:
+            engine.update(loan_id, rows.loc[loan_id].to_dict())
+    return apply
+
+@st.cache_resource(show_spinner=False)
+def get_portfolio_stats(path, _version, _summary):
+    # Shared across sessions; holds the per-filter weighted-average cache and
+    # is patched loan by loan as the dataset changes.
+    stats = PortfolioStats(_summary)
+    dataset.track(stats, _version)
+    return stats
+
+portfolio_stats = get_portfolio_stats(DATA_PATH, dataset_version, portfolio_summary)
+dataset.sync(portfolio_stats, dataset_version, raw_data, apply_rows(portfolio_stats, portfolio_summary))
+
+# Optional SQLite copy of the normalized model (CMBS_SQLITE_PATH). When set, the
+# summary table's filters, sort and weighted averages run as SQL against it.
+SQLITE_PATH = os.environ.get("CMBS_SQLITE_PATH")
+
+@st.cache_resource(show_spinner=False)
+def get_store_writer(path, _version, _summary, _tables):
+    # Full load once per process, then only touched loans are rewritten.
+    from store import StoreWriter
+    writer = StoreWriter(path)
+    writer.write(_summary, _tables, _version)
+    dataset.track(writer, _version)
+    return writer
+
+@st.cache_resource(show_spinner=False)
+def get_loan_store(path):
+    # One read-only connection shared across sessions.
+    from store import LoanStore
+    return LoanStore(path)
+
+loan_store = None
+if SQLITE_PATH:
+    store_writer = get_store_writer(SQLITE_PATH, dataset_version, portfolio_summary, tables)
+    dataset.sync(store_writer, dataset_version, raw_data,
+                 lambda changed, removed: store_writer.write(portfolio_summary, tables, dataset_version, changed + removed))
+    loan_store = get_loan_store(SQLITE_PATH)
+    # The store is rewritten in place, so another session may already have
+    # moved it past this rerun's snapshot; its rows would then not line up
+    # with `df`, and the in-memory stats serve this rerun instead.
+    if loan_store.version() != dataset_version:
+        loan_store = None
+
+def display_rows(raw_data):
+    # ColumnarWriter display callback: formatted rows for a partition's loans.
+    return lambda loan_ids: build_summary({loan_id: raw_data[loan_id] for loan_id in loan_ids})[0]
+
+@st.cache_resource(show_spinner=False)
+def get_columnar_writer(path, partition, _version, _summary, _tables, _raw_data):
+    # Full write once per process, then only partitions holding touched loans.
+    from columnar import ColumnarWriter
+    writer = ColumnarWriter(path, partition)
+    writer.write(_summary, _tables, _version, display=display_rows(_raw_data))
+    dataset.track(writer, _version)
+    return writer
+
+@st.cache_resource(show_spinner=False)
+def get_columnar_store(path, partition):
+    from columnar import ColumnarStore
+    return ColumnarStore(path, partition)
+
+if PARQUET_PATH:
+    columnar_writer = get_columnar_writer(PARQUET_PATH, PARQUET_PARTITION, dataset_version, portfolio_summary, tables, raw_data)
+    dataset.sync(columnar_writer, dataset_version, raw_data,
+                 lambda changed, removed: columnar_writer.write(portfolio_summary, tables, dataset_version, changed + removed,
+                                                                display=display_rows(raw_data)))
+    loan_store = get_columnar_store(PARQUET_PATH, PARQUET_PARTITION).at(dataset_version)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_maturity_wall(path, version, _summary, _financials):
+    # Shared across sessions; bucket codes per granularity are built once per version.
+    return MaturityWall(_summary, _financials)
+
+maturity_wall = get_maturity_wall(DATA_PATH, dataset_version, summary, tables["financials"])
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_stress_engine(path, version, _summary, _financials, _loan_terms, _schedule):
+    # Shared across sessions; caches the scenarios x loans grid per scenario set.
+    return StressEngine(_summary, _financials, _loan_terms, _schedule)
+
+stress_engine = get_stress_engine(DATA_PATH, dataset_version, summary, tables["financials"], tables["loan_terms"], schedule)
+
+loan_features = summary.join(tables["loan_terms"]["term_months"], on="loan_id")
+
+@st.cache_resource(show_spinner=False)
+def get_loan_index(path, _version, _features):
+    # Shared across sessions; loans are patched in place as they change.
+    index = LoanIndex(_features)
+    dataset.track(index, _version)
+    return index
+
+loan_index = get_loan_index(DATA_PATH, dataset_version, loan_features)
+dataset.sync(loan_index, dataset_version, raw_data, apply_rows(loan_index, loan_features))
+
+# Built (or loaded from disk) on the first search, then kept in step with the
+# dataset, and saved back, from there.
+@st.cache_resource(show_spinner=False)
+def get_search_index(path, _version, _raw_data):
+    # Loaded from data/.cache and re-indexed only for loans whose content changed.
+    index = load_search_index(path, _raw_data)
+    dataset.track(index, _version)
+    return index
+
+
+def run_simulation(params, as_of, summary, tables, schedule):
+    # Shared-cached on the dataset version, as-of month and parameters; blocks
+    # run across a process pool.
+    inputs = simulation_inputs(summary, tables["financials"], tables["loan_terms"], schedule, as_of)
+    total = simulate(inputs, dict(params))
+    return loan_results(total, summary["loan_id"].to_numpy()), portfolio_results(total), loss_distribution(total)
+
+sources_uses_checks = tables["sources_uses_checks"]
+occupancy_panel = tables["occupancy_panel"]
+
+PROFILE.mark("ready")
 
 # ------------------ UI Tabs ------------------
 
+first_paint_slot.empty()
+# (view, started, payload bytes so far) at each view boundary, for the metrics.
+view_marks = [("summary", time.perf_counter(), TIMER.payload_bytes())]
+
 tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     "📋 Loan Summary Table",
     "📄 N1967 Loan",
@@ -406,46 +776,73 @@ tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
 with tab1:
     st.title("📋 Loan Summary Table")
 
-    st.markdown("""
-    <style>
-    .custom-table-container {
-        overflow-x: auto;
-        margin-top: 20px;
-        margin-bottom: 40px;
-    }
-    .custom-table {
-        width: 100%;
-        border-collapse: collapse;
-        font-family: Arial, sans-serif;
-        font-size: 15px;
-    }
-    .custom-table th {
-        background-color: #1F3B57;
-        color: white;
-        padding: 12px;
-        text-align: center;
-        border: 1px solid #ddd;
-        font-weight: bold;
-    }
-    .custom-table td {
-        padding: 10px 12px;
-        border: 1px solid #ddd;
-        text-align: center;
-        vertical-align: middle;
-    }
-    .custom-table tr:nth-child(even) {
-        background-color: #f9f9f9;
-    }
-    .custom-table tr:hover {
-        background-color: #f1f1f1;
-    }
-    .custom-table td:first-child, .custom-table th:first-child {
-        text-align: left;
+    markdown_html(TABLE_CSS)
+
+    # ------------------ Search ------------------
+
+    search_query = st.text_input("🔍 Search all loan documents", placeholder="Borrower, sponsor, tenant, comp building...")
+    if search_query:
+        search_index = get_search_index(DATA_PATH, dataset_version, raw_data)
+        dataset.sync(search_index, dataset_version, raw_data, lambda changed, removed: search_index.update(raw_data, changed))
+        # Changes since the last save are written at most once a minute.
+        search_index.save_due(index_path(DATA_PATH))
+        hits = search_index.search(search_query)
+        st.caption(f"{len(hits)} matching loans")
+        if len(hits):
+            hits["deal"] = hits["loan_id"].map(deal_names)
+            # The shared index may already be on a newer version than this rerun.
+            hits = hits[hits["loan_id"].isin(raw_data)].reset_index(drop=True)
+            # Each raw_data lookup unpacks the loan, so do it once per hit.
+            hits["matches"] = [
+                "; ".join(f"{path_label(p)}: {str(leaf_value(loan, p))[:80]}" for p in paths)
+                for loan, paths in zip(map(raw_data.__getitem__, hits["loan_id"]), hits["paths"])
+            ]
+            st.dataframe(
+                hits[["loan_id", "deal", "score", "fields", "matches"]].style.format({"score": "{:.2f}"}),
+                use_container_width=True, hide_index=True,
+            )
+
+    # ------------------ Portfolio Filters & Statistics ------------------
+
+    filter_cols = st.columns([3, 3, 3, 2, 1])
+    filters = {
+        "issuer": filter_cols[0].multiselect("Issuer", sorted(summary["issuer"].dropna().unique())),
+        "purpose": filter_cols[1].multiselect("Purpose", sorted(summary["purpose"].dropna().unique())),
+        "property_type": filter_cols[2].multiselect("Property Type", sorted(summary["property_type"].dropna().unique())),
     }
-    </style>
-    """, unsafe_allow_html=True)
+    sort_column = SORT_COLUMNS.get(filter_cols[3].selectbox("Sort By", ["None"] + list(SORT_COLUMNS)))
+    descending = filter_cols[4].checkbox("Desc", value=True)
+    if loan_store is not None:
+        stats = loan_store.stats(filters)
+        view_ids = loan_store.loans(filters, REPORTED_COLUMNS.get(sort_column, sort_column), descending)["loan_id"]
+        view_rows = pd.Index(summary["loan_id"]).get_indexer(view_ids)
+        view_rows = view_rows[view_rows >= 0]
+        if sort_column is None:
+            # Parquet returns partition order; unsorted views keep file order.
+            view_rows.sort()
+        view_ids = summary["loan_id"].iloc[view_rows]
+        view_mask = summary.index.isin(view_rows)
+    else:
+        stats = portfolio_stats.compute(filters)
+        view_mask = portfolio_stats.mask(filters, summary["loan_id"])
+        view = summary[view_mask]
+        view_rows = view.index[sort_order(view, sort_column, descending)] if sort_column else view.index
+
+    stat_values = [
+        ("Loans", f"{stats['Loans']:,}"),
+        ("Balance", fmt_currency(stats["Balance"])),
+        ("Wtd DSCR", f"{fmt_number(stats['DSCR'])}x" if pd.notna(stats["DSCR"]) else ""),
+        ("Wtd Debt Yield", fmt_percent(stats["Debt Yield"])),
+        ("Wtd Cut-off LTV", fmt_percent(stats["Cut-off LTV"])),
+        ("Wtd Maturity LTV", fmt_percent(stats["Maturity LTV"])),
+        ("Wtd Coupon", fmt_percent(stats["Coupon"])),
+        ("Wtd Occupancy", fmt_percent(stats["Occupancy"])),
+    ]
+    for col, (label, value) in zip(st.columns(len(stat_values)), stat_values):
+        col.metric(label, value)
 
     # Convert the DataFrame to HTML
+    @TIMER.timed("html")
     def render_html_table(df):
         return f"""
         <div class="custom-table-container">
@@ -453,8 +850,228 @@ with tab1:
         </div>
         """
 
-    st.markdown(render_html_table(df), unsafe_allow_html=True)
+    table_html = shared_cache.get(
+        ("table_html", dataset_version, freeze_filters(filters), sort_column, descending, loan_store is not None),
+        lambda: render_html_table(df.iloc[view_rows] if df is not None else loan_store.display(view_ids)),
+    )
+    markdown_html(table_html)
+    PROFILE.mark("first_paint")
+    if not any(filters.values()) and sort_column is None:
+        # The unfiltered view is what the next fresh process paints first.
+        first_paint.save(dataset_version, stat_values, table_html)
+
+    failed_checks = sources_uses_checks[~sources_uses_checks["ok"]]
+    with st.expander(f"💵 Sources & Uses Checks ({len(failed_checks)} of {len(sources_uses_checks)} loans flagged)"):
+        st.dataframe(failed_checks, use_container_width=True)
+
+    with st.expander("📉 Occupancy History"):
+        st.line_chart(tables["occupancy_trend"]["occupancy"])
+        st.dataframe(occupancy_panel, use_container_width=True)
+
+    with st.expander("📅 Maturity Wall"):
+        wall_cols = st.columns(2)
+        granularity = wall_cols[0].radio("Bucket", GRANULARITIES, index=2, horizontal=True)
+        breakdown = wall_cols[1].radio("Breakdown", list(BREAKDOWNS), horizontal=True)
+        wall = maturity_wall.buckets(granularity, BREAKDOWNS[breakdown], view_mask, freeze_filters(filters))
+        st.bar_chart(wall)
+        exposure = maturity_wall.cumulative(wall)
+        st.line_chart(exposure["Cumulative"])
+        st.dataframe(
+            exposure[exposure["Maturing"] > 0].style.format(
+                {"Maturing": "${:,.0f}", "Cumulative": "${:,.0f}", "Cumulative %": "{:.1f}%"}
+            ),
+            use_container_width=True,
+        )
+
+    with st.expander("🧪 Stress Test"):
+        grid_cols = st.columns(3)
+        noi_haircuts = grid_cols[0].multiselect("NOI Haircut (%)", [0, 5, 10, 15, 20, 25, 30, 40, 50], default=[0, 10, 20, 30])
+        cap_shifts = grid_cols[1].multiselect("Cap Rate Widening (bp)", [0, 25, 50, 75, 100, 150, 200], default=[0, 50, 100])
+        occupancy_drops = grid_cols[2].multiselect("Occupancy Drop (pts)", [0, 5, 10, 15, 20, 30], default=[0, 10])
+        threshold_cols = st.columns(3)
+        thresholds = {
+            "dscr": threshold_cols[0].number_input("Min DSCR", value=DEFAULT_THRESHOLDS["dscr"], step=0.05),
+            "debt_yield": threshold_cols[1].number_input("Min Debt Yield (%)", value=DEFAULT_THRESHOLDS["debt_yield"], step=0.5),
+            "ltv": threshold_cols[2].number_input("Max LTV (%)", value=DEFAULT_THRESHOLDS["ltv"], step=2.5),
+        }
+        scenarios = scenario_grid(
+            [h / 100 for h in sorted(noi_haircuts or [0])],
+            [b / 10000 for b in sorted(cap_shifts or [0])],
+            sorted(occupancy_drops or [0]),
+        )
+        stress = stress_engine.run(scenarios)
+        breach_table = stress_engine.breach_summary(stress, thresholds, summary["balance"].to_numpy(), view_mask)
+        st.dataframe(
+            breach_table[["scenario", "loans_breaching", "balance_breaching"]].style.format({"balance_breaching": "${:,.0f}"}),
+            use_container_width=True, hide_index=True,
+        )
+        scenario = st.selectbox("Scenario", breach_table.index, format_func=lambda i: breach_table.at[i, "scenario"])
+        loan_stress = stress_engine.loan_metrics(stress, scenario, thresholds)[view_mask]
+        st.dataframe(
+            loan_stress.style.format({"dscr": "{:.2f}x", "debt_yield": "{:.1f}%", "ltv": "{:.1f}%"}),
+            use_container_width=True, hide_index=True,
+        )
+
+    metric_view = loan_metrics[view_mask]
+    with st.expander(f"🧮 Reported vs Recomputed Metrics ({int(metric_view['flagged'].sum())} of {len(metric_view)} loans flagged)"):
+        flagged_only = st.checkbox("Flagged loans only", value=True)
+        metric_view = metric_view[metric_view["flagged"]] if flagged_only else metric_view
+        metric_formats = {
+            f"{m}_{kind}": "{:.2f}x" if m.startswith("dscr") else "{:.1f}%"
+            for m in METRICS for kind in ["reported", "recomputed"]
+        }
+        st.dataframe(metric_view.style.format(metric_formats, na_rep=""), use_container_width=True)
+
+    with st.expander("🏢 Tenant Concentration & Rollover"):
+        exposure = tables["exposure"]
+        st.dataframe(
+            exposure["loans"][view_mask].style.format({
+                "top_tenant_share": "{:.1f}%", "hhi": "{:,.0f}", "rollover_in_term": "{:.1f}%", "balance": "${:,.0f}",
+            }),
+            use_container_width=True,
+        )
+        heatmap = exposure["rollover"][view_mask].reset_index().melt("loan_id", var_name="year", value_name="rent_pct")
+        st.altair_chart(
+            alt.Chart(heatmap).mark_rect().encode(
+                x=alt.X("year:O", title="Lease Expiration Year"),
+                y=alt.Y("loan_id:N", title="Loan"),
+                color=alt.Color("rent_pct:Q", title="% of UW Rent", scale=alt.Scale(scheme="orangered")),
+                tooltip=["loan_id", "year", alt.Tooltip("rent_pct:Q", format=".1f")],
+            ),
+            use_container_width=True,
+        )
+        st.bar_chart(
+            rollover_by_year(exposure["rollover"], exposure["loans"]["balance"], view_mask).rename("Balance-Weighted Rent Rolling")
+        )
+        st.dataframe(
+            exposure["book_tenants"].head(25).style.format({"balance_exposure": "${:,.0f}"}),
+            use_container_width=True, hide_index=True,
+        )
+
+    with st.expander("🔎 Similar Loans"):
+        search_cols = st.columns([2, 1])
+        search_mode = search_cols[0].radio("Search By", ["Loan", "Profile"], horizontal=True)
+        neighbors = int(search_cols[1].number_input("Results", value=5, min_value=1, max_value=50))
+        if search_mode == "Loan":
+            similar = loan_index.query(loan_id=st.selectbox("Loan", summary["loan_id"], key="similar_loan"), k=neighbors)
+        else:
+            profile_cols = st.columns(5)
+            profile = {
+                "property_type": profile_cols[0].selectbox("Property Type", [None] + sorted(summary["property_type"].unique())),
+                "state": profile_cols[1].selectbox("State", [None] + sorted(s for s in summary["state"].unique() if s)),
+                "balance": profile_cols[2].number_input("Balance ($)", value=None, step=1000000.0),
+                "sqft": profile_cols[3].number_input("SQFT", value=None, step=10000.0),
+                "term_months": profile_cols[4].number_input("Term (Months)", value=None, step=12.0),
+                "dscr": profile_cols[0].number_input("DSCR", value=None, step=0.05),
+                "debt_yield": profile_cols[1].number_input("Debt Yield (%)", value=None, step=0.25),
+                "ltv": profile_cols[2].number_input("LTV (%)", value=None, step=1.0),
+                "occupancy": profile_cols[3].number_input("Occupancy (%)", value=None, step=1.0),
+            }
+            similar = loan_index.query(profile=profile, k=neighbors)
+        st.dataframe(
+            similar[["loan_id", "deal", "property_type", "state", "balance", "dscr", "debt_yield", "ltv", "occupancy", "term_months", "distance"]],
+            use_container_width=True, hide_index=True,
+        )
+
+    with st.expander("🏦 Amortization Schedules"):
+        loan_terms = tables["loan_terms"]
+        balloons = pd.DataFrame({
+            "loan_id": schedule["loan_ids"],
+            "amortization_type": loan_terms["amortization_type"].to_numpy(),
+            "io_months": loan_terms["io_months"].to_numpy(),
+            "year_1_debt_service": annual_debt_service(schedule, 1),
+            "balloon": schedule["balloon"],
+        })
+        st.dataframe(
+            balloons[view_mask].style.format({"io_months": "{:.0f}", "year_1_debt_service": "${:,.0f}", "balloon": "${:,.0f}"}),
+            use_container_width=True, hide_index=True,
+        )
+        schedule_loan = st.selectbox("Loan", schedule["loan_ids"], key="schedule_loan")
+        payments = loan_schedule(schedule, schedule_loan)
+        st.line_chart(payments.set_index("payment_date")[["balance"]])
+        st.dataframe(
+            payments.style.format({c: "${:,.2f}" for c in ["interest", "principal", "debt_service", "balance"]}),
+            use_container_width=True, hide_index=True,
+        )
+
+    with st.expander("🔒 Call Protection & Prepayment Cost"):
+        protection = tables["call_protection"]
+        curve_cols = st.columns([1, 2])
+        prepay_date = curve_cols[0].date_input("Prepayment Date", value=datetime.today())
+        curve = curve_cols[1].data_editor(
+            pd.DataFrame({"tenor_years": [1, 2, 3, 5, 7, 10, 30], "yield_pct": [4.10, 3.95, 3.90, 3.90, 4.00, 4.15, 4.60]}),
+            num_rows="dynamic", hide_index=True, key="treasury_curve",
+        )
+        costs = prepayment_costs(schedule, protection, curve, prepay_date)
+        costs.insert(1, "call_protection", protection["texts"])
+        costs.insert(2, "parsed", [segment_label(p) for p in protection["segments"]])
+        st.dataframe(
+            costs[view_mask].style.format({
+                c: "${:,.0f}" for c in ["balance", "yield_maintenance", "defeasance", "prepayment_cost"]
+            }, na_rep=""),
+            use_container_width=True, hide_index=True,
+        )
+
+    with st.expander("🎲 Default & Loss Simulation"):
+        sim_cols = st.columns(4)
+        sim_params = dict(
+            DEFAULT_PARAMS,
+            paths=int(sim_cols[0].number_input("Paths", value=DEFAULT_PARAMS["paths"], min_value=250, step=250)),
+            seed=int(sim_cols[1].number_input("Seed", value=DEFAULT_PARAMS["seed"], step=1)),
+            refi_ltv=sim_cols[2].number_input("Refi LTV Threshold (%)", value=DEFAULT_PARAMS["refi_ltv"], step=2.5),
+            noi_vol=sim_cols[3].number_input("NOI Volatility", value=DEFAULT_PARAMS["noi_vol"], step=0.01),
+        )
+        sim_key = tuple(sorted(sim_params.items()))
+        if st.button("Run Simulation"):
+            st.session_state["simulation_params"] = sim_key
+        if st.session_state.get("simulation_params") == sim_key:
+            # Time to maturity counts from this month, so a long-running
+            # process recomputes once the month turns over.
+            sim_as_of = datetime.today().strftime("%Y-%m")
+            with st.spinner("Running simulation..."):
+                sim_loans, sim_portfolio, sim_losses = shared_cache.get(
+                    ("simulation", dataset_version, sim_as_of, sim_key),
+                    lambda: run_simulation(sim_key, sim_as_of, summary, tables, schedule),
+                )
+            metric_cols = st.columns(4)
+            metric_cols[0].metric("Expected Loss", f"{sim_portfolio['expected_loss_pct']:.2f}%")
+            metric_cols[1].metric("95th Pct Loss", f"{sim_portfolio['p95_loss_pct']:.1f}%")
+            metric_cols[2].metric("99th Pct Loss", f"{sim_portfolio['p99_loss_pct']:.1f}%")
+            metric_cols[3].metric("Worst Path", f"{sim_portfolio['max_loss_pct']:.1f}%")
+            st.bar_chart(sim_losses)
+            st.dataframe(
+                sim_loans[view_mask].style.format({
+                    "term_default_prob": "{:.1f}%", "maturity_default_prob": "{:.1f}%",
+                    "expected_loss": "${:,.0f}", "loss_std": "${:,.0f}",
+                }),
+                use_container_width=True, hide_index=True,
+            )
+
+    loan_memory = dataset.memory_report()
+    if len(loan_memory):
+        with st.expander(f"🗜️ Loan Memory ({loan_memory['before'].sum() / loan_memory['after'].sum():.1f}x compacted)"):
+            mem_cols = st.columns(2)
+            mem_cols[0].metric("Parsed JSON", f"{loan_memory['before'].sum() / 1024:,.0f} KB")
+            mem_cols[1].metric("Held Packed", f"{loan_memory['after'].sum() / 1024:,.0f} KB")
+            st.dataframe(
+                loan_memory.style.format({"before": "{:,.0f}", "after": "{:,.0f}", "ratio": "{:.1f}x"}),
+                use_container_width=True, hide_index=True,
+            )
 
+    startup = PROFILE.report()
+    with st.expander(f"⏱️ Startup Profile (first paint {startup['marks'].get('first_paint', 0) * 1000:,.0f} ms)"):
+        startup_cols = st.columns(2)
+        startup_cols[0].dataframe(
+            pd.DataFrame(list(startup["marks"].items()), columns=["milestone", "seconds"]).style.format({"seconds": "{:.3f}"}),
+            use_container_width=True, hide_index=True,
+        )
+        startup_cols[1].dataframe(
+            pd.DataFrame(list(startup["modules"].items()), columns=["module", "seconds"]).style.format({"seconds": "{:.3f}"}),
+            use_container_width=True, hide_index=True,
+        )
+
+
+view_marks.append(("loan_detail", time.perf_counter(), TIMER.payload_bytes()))
 
 with tab2:
     st.title("📄N1967 Loan")
@@ -798,7 +1415,7 @@ with tab2:
 
     """
 
-    st.markdown(html_summary, unsafe_allow_html=True)
+    markdown_html(html_summary)
 
 with tab3:
     st.title("📄 N2405 Loan")
@@ -1101,7 +1718,7 @@ with tab3:
     </table>
 
     """
-    st.markdown(html_n2405, unsafe_allow_html=True)
+    markdown_html(html_n2405)
 
 
 
@@ -1817,7 +2434,7 @@ with tab4:
 
 
     """
-    st.markdown(html_n2450, unsafe_allow_html=True)  # ✅ Corrected
+    markdown_html(html_n2450)  # ✅ Corrected
 
 with tab5:
     st.title("📄 N2711 Loan")
@@ -2311,7 +2928,7 @@ with tab5:
 
 """
 
-    st.markdown(html_n2711, unsafe_allow_html=True)  # ✅ Corrected
+    markdown_html(html_n2711)  # ✅ Corrected
 
   
 with tab6:
@@ -2910,7 +3527,7 @@ with tab6:
 
     
     """
-    st.markdown(html_n3021, unsafe_allow_html=True)
+    markdown_html(html_n3021)
 
 with tab7:
   
@@ -3596,4 +4213,94 @@ with tab7:
 
 
   """
-  st.markdown(html_n3791, unsafe_allow_html=True)
\ No newline at end of file
+  markdown_html(html_n3791)
+
+# ------------------ Metrics ------------------
+
+view_marks.append((None, time.perf_counter(), TIMER.payload_bytes()))
+metrics_registry.histogram(
+    "cmbs_rerun_seconds", "Script rerun wall time; _count is the rerun count.", LATENCY_BUCKETS,
+).observe(view_marks[-1][1] - rerun_started)
+for (view, started, sent), (_, ended, sent_after) in zip(view_marks, view_marks[1:]):
+    metrics_registry.histogram(
+        "cmbs_view_seconds", "Time per rerun spent rendering each view.", LATENCY_BUCKETS,
+    ).observe(ended - started, view=view)
+    metrics_registry.histogram(
+        "cmbs_view_payload_bytes", "HTML markdown bytes sent per rerun by each view.", BYTE_BUCKETS,
+    ).observe(sent_after - sent, view=view)
+
+# ------------------ Profiling ------------------
+
+run_ctx = get_script_run_ctx()
+# The loan in focus: ?loan=<id> when linked to one, else the session's last
+# loan pick.
+focus_loan = st.query_params.get("loan") or st.session_state.get("schedule_loan") or st.session_state.get("similar_loan")
+rerun_capture = PROFILER.end(
+    rerun_profile, loan_id=focus_loan, version=dataset_version, session=run_ctx.session_id if run_ctx else None,
+)
+
+def profile_downloads(capture, key):
+    st.caption(
+        f"#{capture['id']} · {capture['trigger']} · {capture['seconds']:.2f} s · "
+        f"loan {capture['loan_id'] or 'n/a'} · dataset v{capture['version']}"
+    )
+    download_cols = st.columns(2)
+    download_cols[0].download_button(
+        "Collapsed Stacks", capture["collapsed"], file_name=file_name(capture, "collapsed"),
+        mime="text/plain", key=f"{key}_collapsed_{capture['id']}",
+    )
+    if capture["prof"] is not None:
+        download_cols[1].download_button(
+            "cProfile (.prof)", capture["prof"], file_name=file_name(capture, "prof"),
+            mime="application/octet-stream", key=f"{key}_prof_{capture['id']}",
+        )
+
+if rerun_capture is not None and profile_requested:
+    with st.sidebar:
+        st.header("🔬 Rerun Profile")
+        profile_downloads(rerun_capture, "rerun_profile")
+
+# ------------------ Diagnostics ------------------
+
+if diagnostics:
+    timings = TIMER.end(session=run_ctx.session_id if run_ctx else None, version=dataset_version)
+    rolling = TIMER.percentiles()
+
+    def rolling_ms(name, q):
+        value = rolling.get(name, {}).get(q)
+        return value * 1000 if value is not None else None
+
+    with st.sidebar:
+        st.header("🩺 Diagnostics")
+        diag_cols = st.columns(2)
+        diag_cols[0].metric(
+            "Rerun", f"{timings['rerun'] * 1000:,.0f} ms",
+            help=f"p50 {rolling_ms('rerun', 'p50'):,.0f} ms / p95 {rolling_ms('rerun', 'p95'):,.0f} ms "
+                 f"over {rolling['rerun']['samples']} reruns",
+        )
+        diag_cols[1].metric(
+            "Markdown Payload", f"{timings['markdown_bytes'] / 1024:,.0f} KB",
+            help=f"p95 {rolling['markdown_bytes']['p95'] / 1024:,.0f} KB",
+        )
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "stage": name,
+                    "ms": timings["stages"].get(name, (0.0, 0))[0] * 1000,
+                    "calls": timings["stages"].get(name, (0.0, 0))[1],
+                    "p50 ms": rolling_ms(name, "p50"),
+                    "p95 ms": rolling_ms(name, "p95"),
+                }
+                for name in STAGES
+            ]).style.format({"ms": "{:.2f}", "p50 ms": "{:.2f}", "p95 ms": "{:.2f}"}, na_rep=""),
+            use_container_width=True, hide_index=True,
+        )
+        st.caption("Exclusive time per stage; percentiles over reruns that ran the stage.")
+
+        recent_profiles = PROFILER.recent()
+        with st.expander(f"🔬 Recent Profiles ({len(recent_profiles)})"):
+            for capture in recent_profiles:
+                profile_downloads(capture, "recent_profile")
+
+PROFILE.mark("rendered")
+PROFILE.save(cache_path(DATA_PATH, "startup.json"))
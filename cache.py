@@ -0,0 +1,111 @@
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Size Accounting ------------------
+
+def size_of(obj, seen=None):
+    # Approximate resident bytes: frames and arrays report their buffers,
+    # containers and plain objects are walked once per referenced object.
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(index=True, deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(obj, np.ndarray):
+        size = obj.nbytes
+        if obj.dtype == object:
+            size += sum(size_of(v, seen) for v in obj.ravel())
+        return size
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(size_of(k, seen) + size_of(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(size_of(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        size += size_of(vars(obj), seen)
+    elif hasattr(type(obj), "__slots__"):
+        size += sum(size_of(getattr(obj, name), seen) for name in type(obj).__slots__ if hasattr(obj, name))
+    return size
+
+# ------------------ Shared Cache ------------------
+
+class SharedCache:
+    # Process-wide LRU shared by every session. Keys are tuples whose first
+    # item names the kind of entry ("summary", "table_html", ...); counters are
+    # kept per kind. Entries are evicted least-recently-used first once the
+    # byte budget is exceeded, and values larger than the budget are returned
+    # without being kept. Values are shared, so callers must not mutate them.
+
+    def __init__(self, budget_bytes):
+        self.lock = threading.Lock()
+        self.budget = budget_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.counters = defaultdict(lambda: {"hits": 0, "misses": 0, "evictions": 0})
+        self.building = {}
+
+    def get(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counters[key[0]]["hits"] += 1
+                return self.entries[key]
+            self.counters[key[0]]["misses"] += 1
+            pending = self.building.get(key)
+            if pending is None:
+                pending = self.building[key] = threading.Lock()
+        # One session builds a missing entry while the others wait for it.
+        with pending:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    return self.entries[key]
+            try:
+                value = build()
+                self.put(key, value)
+            finally:
+                with self.lock:
+                    self.building.pop(key, None)
+        return value
+
+    def put(self, key, value):
+        size = size_of(value)
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.sizes.pop(key)
+                del self.entries[key]
+            if size > self.budget:
+                return
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.bytes += size
+            while self.bytes > self.budget:
+                old, _ = self.entries.popitem(last=False)
+                self.bytes -= self.sizes.pop(old)
+                self.counters[old[0]]["evictions"] += 1
+
+    def discard(self, predicate):
+        # Drops entries whose key matches, e.g. those of an older dataset version.
+        with self.lock:
+            for key in [k for k in self.entries if predicate(k)]:
+                del self.entries[key]
+                self.bytes -= self.sizes.pop(key)
+
+    def stats(self):
+        with self.lock:
+            kinds = defaultdict(lambda: {"entries": 0, "bytes": 0})
+            for key, size in self.sizes.items():
+                kinds[key[0]]["entries"] += 1
+                kinds[key[0]]["bytes"] += size
+            rows = [
+                {"kind": kind, **kinds.get(kind, {"entries": 0, "bytes": 0}), **counts}
+                for kind, counts in sorted(self.counters.items())
+            ]
+            return {"budget": self.budget, "bytes": self.bytes, "entries": len(self.entries), "kinds": rows}
@@ -0,0 +1,247 @@
+import os
+import re
+import shutil
+import threading
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from portfolio import STAT_METRICS, WEIGHT_COLUMN
+from store import store_tables
+
+# ------------------ Partitioning ------------------
+
+# Partition column per scheme, computed per loan from the summary and terms.
+PARTITIONS = ["vintage", "deal"]
+ROWS_PER_GROUP = 64 * 1024
+# Formatted summary-table rows, written beside the model tables when the
+# writer is given a display callback.
+DISPLAY_TABLE = "display"
+
+def partition_values(summary, tables, partition):
+    # loan_id -> partition directory value; loans without one share "unknown".
+    if partition == "vintage":
+        years = tables["loan_terms"]["first_payment"].dt.year
+        values = years.map(lambda y: str(int(y)) if pd.notna(y) else "unknown")
+    else:
+        values = summary.set_index("loan_id")["deal"].map(lambda d: d or "unknown")
+    return values.astype(str).to_dict()
+
+def partitioning(partition):
+    # Partition values stay strings ("2021", "unknown") and are URI-escaped
+    # in directory names, so deal names with spaces or slashes are safe.
+    return ds.partitioning(pa.schema([(partition, pa.string())]), flavor="hive")
+
+def partition_folder(base, partition, value):
+    return os.path.join(base, f"{partition}={quote(value, safe='')}")
+
+def arrow_table(frame, partition, values):
+    frame = frame.assign(**{partition: frame["loan_id"].map(values).fillna("unknown")})
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype(object)
+    table = pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+    # All-empty text columns come through as the null type; keep them string
+    # so every partition and every write shares one schema.
+    schema = pa.schema([
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema
+    ])
+    return table.cast(schema)
+
+def filter_expression(filters):
+    # Dashboard filters as an Arrow expression; partition columns prune whole
+    # directories, the rest is checked against row-group statistics.
+    expression = None
+    for column, allowed in filters.items():
+        if allowed:
+            clause = pc.field(column).isin([str(a) for a in allowed])
+            expression = clause if expression is None else expression & clause
+    return expression
+
+# ------------------ Writer ------------------
+
+VERSION_DIR_RE = re.compile(r"^v(\d+)$")
+
+def version_folder(root, version):
+    return os.path.join(root, f"v{int(version)}")
+
+def link_tree(source, target):
+    # Hard links when the filesystem allows them, copies otherwise.
+    for folder, _, files in os.walk(source):
+        dest = os.path.join(target, os.path.relpath(folder, source))
+        os.makedirs(dest, exist_ok=True)
+        for name in files:
+            try:
+                os.link(os.path.join(folder, name), os.path.join(dest, name))
+            except OSError:
+                shutil.copy2(os.path.join(folder, name), os.path.join(dest, name))
+
+class ColumnarWriter:
+    # One directory per dataset version (root/v3/), holding one directory per
+    # table, hive-partitioned (e.g. v3/loans/vintage=2021/). A full write
+    # builds the tree from scratch; with loan_ids only the partitions holding
+    # those loans (before or after the change) are rewritten and the rest are
+    # linked from the previous version. Each version is built under a
+    # temporary name and renamed into place, so a reader sees all of it or
+    # none of it. The previous version is kept for reruns still on it; older
+    # ones are deleted. `display(loan_ids)` returns formatted rows for those
+    # loans in that order; it is called one partition at a time, so the
+    # book's display rows are never all held at once.
+
+    def __init__(self, root, partition="vintage"):
+        if partition not in PARTITIONS:
+            raise ValueError(f"partition must be one of {PARTITIONS}")
+        self.lock = threading.Lock()
+        self.root = root
+        self.partition = partition
+        self.values = {}
+        self.version = None
+
+    def write(self, summary, tables, version, loan_ids=None, display=None):
+        values = partition_values(summary, tables, self.partition)
+        with self.lock:
+            previous = self.version
+            if previous is None:
+                loan_ids = None
+            stale = None
+            if loan_ids is not None:
+                stale = {self.values.get(i) for i in loan_ids} | {values.get(i) for i in loan_ids}
+                stale = sorted(v for v in stale if v is not None)
+            target = version_folder(self.root, version)
+            building = f"{target}.tmp"
+            shutil.rmtree(building, ignore_errors=True)
+            for name, frame in store_tables(summary, tables).items():
+                base = os.path.join(building, name)
+                os.makedirs(base, exist_ok=True)
+                table = arrow_table(frame, self.partition, values)
+                if stale is not None:
+                    table = table.filter(pc.field(self.partition).isin(stale))
+                    self.link_unchanged(previous, name, base, stale)
+                self.write_table(table, base)
+            if display is not None:
+                base = os.path.join(building, DISPLAY_TABLE)
+                os.makedirs(base, exist_ok=True)
+                if stale is not None:
+                    self.link_unchanged(previous, DISPLAY_TABLE, base, stale)
+                members = {}
+                for loan_id, value in values.items():
+                    members.setdefault(value, []).append(loan_id)
+                for value in (stale if stale is not None else sorted(members)):
+                    ids = members.get(value, [])
+                    if ids:
+                        frame = display(ids).reset_index(drop=True).assign(loan_id=ids)
+                        self.write_table(arrow_table(frame, self.partition, values), base)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(building, target)
+            self.values, self.version = values, version
+            remove_versions(self.root, keep={version, previous} if stale is not None else {version})
+
+    def link_unchanged(self, previous, name, base, stale):
+        # Partitions without touched loans come from the previous version.
+        source = os.path.join(version_folder(self.root, previous), name)
+        kept = {partition_folder(source, self.partition, v) for v in stale}
+        for folder in (os.listdir(source) if os.path.isdir(source) else []):
+            if os.path.join(source, folder) not in kept:
+                link_tree(os.path.join(source, folder), os.path.join(base, folder))
+
+    def write_table(self, table, base):
+        if table.num_rows:
+            ds.write_dataset(
+                table, base, format="parquet",
+                partitioning=partitioning(self.partition),
+                basename_template="part-{i}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                max_rows_per_group=ROWS_PER_GROUP, min_rows_per_group=min(ROWS_PER_GROUP, table.num_rows),
+            )
+
+def remove_versions(root, keep):
+    for name in os.listdir(root):
+        match = VERSION_DIR_RE.match(name)
+        if match and int(match.group(1)) not in keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+# ------------------ Query Layer ------------------
+
+class ColumnarStore:
+    # Reads only the requested columns and the partitions / row groups the
+    # filters can match. Batches are reduced as they stream in, so memory
+    # follows the view rather than the book. Each rerun reads the version
+    # directory of its own dataset snapshot through at(version).
+
+    def __init__(self, root, partition="vintage", versions=2):
+        self.lock = threading.Lock()
+        self.root = root
+        self.partition = partition
+        self.versions = versions
+        self.datasets = {}
+
+    def at(self, version):
+        return ColumnarView(self, version)
+
+    def dataset(self, version, name):
+        # File listings are kept for the newest `versions` versions.
+        with self.lock:
+            dataset = self.datasets.get((version, name))
+            if dataset is None:
+                path = os.path.join(version_folder(self.root, version), name)
+                dataset = ds.dataset(path, format="parquet", partitioning=partitioning(self.partition))
+                self.datasets[(version, name)] = dataset
+                newest = sorted({v for v, _ in self.datasets}, reverse=True)[:self.versions]
+                self.datasets = {key: d for key, d in self.datasets.items() if key[0] in newest}
+            return dataset
+
+class ColumnarView:
+    # The store's loans() / display() / stats() against one dataset version.
+
+    def __init__(self, store, version):
+        self.store = store
+        self.version = version
+
+    def dataset(self, name):
+        return self.store.dataset(self.version, name)
+
+    def loans(self, filters, order_by=None, descending=False, columns=("loan_id",)):
+        dataset = self.dataset("loans")
+        known = set(dataset.schema.names)
+        read = [c for c in columns if c in known]
+        if order_by in known and order_by not in read:
+            read.append(order_by)
+        table = dataset.to_table(columns=read, filter=filter_expression(filters))
+        if order_by in known:
+            table = table.take(pc.sort_indices(
+                table, sort_keys=[(order_by, "descending" if descending else "ascending")], null_placement="at_end",
+            ))
+        return table.select([c for c in columns if c in known]).to_pandas()
+
+    def display(self, loan_ids):
+        # Formatted rows for `loan_ids`, in that order.
+        dataset = self.dataset(DISPLAY_TABLE)
+        columns = [c for c in dataset.schema.names if c not in ("loan_id", self.store.partition)]
+        table = dataset.to_table(columns=["loan_id"] + columns, filter=pc.field("loan_id").isin(list(loan_ids)))
+        return table.to_pandas().set_index("loan_id").reindex(list(loan_ids))[columns].reset_index(drop=True)
+
+    def stats(self, filters, metrics=STAT_METRICS, weight=WEIGHT_COLUMN):
+        # Same balance-weighted averages as PortfolioStats, streamed per batch.
+        columns = [column for column, _ in metrics]
+        dataset = self.dataset("loans")
+        num = np.zeros(len(columns))
+        den = np.zeros(len(columns))
+        balance, loans = 0.0, 0
+        for batch in dataset.to_batches(columns=[weight] + columns, filter=filter_expression(filters)):
+            w = np.nan_to_num(batch.column(weight).to_numpy(zero_copy_only=False).astype(np.float64))
+            x = np.column_stack([batch.column(c).to_numpy(zero_copy_only=False).astype(np.float64) for c in columns])
+            present = ~np.isnan(x)
+            num += np.where(present, x, 0.0).T @ w
+            den += present.T @ w
+            balance += w.sum()
+            loans += batch.num_rows
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = np.where(den > 0, num / den, np.nan)
+        stats = {label: float(value) for (_, label), value in zip(metrics, averages)}
+        stats["Loans"] = loans
+        stats["Balance"] = balance
+        return stats
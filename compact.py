@@ -0,0 +1,120 @@
+import json
+import sys
+import zlib
+from collections import Counter
+from collections.abc import Mapping
+
+import pandas as pd
+
+from cache import size_of
+from timing import TIMER
+
+# ------------------ Compaction ------------------
+
+# Provenance keys nothing downstream reads (the loan_id is the key already).
+# Every string leaf feeds full-text search, so content subtrees are kept.
+DROP_KEYS = {"file_name", "filename"}
+# Marker for a list of objects stored as {COLUMNS: [keys, column, column...]}.
+COLUMNS = "\x00columns"
+# Keys and strings up to INTERN_MAX characters seen in two or more loans go
+# into the shared preset dictionary (zlib caps it at 32 KB).
+INTERN_MAX = 64
+DICTIONARY_BYTES = 32 * 1024
+SAMPLE_LOANS = 2000
+
+def to_columns(node):
+    # Lists of objects sharing one key order become column arrays, so row
+    # keys are written once per table instead of once per row.
+    if isinstance(node, dict):
+        return {k: to_columns(v) for k, v in node.items()}
+    if isinstance(node, list):
+        if len(node) > 1 and all(isinstance(row, dict) for row in node):
+            keys = list(node[0])
+            if keys and all(list(row) == keys for row in node):
+                return {COLUMNS: [keys] + [[to_columns(row[k]) for row in node] for k in keys]}
+        return [to_columns(v) for v in node]
+    return node
+
+def from_columns(obj):
+    # json.loads object_hook: runs bottom-up in the decoder, so nested
+    # tables are already rebuilt when their parent is.
+    table = obj.get(COLUMNS)
+    if table is None or len(obj) != 1:
+        return obj
+    keys = table[0]
+    return [dict(zip(keys, row)) for row in zip(*table[1:])]
+
+def shared_tokens(node, tokens):
+    if isinstance(node, dict):
+        for k, v in node.items():
+            tokens.add(json.dumps(k) + ":")
+            shared_tokens(v, tokens)
+    elif isinstance(node, list):
+        for v in node:
+            shared_tokens(v, tokens)
+    elif isinstance(node, str) and len(node) <= INTERN_MAX:
+        tokens.add(json.dumps(node))
+
+def build_dictionary(loans):
+    # Corpus-wide preset dictionary for zlib: field names and repeated values such
+    # as "NAV", "NAP" or "Springing", most frequent last (cheapest to reach).
+    counts = Counter()
+    for i, loan in enumerate(loans):
+        if i >= SAMPLE_LOANS:
+            break
+        tokens = set()
+        shared_tokens(loan, tokens)
+        counts.update(tokens)
+    common = sorted((t for t, c in counts.items() if c >= 2), key=lambda t: (counts[t], t))
+    return "".join(common).encode()[-DICTIONARY_BYTES:]
+
+class Compactor:
+    # Packs a loan into one compressed buffer: unread keys dropped, tables as
+    # columns, then deflate against the shared dictionary. unpack() returns an
+    # ordinary JSON tree, so readers never see the compact form.
+
+    def __init__(self, loans=()):
+        self.dictionary = build_dictionary(loans)
+
+    def pack(self, loan):
+        loan = {k: v for k, v in loan.items() if k not in DROP_KEYS}
+        body = json.dumps(to_columns(loan), separators=(",", ":"), ensure_ascii=False).encode()
+        compressor = zlib.compressobj(6, zdict=self.dictionary) if self.dictionary else zlib.compressobj(6)
+        return compressor.compress(body) + compressor.flush()
+
+    @TIMER.timed("json_load")
+    def unpack(self, blob):
+        decompressor = zlib.decompressobj(zdict=self.dictionary) if self.dictionary else zlib.decompressobj()
+        return json.loads(decompressor.decompress(blob), object_hook=from_columns)
+
+class LoanMap(Mapping):
+    # Read-only loan_id -> loan view over packed loans; each access unpacks a
+    # fresh tree that is freed once the caller is done with it.
+
+    def __init__(self, loans, compactor):
+        self.loans = loans
+        self.compactor = compactor
+
+    def __getitem__(self, loan_id):
+        return self.compactor.unpack(self.loans[loan_id])
+
+    def __contains__(self, loan_id):
+        return loan_id in self.loans
+
+    def __iter__(self):
+        return iter(self.loans)
+
+    def __len__(self):
+        return len(self.loans)
+
+# ------------------ Memory Report ------------------
+
+def loan_memory(loan, blob):
+    # Resident bytes of the parsed tree against the packed buffer.
+    return {"before": size_of(loan), "after": sys.getsizeof(blob)}
+
+def memory_report(sizes):
+    frame = pd.DataFrame.from_dict(sizes, orient="index", columns=["before", "after"])
+    frame.index.name = "loan_id"
+    frame["ratio"] = frame["before"] / frame["after"].where(frame["after"] > 0)
+    return frame.reset_index()
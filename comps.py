@@ -0,0 +1,189 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ingest import to_number, to_date, first_present, loan_property_type, property_type_category, PROPERTY_TYPES
+
+# ------------------ Comp Sources ------------------
+
+# (JSON key, comp property type or None to use the loan's own property type)
+LEASE_COMP_SOURCES = [
+    ("comparable_office_leases", "office"),
+    ("comparable_pdr_leases", "industrial"),
+    ("comparable_retail_leases", "retail"),
+    ("comparable_office_lease_summary", "office"),
+    ("comparable_data_center_lease_summary", "data_center"),
+]
+SALES_COMP_SOURCES = [
+    ("sales_comparables", None),
+    ("comparable_carrier_hotel_data_center_sales", "data_center"),
+    ("comparable_sales_summary", None),
+]
+
+PROPERTY_FIELDS = ["property_name_location", "property", "subject_location", "location", "building_name", "address"]
+LEASE_DATE_FIELDS = ["lease_start_date", "lease_date"]
+SALE_DATE_FIELDS = ["date_of_sale", "transaction_date", "sale_date"]
+TERM_FIELDS = ["term_months", "lease_term_months"]
+LEASE_SIZE_FIELDS = ["tenant_size", "tenant_size_sf", "lease_size_sf"]
+SALE_SIZE_FIELDS = ["total_building_area_sf", "rentable_area_sf"]
+RENT_FIELDS = ["base_rent_psf", "rent_psf"]
+PRICE_FIELDS = ["sales_price", "sale_price"]
+PRICE_PSF_FIELDS = ["sales_price_psf", "sale_price_psf"]
+OCCUPANCY_FIELDS = ["percent_occupied", "occupancy"]
+
+LEASE_COLUMNS = [
+    "loan_id", "source", "property_type", "property", "tenant", "lease_type",
+    "date", "term_months", "size_sf", "rent_psf", "free_rent_months", "ti_psf", "is_subject"
+]
+SALES_COLUMNS = [
+    "loan_id", "source", "property_type", "property", "year_built",
+    "date", "size_sf", "price", "price_psf", "occupancy", "is_subject"
+]
+
+LEASE_FLOAT_COLUMNS = ["term_months", "size_sf", "rent_psf", "free_rent_months", "ti_psf"]
+SALES_FLOAT_COLUMNS = ["size_sf", "price", "price_psf", "occupancy"]
+
+LEASE_FEATURES = ["size_sf", "date", "rent_psf"]
+SALES_FEATURES = ["size_sf", "date", "price_psf"]
+
+def comp_entries(block):
+    # Comp lists come bare, under "leases", or as a subject plus
+    # "comparable_properties".
+    if isinstance(block, list):
+        for entry in block:
+            if isinstance(entry, dict):
+                yield entry, bool(entry.get("is_subject", False))
+    elif isinstance(block, dict):
+        subject = block.get("subject_property")
+        if isinstance(subject, dict):
+            yield subject, True
+        for key in ["leases", "comparable_properties", "comparables"]:
+            for entry in block.get(key) or []:
+                if isinstance(entry, dict):
+                    yield entry, False
+
+def lease_row(loan_id, source, property_type, entry, is_subject):
+    return (
+        loan_id, source, property_type,
+        first_present(entry, PROPERTY_FIELDS) or "",
+        entry.get("tenant_name") or "",
+        entry.get("lease_type") or "",
+        to_date(first_present(entry, LEASE_DATE_FIELDS)),
+        to_number(first_present(entry, TERM_FIELDS)),
+        to_number(first_present(entry, LEASE_SIZE_FIELDS)),
+        to_number(first_present(entry, RENT_FIELDS)),
+        to_number(entry.get("free_rent_months")),
+        to_number(entry.get("ti_psf")),
+        is_subject,
+    )
+
+def sales_row(loan_id, source, property_type, entry, is_subject):
+    return (
+        loan_id, source, property_type,
+        first_present(entry, PROPERTY_FIELDS) or "",
+        str(first_present(entry, ["year_built", "year_built_renovated"]) or ""),
+        to_date(first_present(entry, SALE_DATE_FIELDS)),
+        to_number(first_present(entry, SALE_SIZE_FIELDS)),
+        to_number(first_present(entry, PRICE_FIELDS)),
+        to_number(first_present(entry, PRICE_PSF_FIELDS)),
+        to_number(first_present(entry, OCCUPANCY_FIELDS)),
+        is_subject,
+    )
+
+def typed_comp_table(rows, columns, float_columns):
+    table = pd.DataFrame(rows, columns=columns)
+    table["property_type"] = pd.Categorical(table["property_type"], categories=PROPERTY_TYPES)
+    table["date"] = pd.to_datetime(table["date"].to_numpy(dtype="datetime64[D]"))
+    table["is_subject"] = table["is_subject"].astype(bool)
+    for column in float_columns:
+        table[column] = table[column].astype(np.float64)
+    return table
+
+def build_comps(raw_data):
+    lease_rows, sales_rows = [], []
+    for loan_id, data in raw_data.items():
+        loan_type = property_type_category(loan_property_type(data))
+        for source, comp_type in LEASE_COMP_SOURCES:
+            for entry, is_subject in comp_entries(data.get(source)):
+                lease_rows.append(lease_row(loan_id, source, comp_type or loan_type, entry, is_subject))
+        for source, comp_type in SALES_COMP_SOURCES:
+            for entry, is_subject in comp_entries(data.get(source)):
+                sales_rows.append(sales_row(loan_id, source, comp_type or loan_type, entry, is_subject))
+    return (
+        typed_comp_table(lease_rows, LEASE_COLUMNS, LEASE_FLOAT_COLUMNS),
+        typed_comp_table(sales_rows, SALES_COLUMNS, SALES_FLOAT_COLUMNS),
+    )
+
+# ------------------ Comp Index ------------------
+
+def nearest(matrix, point, k, weights=None, rows=None, block_size=65536):
+    # Top-k rows of `matrix` by weighted Euclidean distance to `point`,
+    # computed in row blocks so memory stays flat on large tables.
+    rows = np.arange(len(matrix)) if rows is None else np.asarray(rows)
+    weights = np.ones(matrix.shape[1]) if weights is None else weights
+    best_rows = np.empty(0, dtype=np.int64)
+    best_dist = np.empty(0)
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        dist = (((matrix[block] - point) ** 2) * weights).sum(axis=1)
+        best_rows = np.concatenate([best_rows, block])
+        best_dist = np.concatenate([best_dist, dist])
+        if len(best_rows) > k:
+            keep = np.argpartition(best_dist, k)[:k]
+            best_rows, best_dist = best_rows[keep], best_dist[keep]
+    order = np.argsort(best_dist, kind="stable")
+    return best_rows[order], np.sqrt(best_dist[order])
+
+def feature_column(name, values):
+    # Dates become fractional months, sizes go on a log scale.
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        months = values.astype("datetime64[M]").astype(np.float64)
+        months[np.isnat(values)] = np.nan
+        return months
+    values = values.astype(np.float64)
+    if name == "size_sf":
+        return np.log(np.where(values > 0, values, np.nan))
+    return values
+
+class CompIndex:
+    def __init__(self, table, features):
+        self.table = table.reset_index(drop=True)
+        self.features = features
+        raw = np.column_stack(
+            [feature_column(f, self.table[f].to_numpy()) for f in features]
+        ) if len(self.table) else np.empty((0, len(features)))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.mean = np.nan_to_num(np.nanmean(raw, axis=0)) if len(raw) else np.zeros(len(features))
+            std = np.nanstd(raw, axis=0) if len(raw) else np.ones(len(features))
+        self.std = np.where((std > 0) & np.isfinite(std), std, 1.0)
+        # Missing features sit at the column mean so they never dominate a distance.
+        self.matrix = np.nan_to_num((raw - self.mean) / self.std)
+        self.loan_ids = self.table["loan_id"].to_numpy()
+        self.by_type = {
+            name: np.asarray(rows) for name, rows in
+            self.table.groupby("property_type", observed=True).indices.items()
+        }
+
+    def of_type(self, property_type):
+        return self.table.iloc[self.by_type.get(property_type, np.empty(0, dtype=np.int64))]
+
+    def query(self, point, k=10, property_type=None, loan_id=None):
+        # `point` maps feature names to values; features left out are ignored.
+        # Pass the subject's `loan_id` to leave its own comps out of the result.
+        values = np.array([
+            feature_column(f, [np.datetime64(point[f], "D") if f == "date" else point[f]])[0]
+            if f in point else np.nan
+            for f in self.features
+        ])
+        weights = np.where(np.isnan(values), 0.0, 1.0)
+        target = np.nan_to_num((values - self.mean) / self.std)
+        rows = self.by_type.get(property_type, np.empty(0, dtype=np.int64)) if property_type else np.arange(len(self.table))
+        if loan_id is not None:
+            rows = rows[self.loan_ids[rows] != loan_id]
+        found, dist = nearest(self.matrix, target, k, weights, rows)
+        result = self.table.iloc[found].copy()
+        result["distance"] = dist
+        return result
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+import weakref
+
+from compact import Compactor, LoanMap, loan_memory, memory_report
+from timing import TIMER
+
+# ------------------ Deal Files ------------------
+
+def scan(source):
+    # (mtime_ns, size) for the source file, or for every *.json under the
+    # source directory (hidden files and folders such as .cache are skipped).
+    if os.path.isfile(source):
+        stat = os.stat(source)
+        return {source: (stat.st_mtime_ns, stat.st_size)}
+    signatures = {}
+    for folder, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in files:
+            if name.endswith(".json") and not name.startswith("."):
+                path = os.path.join(folder, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signatures[path] = (stat.st_mtime_ns, stat.st_size)
+    return signatures
+
+@TIMER.timed("json_load")
+def read_loans(path):
+    # A file holding one loan carries its own "loan_id"; anything else is a
+    # deal file (or the combined file) mapping loan_id -> loan.
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    if "loan_id" in data:
+        return {str(data["loan_id"]): data}
+    return {loan_id: loan for loan_id, loan in data.items() if isinstance(loan, dict)}
+
+# ------------------ Dataset ------------------
+
+class Dataset:
+    # Loans from one combined JSON file or a directory of deal files. refresh()
+    # re-reads only files whose mtime/size changed and bumps the version when a
+    # loan is added, changed or removed. Each loan remembers the version it
+    # last changed in, so long-lived engines replay just those loans. With
+    # compact=True loans are held packed (see compact.py) and snapshots
+    # unpack one loan at a time.
+
+    def __init__(self, source, compact=True):
+        self.source = source
+        self.compact = compact
+        self.compactor = None
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.signatures = {}
+        self.file_loans = {}
+        self.data = {}
+        self.version = 0
+        self.changed_at = {}
+        self.seen = weakref.WeakKeyDictionary()
+        self.watcher = None
+        # Seconds the last refresh that read files took (scan, parse, pack).
+        self.load_seconds = 0.0
+        self.refresh()
+
+    def snapshot(self):
+        # The loans dict is replaced, never mutated, so a rerun can keep using
+        # its snapshot while the watcher applies newer files.
+        with self.lock:
+            if self.compact:
+                return self.version, LoanMap(self.data, self.compactor)
+            return self.version, self.data
+
+    def refresh(self):
+        # Scanning, parsing and packing run under refresh_lock only, so
+        # snapshot() keeps answering during a reload; self.lock is held just
+        # long enough to swap in the new state. Only refresh() writes
+        # signatures, file_loans, data and compactor, so reading them under
+        # refresh_lock alone is safe.
+        with self.refresh_lock:
+            started = time.perf_counter()
+            signatures = scan(self.source) if os.path.exists(self.source) else {}
+            stale = [p for p, sig in signatures.items() if self.signatures.get(p) != sig]
+            gone = [p for p in self.signatures if p not in signatures]
+            if not stale and not gone:
+                return 0
+            file_loans = dict(self.file_loans)
+            for path in gone:
+                file_loans.pop(path, None)
+            fresh = {}
+            for path in stale:
+                try:
+                    fresh[path] = read_loans(path)
+                except (OSError, ValueError):
+                    # Half-written or malformed: keep what we had and retry
+                    # on the next poll.
+                    if path in self.signatures:
+                        signatures[path] = self.signatures[path]
+                    else:
+                        del signatures[path]
+            compactor, memory = self.compactor, {}
+            if self.compact:
+                if compactor is None:
+                    # The shared dictionary comes from the first load and stays
+                    # fixed, so every packed loan can still be read back.
+                    compactor = Compactor(loan for loans in fresh.values() for loan in loans.values())
+                for path, loans in fresh.items():
+                    packed = {}
+                    for loan_id, loan in loans.items():
+                        packed[loan_id] = compactor.pack(loan)
+                        memory[loan_id] = loan_memory(loan, packed[loan_id])
+                    fresh[path] = packed
+            file_loans.update(fresh)
+            data = {}
+            for path in sorted(file_loans):
+                data.update(file_loans[path])
+            touched = [
+                loan_id for loan_id, loan in data.items()
+                if self.data.get(loan_id) is not loan and self.data.get(loan_id) != loan
+            ]
+            touched += [loan_id for loan_id in self.data if loan_id not in data]
+
+            with self.lock:
+                self.signatures, self.file_loans, self.compactor = signatures, file_loans, compactor
+                self.memory.update(memory)
+                for loan_id in self.data:
+                    if loan_id not in data:
+                        self.memory.pop(loan_id, None)
+                if touched:
+                    self.version += 1
+                    self.data = data
+                    for loan_id in touched:
+                        self.changed_at[loan_id] = self.version
+                self.load_seconds = time.perf_counter() - started
+            return len(touched)
+
+    def status(self):
+        with self.lock:
+            return {"version": self.version, "loans": len(self.data), "load_seconds": self.load_seconds}
+
+    def memory_report(self):
+        # Per-loan bytes as parsed vs as held (empty when not compacting).
+        with self.lock:
+            return memory_report(dict(self.memory))
+
+    def touched(self, version):
+        # Loans added, changed or removed after `version`.
+        with self.lock:
+            return [loan_id for loan_id, v in self.changed_at.items() if v > version]
+
+    def watch(self, interval):
+        # Polls for changes on a daemon thread (portable, no inotify needed).
+        with self.lock:
+            if self.watcher is not None:
+                return
+            self.watcher = threading.Thread(target=self.poll, args=(interval,), daemon=True)
+        self.watcher.start()
+
+    def poll(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except OSError:
+                pass
+
+    # ------------------ Engine Sync ------------------
+
+    def track(self, engine, version):
+        with self.sync_lock:
+            self.seen[engine] = version
+
+    def sync(self, engine, version, raw_data, apply):
+        # Brings a long-lived engine from the version it last saw to the
+        # caller's snapshot: apply(changed ids, removed ids) runs once across
+        # sessions, and loans touched after the snapshot are replayed from it.
+        with self.sync_lock:
+            seen = self.seen.get(engine, version)
+            if version > seen:
+                touched = self.touched(seen)
+                apply([i for i in touched if i in raw_data], [i for i in touched if i not in raw_data])
+                self.seen[engine] = version
+        return engine
@@ -0,0 +1,118 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Rollover Matrix ------------------
+
+def rollover_matrix(rollover, loan_ids, start_years):
+    # Loans x contiguous years of % of UW base rent expiring. MTM leases can
+    # leave at any time, so they land in the loan's first year.
+    start = pd.Series(start_years, index=loan_ids)
+    years = rollover["year"].fillna(rollover["loan_id"].map(start))
+    table = rollover.assign(year=years).dropna(subset=["year"])
+    matrix = table.pivot_table(index="loan_id", columns="year", values="rent_pct", aggfunc="sum")
+    if len(table):
+        matrix = matrix.reindex(columns=np.arange(table["year"].min(), table["year"].max() + 1))
+    matrix = matrix.reindex(index=loan_ids).fillna(0.0).astype(np.float64)
+    matrix.columns = matrix.columns.astype(int)
+    return matrix
+
+def rollover_by_year(matrix, balances, mask=None):
+    # Balance-weighted rent rolling per year across the book (or a filtered view).
+    weights = np.nan_to_num(np.asarray(balances, dtype=np.float64))
+    if mask is not None:
+        weights = weights * mask
+    return pd.Series(weights @ matrix.to_numpy() / 100, index=matrix.columns)
+
+def rollover_in_term(matrix, start_years, maturity_years):
+    # Share of rent expiring between the first loan year and maturity. A
+    # "thereafter" bucket starting inside the term counts in full.
+    years = matrix.columns.to_numpy()[None, :]
+    start = np.asarray(start_years, dtype=np.float64)[:, None]
+    end = np.asarray(maturity_years, dtype=np.float64)[:, None]
+    in_term = (years >= np.nan_to_num(start, nan=-np.inf)) & (years <= np.nan_to_num(end, nan=np.inf))
+    return (matrix.to_numpy() * in_term).sum(axis=1)
+
+# ------------------ Tenant Matrix ------------------
+
+TENANT_SUFFIX_RE = re.compile(r"\b(inc|llc|lp|ltd|corp|corporation|co|company|the)\b")
+
+def tenant_key(name):
+    key = re.sub(r"[^a-z0-9 ]+", " ", str(name).lower())
+    return " ".join(TENANT_SUFFIX_RE.sub(" ", key).split())
+
+def tenant_matrix(ratings, loan_ids):
+    # Tenants x loans rent share (%) kept as coordinate arrays; most tenants
+    # appear in one loan, so a dense matrix would be almost all zeros.
+    tenants = ratings[ratings["kind"] == "tenant"]
+    keys = tenants["tenant"].map(tenant_key).to_numpy()
+    tenant_codes, tenant_keys = pd.factorize(keys)
+    loan_codes = pd.Index(loan_ids).get_indexer(tenants.index)
+    present = (loan_codes >= 0) & (tenant_codes >= 0)
+    names = tenants["tenant"].groupby(tenant_codes).first()
+    return {
+        "tenants": names.reindex(range(len(tenant_keys))).to_numpy(),
+        "loan_ids": np.asarray(loan_ids),
+        "rows": tenant_codes[present],
+        "cols": loan_codes[present],
+        "share": np.nan_to_num(tenants["rent_share"].to_numpy(dtype=np.float64)[present]),
+    }
+
+def dense_tenant_matrix(matrix, tenants=None):
+    rows = np.arange(len(matrix["tenants"])) if tenants is None else np.asarray(tenants)
+    keep = np.isin(matrix["rows"], rows)
+    lookup = np.full(len(matrix["tenants"]), -1)
+    lookup[rows] = np.arange(len(rows))
+    dense = np.zeros((len(rows), len(matrix["loan_ids"])))
+    np.add.at(dense, (lookup[matrix["rows"][keep]], matrix["cols"][keep]), matrix["share"][keep])
+    return pd.DataFrame(dense, index=matrix["tenants"][rows], columns=matrix["loan_ids"])
+
+# ------------------ Concentration ------------------
+
+def concentration(matrix):
+    # Per loan: top tenant share, HHI (0-10,000) and tenants listed. Term
+    # sheets list only the largest tenants, so HHI is a lower bound.
+    n_loans = len(matrix["loan_ids"])
+    cols, share = matrix["cols"], matrix["share"]
+    top = np.zeros(n_loans)
+    np.maximum.at(top, cols, share)
+    top_tenant = np.full(n_loans, "", dtype=object)
+    is_top = share == top[cols]
+    top_tenant[cols[is_top][::-1]] = matrix["tenants"][matrix["rows"][is_top]][::-1]
+    return pd.DataFrame({
+        "top_tenant": top_tenant,
+        "top_tenant_share": top,
+        "hhi": np.bincount(cols, weights=share ** 2, minlength=n_loans),
+        "tenants_listed": np.bincount(cols, minlength=n_loans),
+    }, index=pd.Index(matrix["loan_ids"], name="loan_id"))
+
+def book_tenant_exposure(matrix, balances):
+    # Balance attributable to each tenant across the book (balance x rent share).
+    balances = np.nan_to_num(np.asarray(balances, dtype=np.float64))
+    n_tenants = len(matrix["tenants"])
+    exposure = np.bincount(matrix["rows"], weights=balances[matrix["cols"]] * matrix["share"] / 100, minlength=n_tenants)
+    return pd.DataFrame({
+        "tenant": matrix["tenants"],
+        "loans": np.bincount(matrix["rows"], minlength=n_tenants),
+        "balance_exposure": exposure,
+    }).sort_values("balance_exposure", ascending=False, kind="stable").reset_index(drop=True)
+
+def build_exposure(rollover, ratings, loan_terms, financials):
+    loan_ids = list(loan_terms.index)
+    start = loan_terms["first_payment"].dt.year.to_numpy(dtype=np.float64)
+    maturity = loan_terms["anticipated_repayment"].fillna(loan_terms["maturity"]).dt.year.to_numpy(dtype=np.float64)
+    balances = financials.reindex(loan_ids)["balance"].to_numpy(dtype=np.float64)
+
+    rollover_by_loan = rollover_matrix(rollover, loan_ids, start)
+    tenants = tenant_matrix(ratings, loan_ids)
+    loans = concentration(tenants)
+    loans["rollover_in_term"] = rollover_in_term(rollover_by_loan, start, maturity)
+    loans["balance"] = balances
+    return {
+        "rollover": rollover_by_loan,
+        "rollover_by_year": rollover_by_year(rollover_by_loan, balances),
+        "tenants": tenants,
+        "loans": loans,
+        "book_tenants": book_tenant_exposure(tenants, balances),
+    }
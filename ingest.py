@@ -0,0 +1,721 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Value Parsing ------------------
+
+NUMBER_RE = re.compile(r"^\(?\s*-?\s*\$?\s*(\d[\d,]*\.?\d*|\.\d+)")
+
+def to_number(val):
+    if isinstance(val, bool) or val is None:
+        return np.nan
+    if isinstance(val, (int, float)):
+        return float(val)
+    if not isinstance(val, str):
+        return np.nan
+    text = val.strip()
+    match = NUMBER_RE.match(text)
+    if not match:
+        return np.nan
+    number = float(match.group(1).replace(",", ""))
+    if text.startswith("(") or text.lstrip("($ ").startswith("-"):
+        number = -number
+    return number
+
+MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})(?:-(\d{1,2}))?")
+US_DATE_RE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{2,4})")
+MONTH_YEAR_RE = re.compile(r"([A-Za-z]{3})[A-Za-z]*\.?[\s\-]+(?:(\d{1,2})(?:,\s*|\s+))?(\d{4}|\d{2})\b")
+
+def full_year(year):
+    year = int(year)
+    return year + 2000 if year < 100 else year
+
+def to_date(val):
+    # "2031-01-01", "1/6/2031", "January 6, 2030", "May 31 2030", "Jan 6,2030",
+    # "Aug-19" and "Dec. 2021" all map to datetime64[D]; month-only dates fall on the 1st.
+    if not isinstance(val, str):
+        return np.datetime64("NaT")
+    text = val.strip()
+    try:
+        match = ISO_DATE_RE.search(text)
+        if match:
+            year, month, day = match.groups()
+            return np.datetime64(f"{int(year):04d}-{int(month):02d}-{int(day or 1):02d}")
+        match = US_DATE_RE.search(text)
+        if match:
+            month, day, year = match.groups()
+            return np.datetime64(f"{full_year(year):04d}-{int(month):02d}-{int(day):02d}")
+        match = MONTH_YEAR_RE.search(text)
+        if match and match.group(1).lower() in MONTHS:
+            month = MONTHS[match.group(1).lower()]
+            day = int(match.group(2) or 1)
+            return np.datetime64(f"{full_year(match.group(3)):04d}-{month:02d}-{day:02d}")
+    except ValueError:
+        pass
+    return np.datetime64("NaT")
+
+def slug(label):
+    return re.sub(r"[^a-z0-9]+", "_", str(label).lower()).strip("_")
+
+MISSING_TEXT = {"", "nap", "nav", "n/a", "na", "none"}
+
+def first_present(entry, fields):
+    for field in fields:
+        val = entry.get(field)
+        if val is None or (isinstance(val, str) and val.strip().lower() in MISSING_TEXT):
+            continue
+        return val
+    return None
+
+# ------------------ Property Type ------------------
+
+PROPERTY_TYPE_PATHS = [
+    ("mortgaged_property_info", "property_type_subtype"),
+    ("mortgaged_property_information", "property_type"),
+    ("property_information", "property_type_subtype"),
+    ("property_information", "property_type"),
+    ("property_information", "detailed_property_type"),
+    ("property_information", "general_property_type"),
+]
+
+# Checked in order, so "Office/Data Center" lands in data_center.
+PROPERTY_TYPE_KEYWORDS = [
+    ("data_center", ["data center", "data centre", "colocation", "carrier hotel", "powered shell"]),
+    ("hotel", ["hotel", "hospitality"]),
+    ("multifamily", ["multifamily", "apartment"]),
+    ("industrial", ["industrial", "warehouse", "pdr", "flex"]),
+    ("retail", ["retail"]),
+    ("office", ["office"]),
+    ("mixed_use", ["mixed use", "mixed-use"]),
+]
+PROPERTY_TYPES = [category for category, _ in PROPERTY_TYPE_KEYWORDS] + ["other"]
+
+def property_type_category(text):
+    text = str(text or "").lower()
+    for category, keywords in PROPERTY_TYPE_KEYWORDS:
+        if any(k in text for k in keywords):
+            return category
+    return "other"
+
+def loan_property_type(data):
+    for section, field in PROPERTY_TYPE_PATHS:
+        val = (data.get(section) or {}).get(field)
+        if val:
+            return val
+    return ""
+
+# ------------------ Sources & Uses ------------------
+
+SIDES = ["sources", "uses"]
+SOURCES_USES_COLUMNS = ["loan_id", "side", "line_item", "amount", "pct", "is_total"]
+
+LINE_LABEL_FIELDS = ["type", "source", "use"]
+LINE_AMOUNT_FIELDS = ["amount", "proceeds"]
+LINE_PCT_FIELDS = ["percentage", "percent", "percent_of_total", "percentage_of_total"]
+
+# Amounts agree to the dollar. A loan whose every amount is a whole thousand
+# was rounded to the nearest thousand, so each line may be off by up to half
+# of ROUNDING_UNIT.
+AMOUNT_TOLERANCE = 1.0
+ROUNDING_UNIT = 1000.0
+PCT_TOLERANCE = 0.5
+
+def first_field(entry, fields):
+    for field in fields:
+        if field in entry:
+            return entry[field]
+    return None
+
+def sources_uses_lines(side, block, totals):
+    # Yields (line_item, amount, pct, is_total) for one side in any of the
+    # dict-of-dicts, dict-of-scalars and list-of-rows layouts.
+    total_key = f"total_{side}"
+    if isinstance(block, dict):
+        for key, entry in block.items():
+            if isinstance(entry, dict):
+                amount = first_field(entry, LINE_AMOUNT_FIELDS)
+                pct = first_field(entry, LINE_PCT_FIELDS)
+            else:
+                amount, pct = entry, None
+            yield slug(key), to_number(amount), to_number(pct), key == total_key
+    elif isinstance(block, list):
+        for entry in block:
+            if isinstance(entry, dict):
+                label = first_field(entry, LINE_LABEL_FIELDS)
+                amount = first_field(entry, LINE_AMOUNT_FIELDS)
+                pct = first_field(entry, LINE_PCT_FIELDS)
+                yield slug(label), to_number(amount), to_number(pct), False
+
+    total = totals.get(total_key)
+    if total is not None and not (isinstance(block, dict) and total_key in block):
+        if isinstance(total, dict):
+            yield total_key, to_number(first_field(total, LINE_AMOUNT_FIELDS)), to_number(first_field(total, LINE_PCT_FIELDS)), True
+        else:
+            yield total_key, to_number(total), np.nan, True
+
+def build_sources_uses(raw_data):
+    rows = []
+    for loan_id, data in raw_data.items():
+        block = data.get("sources_and_uses")
+        if not isinstance(block, dict):
+            continue
+        for side in SIDES:
+            for line_item, amount, pct, is_total in sources_uses_lines(side, block.get(side), block):
+                rows.append((loan_id, side, line_item, amount, pct, is_total))
+
+    table = pd.DataFrame(rows, columns=SOURCES_USES_COLUMNS)
+    table["side"] = pd.Categorical(table["side"], categories=SIDES)
+    table["amount"] = table["amount"].astype(np.float64)
+    table["pct"] = table["pct"].astype(np.float64)
+    table["is_total"] = table["is_total"].astype(bool)
+    return table
+
+def check_sources_uses(table, amount_tol=AMOUNT_TOLERANCE, rounding_unit=ROUNDING_UNIT, pct_tol=PCT_TOLERANCE):
+    lines = table[~table["is_total"]]
+    totals = table[table["is_total"]]
+
+    line_sums = lines.pivot_table(index="loan_id", columns="side", values="amount", aggfunc="sum", observed=False)
+    pct_sums = lines.pivot_table(index="loan_id", columns="side", values="pct", aggfunc="sum", observed=False)
+    reported = totals.pivot_table(index="loan_id", columns="side", values="amount", aggfunc="first", observed=False)
+
+    loans = table["loan_id"].unique()
+    line_sums = line_sums.reindex(index=loans, columns=SIDES)
+    pct_sums = pct_sums.reindex(index=loans, columns=SIDES)
+    reported = reported.reindex(index=loans, columns=SIDES)
+
+    sums = line_sums.to_numpy()
+    pcts = pct_sums.to_numpy()
+    rep = reported.to_numpy()
+
+    # Missing reported totals or percentages are not counted as failures.
+    amounts = table["amount"]
+    rounded = (amounts.isna() | (amounts % rounding_unit == 0)).groupby(table["loan_id"], sort=False).all()
+    rounded = rounded.reindex(loans).to_numpy()
+    line_counts = lines.groupby("loan_id", sort=False).size().reindex(loans).fillna(0).to_numpy()
+    tol = np.where(rounded, np.maximum(amount_tol, rounding_unit / 2 * line_counts), amount_tol)
+    balanced = np.abs(sums[:, 0] - sums[:, 1]) <= tol
+    matches_reported = np.isnan(rep) | (np.abs(sums - rep) <= tol[:, None])
+    pct_ok = np.isnan(pcts) | (pcts == 0) | (np.abs(pcts - 100.0) <= pct_tol)
+
+    checks = pd.DataFrame({
+        "total_sources": sums[:, 0],
+        "total_uses": sums[:, 1],
+        "reported_sources": rep[:, 0],
+        "reported_uses": rep[:, 1],
+        "sources_pct": pcts[:, 0],
+        "uses_pct": pcts[:, 1],
+        "balanced": balanced,
+        "sources_match_reported": matches_reported[:, 0],
+        "uses_match_reported": matches_reported[:, 1],
+        "sources_pct_ok": pct_ok[:, 0],
+        "uses_pct_ok": pct_ok[:, 1],
+    }, index=pd.Index(loans, name="loan_id"))
+    checks["ok"] = checks[[
+        "balanced", "sources_match_reported", "uses_match_reported", "sources_pct_ok", "uses_pct_ok"
+    ]].all(axis=1)
+    return checks
+
+# ------------------ Escrows & Reserves ------------------
+
+RESERVE_TYPES = ["taxes", "insurance", "replacement_reserves", "ti_lc", "other"]
+ESCROW_COLUMNS = ["loan_id", "reserve_type", "initial", "monthly", "cap", "springing"]
+
+RESERVE_ALIASES = {
+    "taxes": "taxes",
+    "re_tax": "taxes",
+    "real_estate_taxes": "taxes",
+    "insurance": "insurance",
+    "replacement_reserves": "replacement_reserves",
+    "replacement_capex": "replacement_reserves",
+    "capex": "replacement_reserves",
+    "ti_lc": "ti_lc",
+    "tilc": "ti_lc",
+    "other": "other",
+}
+
+ESCROW_PATHS = [
+    ("escrows_and_reserves",),
+    ("reserves",),
+    ("mortgage_loan_information", "escrows"),
+]
+
+INITIAL_FIELDS = ["initial", "upfront"]
+MONTHLY_FIELDS = ["monthly"]
+CAP_FIELDS = ["cap", "initial_cap"]
+
+def escrow_block(data):
+    for path in ESCROW_PATHS:
+        ref = data
+        for key in path:
+            ref = ref.get(key) if isinstance(ref, dict) else None
+        if ref:
+            return ref
+    return None
+
+def escrow_entries(block):
+    if isinstance(block, dict):
+        for key, entry in block.items():
+            if isinstance(entry, dict):
+                yield key, entry
+    elif isinstance(block, list):
+        for entry in block:
+            if isinstance(entry, dict):
+                yield entry.get("type", "other"), entry
+
+def is_springing(*values):
+    return any(isinstance(v, str) and "springing" in v.lower() for v in values)
+
+def build_escrows(raw_data):
+    rows = []
+    for loan_id, data in raw_data.items():
+        for key, entry in escrow_entries(escrow_block(data)):
+            reserve_type = RESERVE_ALIASES.get(slug(key), "other")
+            initial = first_field(entry, INITIAL_FIELDS)
+            monthly = first_field(entry, MONTHLY_FIELDS)
+            cap = first_field(entry, CAP_FIELDS)
+            rows.append((
+                loan_id, reserve_type, to_number(initial), to_number(monthly), to_number(cap),
+                is_springing(initial, monthly, cap)
+            ))
+
+    table = pd.DataFrame(rows, columns=ESCROW_COLUMNS)
+    table["reserve_type"] = pd.Categorical(table["reserve_type"], categories=RESERVE_TYPES)
+    for column in ["initial", "monthly", "cap"]:
+        table[column] = table[column].astype(np.float64)
+    table["springing"] = table["springing"].astype(bool)
+    return table
+
+# ------------------ Occupancy History ------------------
+
+OCCUPANCY_HISTORY_PATHS = [
+    ("historical_occupancy",),
+    ("occupancy_history",),
+    ("property_information", "occupancy_history"),
+    ("historical_leased_percent",),
+    ("underwriting_and_financial_information", "occupancy_history"),
+]
+PROPERTY_SECTIONS = ["mortgaged_property_info", "mortgaged_property_information", "property_information"]
+
+OCCUPANCY_VALUE_FIELDS = ["percent", "occupancy", "current", "value"]
+OCCUPANCY_DATE_FIELDS = ["date", "as_of"]
+CURRENT_KEYS = {"current", "most_recent"}
+
+YEAR_RE = re.compile(r"^(?:ye_)?(\d{4})(?:_occupancy)?$")
+AS_OF_RE = re.compile(r"as_of_(\d{1,2})_(\d{1,2})_(\d{2,4})")
+TRAILING_DATE_RE = re.compile(r"\(([^)]*)\)\s*$")
+
+def year_end(year):
+    return np.datetime64(f"{int(year):04d}-12-31")
+
+def occupancy_key_date(key, current_date):
+    key = str(key).lower()
+    match = YEAR_RE.match(key)
+    if match:
+        return year_end(match.group(1))
+    match = AS_OF_RE.search(key)
+    if match:
+        return to_date("/".join(match.groups()))
+    if key in CURRENT_KEYS or key.startswith("current_occupancy"):
+        return current_date
+    return to_date(key)
+
+def current_occupancy_date(data):
+    for section in PROPERTY_SECTIONS:
+        date = to_date((data.get(section) or {}).get("occupancy_date"))
+        if not np.isnat(date):
+            return date
+    return np.datetime64("NaT")
+
+def occupancy_observations(data):
+    # Yields (date, occupancy %) from every occupancy layout; NAV/NAP give NaN.
+    current_date = current_occupancy_date(data)
+    for path in OCCUPANCY_HISTORY_PATHS:
+        block = data
+        for key in path:
+            block = block.get(key) if isinstance(block, dict) else None
+        if isinstance(block, dict):
+            entries = block.items()
+        elif isinstance(block, list):
+            entries = [(None, entry) for entry in block]
+        else:
+            continue
+        for key, entry in entries:
+            if isinstance(entry, dict):
+                value = first_field(entry, OCCUPANCY_VALUE_FIELDS)
+                date = to_date(first_field(entry, OCCUPANCY_DATE_FIELDS))
+                if np.isnat(date) and key is not None:
+                    date = occupancy_key_date(key, current_date)
+            else:
+                value, date = entry, occupancy_key_date(key, current_date)
+            if not np.isnat(date) and not isinstance(value, (dict, list)):
+                yield date, to_number(value)
+
+    for section in PROPERTY_SECTIONS:
+        fields = data.get(section)
+        if not isinstance(fields, dict):
+            continue
+        for key, value in fields.items():
+            if not isinstance(value, (str, int, float)) or "occupancy" not in key:
+                continue
+            if key.startswith("ye_"):
+                yield occupancy_key_date(key, current_date), to_number(value)
+            elif "_as_of" in key:
+                match = TRAILING_DATE_RE.search(str(value))
+                date = to_date(match.group(1)) if match else occupancy_key_date(key, current_date)
+                if not np.isnat(date):
+                    yield date, to_number(value)
+        if "occupancy_percent" in fields and not np.isnat(current_date):
+            yield current_date, to_number(fields["occupancy_percent"])
+
+def build_occupancy_history(raw_data):
+    rows = [
+        (loan_id, date, value)
+        for loan_id, data in raw_data.items()
+        for date, value in occupancy_observations(data)
+    ]
+    table = pd.DataFrame(rows, columns=["loan_id", "date", "occupancy"])
+    table["date"] = pd.to_datetime(table["date"].to_numpy(dtype="datetime64[D]"))
+    table["occupancy"] = table["occupancy"].astype(np.float64)
+    # The same observation often appears in two layouts; keep one per date,
+    # preferring a reported number over NAV.
+    table = table.sort_values(["loan_id", "date", "occupancy"], na_position="first")
+    return table.drop_duplicates(["loan_id", "date"], keep="last").reset_index(drop=True)
+
+def build_occupancy_panel(history, loan_ids=None):
+    # Loans x years; each cell is the latest observation in that year.
+    latest = history.assign(year=history["date"].dt.year).drop_duplicates(["loan_id", "year"], keep="last")
+    panel = latest.pivot(index="loan_id", columns="year", values="occupancy")
+    if len(latest):
+        panel = panel.reindex(columns=range(latest["year"].min(), latest["year"].max() + 1))
+    if loan_ids is not None:
+        panel = panel.reindex(index=loan_ids)
+    return panel.astype(np.float64)
+
+def occupancy_changes(panel):
+    values = panel.to_numpy()
+    return pd.DataFrame(values[:, 1:] - values[:, :-1], index=panel.index, columns=panel.columns[1:])
+
+def occupancy_trend(panel, weights=None):
+    values = panel.to_numpy()
+    present = ~np.isnan(values)
+    w = np.ones(len(values)) if weights is None else np.nan_to_num(np.asarray(weights, dtype=np.float64))
+    w = present * w[:, None]
+    total = w.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(total > 0, (np.nan_to_num(values) * w).sum(axis=0) / total, np.nan)
+    return pd.DataFrame({
+        "occupancy": mean,
+        "loans": present.sum(axis=0),
+    }, index=panel.columns)
+
+# ------------------ Financials ------------------
+
+FINANCIAL_COLUMNS = ["balance", "whole_loan_balance", "senior_balance", "noi", "ncf", "appraised_value"]
+
+# Candidate paths per column, checked in order; the first number wins.
+FINANCIAL_PATHS = {
+    "balance": [
+        ("cut_off_date_balance",),
+        ("mortgage_loan_information", "cut_off_date_principal_balance"),
+        ("mortgage_loan_information", "cut_off_date_balance"),
+        ("mortgage_loan_information", "cut_off_balance"),
+        ("loan_summary", "cut_off_date_principal_balance"),
+        ("loan_summary", "cut_off_balance"),
+        ("original_principal_balance",),
+        ("mortgage_loan_information", "original_principal_balance"),
+        ("mortgage_loan_information", "original_balance"),
+    ],
+    "whole_loan_balance": [
+        ("loan_combination_summary", "total", "cut_off_date_balance"),
+        ("whole_loan_summary", "whole_loan", "cut_off_date_balance"),
+        ("whole_loan_summary", "total", "cut_off_date_balance"),
+        ("whole_loan_summary", "whole_loan_total"),
+        ("financial_information", "whole_loan", "total_balance"),
+    ],
+    "senior_balance": [
+        ("loan_combination_summary", "total_senior_notes", "cut_off_date_balance"),
+        ("whole_loan_summary", "total_senior_notes", "cut_off_date_balance"),
+    ],
+    "noi": [
+        ("underwriting_financial_info", "uw_nob"),
+        ("underwriting_financial_info", "uw_noi"),
+        ("mortgaged_property_information", "underwritten_noi"),
+        ("property_information", "uw_noi"),
+        ("property_information", "underwritten_noi"),
+        ("property_information", "underwritten_metrics", "uw_noi"),
+        ("underwriting_and_financial_information", "uw_noi"),
+    ],
+    "ncf": [
+        ("underwriting_financial_info", "uw_ncf"),
+        ("mortgaged_property_information", "underwritten_ncf"),
+        ("property_information", "uw_ncf"),
+        ("property_information", "underwritten_ncf"),
+        ("property_information", "underwritten_metrics", "uw_ncf"),
+        ("underwriting_and_financial_information", "uw_ncf"),
+    ],
+    "appraised_value": [
+        ("mortgaged_property_info", "as_is_appraised_value"),
+        ("mortgaged_property_information", "appraised_value"),
+        ("appraisal", "appraised_value"),
+        ("property_information", "appraised_value"),
+        ("property_information", "appraisal", "value"),
+        ("underwriting_and_financial_information", "appraised_value", "value"),
+        ("underwriting_and_financial_information", "appraised_value"),
+    ],
+}
+
+def get_in(data, path):
+    ref = data
+    for key in path:
+        ref = ref.get(key) if isinstance(ref, dict) else None
+    return ref
+
+def first_number(data, paths):
+    for path in paths:
+        number = to_number(get_in(data, path))
+        if not np.isnan(number):
+            return number
+    return np.nan
+
+# B, C, ... notes in a whole-loan note table; "Total Senior Notes" rows and
+# the A notes are not matched.
+SUBORDINATE_NOTE_RE = re.compile(r"^(?:note\s+)?[b-z]\b", re.IGNORECASE)
+NOTE_TABLE_PATHS = [("whole_loan_summary", "notes"), ("loan_combination_summary", "notes")]
+
+def subordinate_balance(data):
+    # Cut-off balance of the subordinate notes; 0 when the note table lists
+    # none, NaN without a note table.
+    for path in NOTE_TABLE_PATHS:
+        notes = get_in(data, path)
+        if isinstance(notes, list):
+            return float(sum(
+                np.nan_to_num(to_number(note.get("cut_off_date_balance")))
+                for note in notes
+                if isinstance(note, dict) and SUBORDINATE_NOTE_RE.match(str(note.get("note", "")).strip())
+            ))
+    return np.nan
+
+def build_financials(raw_data):
+    # One row per loan; the whole-loan balance falls back to the note balance
+    # for loans without pari passu or subordinate companions, and the senior
+    # (pari passu) balance to the whole loan less any subordinate notes.
+    table = pd.DataFrame(
+        [[first_number(data, FINANCIAL_PATHS[c]) for c in FINANCIAL_COLUMNS] for data in raw_data.values()],
+        index=pd.Index(list(raw_data), name="loan_id"),
+        columns=FINANCIAL_COLUMNS,
+        dtype=np.float64,
+    )
+    table["whole_loan_balance"] = table["whole_loan_balance"].fillna(table["balance"])
+    subordinate = pd.Series([subordinate_balance(data) for data in raw_data.values()], index=table.index, dtype=np.float64)
+    table["senior_balance"] = table["senior_balance"].fillna(table["whole_loan_balance"] - subordinate.fillna(0.0))
+    return table
+
+# ------------------ Loan Terms ------------------
+
+LOAN_TERM_COLUMNS = ["rate", "balance", "term_months", "amortization_months", "io_months"]
+LOAN_DATE_COLUMNS = ["first_payment", "maturity", "anticipated_repayment"]
+
+LOAN_TERM_PATHS = {
+    "rate": [
+        ("mortgage_rate",),
+        ("mortgage_loan_information", "mortgage_rate"),
+        ("mortgage_loan_information", "interest_rate_percent"),
+        ("mortgage_loan_information", "interest_rate"),
+    ],
+    "balance": [
+        ("original_principal_balance",),
+        ("mortgage_loan_information", "original_principal_balance"),
+        ("mortgage_loan_information", "original_balance"),
+        ("loan_summary", "original_principal_balance"),
+        ("loan_combination_summary", "total_senior_notes", "original_balance"),
+    ],
+    "term_months": [
+        ("loan_term_original",),
+        ("mortgage_loan_information", "original_term_to_maturity_months"),
+        ("mortgage_loan_information", "original_term_months"),
+    ],
+    "amortization_months": [
+        ("amortization_term_original",),
+        ("mortgage_loan_information", "original_amortization_term_months"),
+        ("mortgage_loan_information", "original_amortization"),
+        ("mortgage_loan_information", "original_amortization_term"),
+    ],
+    "io_months": [
+        ("io_period",),
+        ("mortgage_loan_information", "original_interest_only_period_months"),
+        ("mortgage_loan_information", "interest_only_period_months"),
+        ("mortgage_loan_information", "io_period_months"),
+    ],
+    "first_payment": [
+        ("first_payment_date",),
+        ("mortgage_loan_information", "first_payment_date"),
+    ],
+    "maturity": [
+        ("maturity_date",),
+        ("mortgage_loan_information", "maturity_date"),
+        ("loan_summary", "maturity_date"),
+    ],
+    "anticipated_repayment": [
+        ("anticipated_repayment_date",),
+        ("mortgage_loan_information", "anticipated_repayment_date"),
+    ],
+    "amortization_type": [
+        ("loan_amortization_type",),
+        ("mortgage_loan_information", "amortization_type"),
+        ("mortgage_loan_information", "amortization"),
+    ],
+}
+
+def to_months(val):
+    # "120 months", "10 years", 360 -> months; "NAP"/"None" -> NaN.
+    number = to_number(val)
+    if isinstance(val, str) and "year" in val.lower():
+        number *= 12
+    return number
+
+def to_text(val):
+    return val.strip() if isinstance(val, str) and val.strip() else None
+
+def first_value(data, paths, parse):
+    for path in paths:
+        val = parse(get_in(data, path))
+        if not pd.isna(val):
+            return val
+    return parse(None)
+
+def months_between(start, end):
+    return (end.astype("datetime64[M]") - start.astype("datetime64[M]")).astype(np.float64)
+
+def build_loan_terms(raw_data):
+    # Original terms per loan. Missing pieces are filled from each other:
+    # term from first payment to ARD/maturity, first payment from maturity
+    # and term, IO period from an interest-only amortization type.
+    table = pd.DataFrame(
+        [[first_value(data, LOAN_TERM_PATHS[c], to_months if c.endswith("months") else to_number)
+          for c in LOAN_TERM_COLUMNS] for data in raw_data.values()],
+        index=pd.Index(list(raw_data), name="loan_id"),
+        columns=LOAN_TERM_COLUMNS,
+        dtype=np.float64,
+    )
+    for column in LOAN_DATE_COLUMNS:
+        table[column] = pd.to_datetime(np.array(
+            [first_value(data, LOAN_TERM_PATHS[column], to_date) for data in raw_data.values()],
+            dtype="datetime64[D]",
+        ))
+    table["amortization_type"] = [
+        first_value(data, LOAN_TERM_PATHS["amortization_type"], to_text) or "" for data in raw_data.values()
+    ]
+
+    first = table["first_payment"].to_numpy(dtype="datetime64[D]")
+    final = table["anticipated_repayment"].fillna(table["maturity"]).to_numpy(dtype="datetime64[D]")
+    table["term_months"] = table["term_months"].fillna(pd.Series(months_between(first, final) + 1, index=table.index))
+    # Back out the first payment on the same day of month as the final payment.
+    back = (np.nan_to_num(table["term_months"].to_numpy()) - 1).astype("timedelta64[M]")
+    day = final - final.astype("datetime64[M]").astype("datetime64[D]")
+    guess = (final.astype("datetime64[M]") - back).astype("datetime64[D]") + day
+    table["first_payment"] = table["first_payment"].fillna(pd.Series(pd.to_datetime(guess), index=table.index))
+
+    interest_only = table["amortization_type"].str.lower().str.contains("interest[ -]only", regex=True)
+    table["io_months"] = table["io_months"].fillna(table["term_months"].where(interest_only))
+    table["io_months"] = table["io_months"].fillna(0.0)
+    return table
+
+# ------------------ Lease Rollover ------------------
+
+ROLLOVER_PATHS = [
+    ("lease_expiration_schedule", "schedule"),
+    ("lease_rollover_schedule", "schedule"),
+    ("lease_rollover_schedule", "rollover_by_year"),
+    ("lease_rollover_schedule",),
+]
+ROLLOVER_COLUMNS = ["loan_id", "label", "year", "mtm", "thereafter", "rent_pct", "rent"]
+
+ROLLOVER_PCT_FIELDS = [
+    "percent_of_total_uw_base_rent", "percent_of_total_rent_rolling",
+    "percent_uw_base_rent_rolling", "percent_uw_base_rent_expiring",
+]
+ROLLOVER_CUMULATIVE_PCT_FIELDS = [
+    "cumulative_percent_base_rent_expiring", "cumulative_percent_uw_base_rent",
+    "cumulative_percent_uw_base_rent_expiring",
+]
+ROLLOVER_RENT_FIELDS = ["annual_uw_base_rent", "uw_base_rent", "total_uw_base_rent", "uw_base_rent_expiring"]
+ROLLOVER_CUMULATIVE_RENT_FIELDS = ["cumulative_base_rent_expiring", "cumulative_uw_base_rent_expiring"]
+
+ROLLOVER_YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+
+def rollover_rows(data):
+    for path in ROLLOVER_PATHS:
+        rows = get_in(data, path)
+        if isinstance(rows, list) and rows:
+            return [r for r in rows if isinstance(r, dict)]
+    return []
+
+def rollover_values(rows, fields, cumulative_fields):
+    # Per-row values, differencing a cumulative column when that's all there is.
+    values = np.array([to_number(first_present(r, fields)) for r in rows], dtype=np.float64)
+    if np.isnan(values).all():
+        cumulative = np.array([to_number(first_present(r, cumulative_fields)) for r in rows], dtype=np.float64)
+        filled = pd.Series(cumulative).ffill().fillna(0.0).to_numpy()
+        values = np.where(np.isnan(cumulative), np.nan, np.diff(filled, prepend=0.0))
+    return values
+
+def build_rollover(raw_data):
+    # One row per loan and expiration bucket; "Vacant" and total rows are
+    # dropped, "MTM" rows keep a NaN year.
+    records = []
+    for loan_id, data in raw_data.items():
+        rows = rollover_rows(data)
+        pct = rollover_values(rows, ROLLOVER_PCT_FIELDS, ROLLOVER_CUMULATIVE_PCT_FIELDS)
+        rent = rollover_values(rows, ROLLOVER_RENT_FIELDS, ROLLOVER_CUMULATIVE_RENT_FIELDS)
+        for row, row_pct, row_rent in zip(rows, pct, rent):
+            label = str(row.get("year", "")).strip()
+            lower = label.lower()
+            match = ROLLOVER_YEAR_RE.search(label)
+            mtm = "mtm" in lower
+            if not match and not mtm:
+                continue
+            records.append((
+                loan_id, label, float(match.group(0)) if match else np.nan,
+                mtm, "thereafter" in lower or "beyond" in lower, row_pct, row_rent,
+            ))
+
+    table = pd.DataFrame(records, columns=ROLLOVER_COLUMNS)
+    table["year"] = table["year"].astype(np.float64)
+    for column in ["mtm", "thereafter"]:
+        table[column] = table[column].astype(bool)
+    for column in ["rent_pct", "rent"]:
+        table[column] = table[column].astype(np.float64)
+    return table
+
+# ------------------ Location ------------------
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "district of columbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+STATE_CODES = set(US_STATES.values())
+
+def to_state(location):
+    # "Sterling, VA", "San Francisco, California", "Hayward, CA 94545" -> "VA", "CA", "CA"
+    if not isinstance(location, str):
+        return ""
+    for part in reversed(location.split(",")):
+        part = re.sub(r"\d{5}(-\d{4})?", "", part).strip()
+        if part.upper() in STATE_CODES:
+            return part.upper()
+        if part.lower() in US_STATES:
+            return US_STATES[part.lower()]
+    return ""
@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from tornado.websocket import websocket_connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from synthetic import generate, read_templates
+from timing import percentile
+
+# ------------------ Headless Session ------------------
+
+# Widget value field per element type (see streamlit/runtime/state/widgets.py).
+VALUE_FIELDS = {"multiselect": "int_array_value", "selectbox": "int_value", "checkbox": "bool_value"}
+
+class Session:
+    # One browser tab speaking Streamlit's websocket protocol: sends rerun
+    # requests with the widget states a user would have set and waits for
+    # the script to finish. Widgets are found by type and label (or key)
+    # from the elements the server sends.
+
+    def __init__(self, base_url):
+        self.url = base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.ws = None
+        self.widgets = {}
+        self.states = {}
+
+    async def open(self):
+        if self.ws is not None:
+            self.ws.close()
+        self.ws = await websocket_connect(self.url, max_message_size=256 * 1024 * 1024)
+        self.widgets, self.states = {}, {}
+        return await self.rerun()
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+            self.ws = None
+
+    async def rerun(self):
+        # Returns (seconds, bytes received, exceptions shown) for one rerun.
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = ""
+        for widget_id, (field, value) in self.states.items():
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget_id
+            if field == "int_array_value":
+                state.int_array_value.data.extend(value)
+            else:
+                setattr(state, field, value)
+        started = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        received = errors = 0
+        while True:
+            raw = await self.ws.read_message()
+            if raw is None:
+                raise ConnectionError("websocket closed by the server")
+            received += len(raw)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    errors += 1
+                elif element_type in VALUE_FIELDS:
+                    widget = getattr(element, element_type)
+                    self.widgets[(element_type, widget.label)] = widget
+                    self.widgets[(element_type, widget.id.rsplit("-", 1)[-1])] = widget
+            elif kind == "script_finished":
+                return time.perf_counter() - started, received, errors
+
+    def set(self, element_type, name, value):
+        widget = self.widgets.get((element_type, name))
+        if widget is None:
+            return False
+        self.states[widget.id] = (VALUE_FIELDS[element_type], value)
+        return True
+
+    def options(self, element_type, name):
+        widget = self.widgets.get((element_type, name))
+        return list(widget.options) if widget is not None else []
+
+# ------------------ Scenario ------------------
+
+# One analyst's loop: open the summary, narrow it, sort it, pick a couple of
+# loans in the amortization-schedule selectbox, clear the filter. "open"
+# starts a new browser session.
+SCENARIO = ["open", "filter", "sort", "schedule_loan", "schedule_loan", "unfilter"]
+
+async def act(session, action, rng):
+    if action == "open":
+        return await session.open()
+    if action == "filter":
+        options = session.options("multiselect", "Property Type")
+        if options:
+            session.set("multiselect", "Property Type", [rng.randrange(len(options))])
+    elif action == "unfilter":
+        session.set("multiselect", "Property Type", [])
+    elif action == "sort":
+        options = session.options("selectbox", "Sort By")
+        if options:
+            session.set("selectbox", "Sort By", rng.randrange(len(options)))
+            session.set("checkbox", "Desc", rng.random() < 0.5)
+    elif action == "schedule_loan":
+        options = session.options("selectbox", "schedule_loan")
+        if options:
+            session.set("selectbox", "schedule_loan", rng.randrange(len(options)))
+    return await session.rerun()
+
+async def analyst(base_url, seed, deadline, think, results):
+    rng = random.Random(seed)
+    session = Session(base_url)
+    try:
+        while time.perf_counter() < deadline:
+            for action in SCENARIO:
+                if time.perf_counter() >= deadline:
+                    break
+                try:
+                    seconds, received, errors = await act(session, action, rng)
+                    results.append({"action": action, "seconds": seconds, "bytes": received, "errors": errors})
+                except (ConnectionError, OSError) as e:
+                    results.append({"action": action, "failed": str(e)})
+                    session.ws = None
+                    break
+                if think:
+                    await asyncio.sleep(rng.expovariate(1 / think))
+    finally:
+        session.close()
+
+# ------------------ Worker Process ------------------
+
+def proc_sample(pid):
+    # (cpu seconds, rss bytes) of a process from /proc; None off Linux. CPU
+    # includes children it has already reaped (cutime / cstime).
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = sum(int(ticks) for ticks in fields[11:15]) / os.sysconf("SC_CLK_TCK")
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        return cpu, rss
+    except (OSError, IndexError, ValueError, StopIteration):
+        return None
+
+def child_pids(pid):
+    # Live children of every thread of `pid`; empty where the kernel does not
+    # expose /proc/<pid>/task/<tid>/children.
+    pids = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return pids
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            pass
+    return pids
+
+def tree_sample(pid):
+    # The worker plus its live descendants, e.g. the simulation's process pool.
+    sample = proc_sample(pid)
+    if sample is None:
+        return None
+    cpu, rss = sample
+    pending = child_pids(pid)
+    while pending:
+        child = pending.pop()
+        child_sample = proc_sample(child)
+        if child_sample is not None:
+            cpu += child_sample[0]
+            rss += child_sample[1]
+            pending.extend(child_pids(child))
+    return cpu, rss
+
+async def monitor(pid, samples, interval=0.5):
+    while True:
+        sample = tree_sample(pid)
+        if sample is not None:
+            samples.append((time.perf_counter(),) + sample)
+        await asyncio.sleep(interval)
+
+def start_worker(app, data_path, port, env=None):
+    env = dict(os.environ, **(env or {}), CMBS_DATA_PATH=data_path)
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    started = time.perf_counter()
+    while True:
+        if worker.poll() is not None:
+            raise RuntimeError(f"worker exited with {worker.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=0.5)
+            return worker, time.perf_counter() - started
+        except OSError:
+            time.sleep(0.05)
+
+# ------------------ Report ------------------
+
+def latency_summary(values):
+    return {f"p{q}": percentile(values, q) for q in (50, 90, 95, 99)} | {"max": max(values) if values else None}
+
+def level_report(sessions, duration, results, samples):
+    done = [r for r in results if "seconds" in r]
+    report = {
+        "sessions": sessions,
+        "duration": duration,
+        "reruns": len(done),
+        "failed": len(results) - len(done),
+        "script_errors": sum(r["errors"] for r in done),
+        "throughput": len(done) / duration,
+        "latency": latency_summary([r["seconds"] for r in done]),
+        "actions": {
+            action: latency_summary([r["seconds"] for r in done if r["action"] == action])
+            for action in SCENARIO if any(r["action"] == action for r in done)
+        },
+        "bytes_per_rerun": sum(r["bytes"] for r in done) / len(done) if done else None,
+    }
+    if len(samples) >= 2:
+        (t0, cpu0, _), (t1, cpu1, _) = samples[0], samples[-1]
+        report["cpu_percent"] = 100 * (cpu1 - cpu0) / (t1 - t0)
+        report["rss_mb"] = {"mean": sum(s[2] for s in samples) / len(samples) / 1024 ** 2, "max": max(s[2] for s in samples) / 1024 ** 2}
+    return report
+
+def code_version():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(result, baseline=None):
+    def ms(value):
+        return f"{value * 1000:8.0f}" if value is not None else "       -"
+
+    previous = {level["sessions"]: level for level in (baseline or {}).get("levels", [])}
+    print(f"\n{result['version']}  loans={result['loans']}  startup={result['startup']:.2f}s  first rerun={result['first_rerun']:.2f}s")
+    print(f"{'sessions':>8} {'rerun/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu %':>6} {'rss MB':>7} {'fail':>5}")
+    for level in result["levels"]:
+        latency = level["latency"]
+        print(
+            f"{level['sessions']:>8} {level['throughput']:>8.2f} {ms(latency['p50'])} {ms(latency['p95'])} {ms(latency['p99'])}"
+            f" {level.get('cpu_percent', 0):>6.0f} {level.get('rss_mb', {}).get('max', 0):>7.0f} {level['failed']:>5}"
+        )
+        before = previous.get(level["sessions"])
+        if before and before["latency"]["p95"] and latency["p95"]:
+            print(
+                f"{'vs base':>8} {100 * (level['throughput'] / before['throughput'] - 1):>+7.0f}%"
+                f" {100 * (latency['p50'] / before['latency']['p50'] - 1):>+7.0f}%"
+                f" {100 * (latency['p95'] / before['latency']['p95'] - 1):>+7.0f}%"
+            )
+
+# ------------------ Runner ------------------
+
+async def run_level(base_url, pid, sessions, duration, think, seed):
+    results, samples = [], []
+    watcher = asyncio.create_task(monitor(pid, samples))
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[analyst(base_url, seed + i, deadline, think, results) for i in range(sessions)])
+    elapsed = time.perf_counter() - started
+    watcher.cancel()
+    return level_report(sessions, elapsed, results, samples)
+
+async def run(args):
+    data_path = args.corpus
+    if data_path is None:
+        data_path = os.path.join(tempfile.mkdtemp(prefix="cmbs-load-"), "data")
+        generate(read_templates(args.templates), data_path, args.loans, args.seed)
+    worker, startup = start_worker(args.app, data_path, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        # One cold session first: the worker loads the corpus and warms its caches.
+        first = Session(base_url)
+        first_rerun = (await first.open())[0]
+        first.close()
+        levels = []
+        for sessions in args.sessions:
+            levels.append(await run_level(base_url, worker.pid, sessions, args.duration, args.think, args.seed))
+    finally:
+        worker.terminate()
+        worker.wait()
+    return {
+        "version": code_version(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "loans": args.loans if args.corpus is None else None,
+        "corpus": args.corpus,
+        "seed": args.seed,
+        "think": args.think,
+        "startup": startup,
+        "first_rerun": first_rerun,
+        "levels": levels,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive a dashboard worker with concurrent headless sessions and report throughput, "
+                    "latency percentiles, CPU and RSS.",
+    )
+    parser.add_argument("--sessions", default="1,4,8", help="comma-separated concurrency levels, run in turn")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per level")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between actions (s)")
+    parser.add_argument("--loans", type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", help="existing data path to serve instead of a synthetic corpus")
+    parser.add_argument("--templates", default=os.path.join("data", "master_combined_loans.json"))
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    args = parser.parse_args()
+    args.sessions = [int(s) for s in args.sessions.split(",")]
+
+    result = asyncio.run(run(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
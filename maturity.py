@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Maturity Wall ------------------
+
+GRANULARITIES = ["Month", "Quarter", "Year"]
+BREAKDOWNS = {
+    "None": None,
+    "Property Type": "property_type",
+    "Issuer": "issuer",
+    "Deal": "deal",
+}
+# Cached (granularity, breakdown, filter) views per wall; the wall is shared by
+# every session.
+MAX_VIEWS = 64
+
+def bucket_codes(months, granularity):
+    # months: int64 months since 1970-01; -1 marks a missing maturity date.
+    if granularity == "Month":
+        return months
+    if granularity == "Quarter":
+        return np.where(months >= 0, months // 3, -1)
+    return np.where(months >= 0, months // 12, -1)
+
+def bucket_label(code, granularity):
+    if granularity == "Month":
+        return str(np.datetime64(int(code), "M"))
+    if granularity == "Quarter":
+        return f"{1970 + code // 4}Q{code % 4 + 1}"
+    return str(1970 + code)
+
+class MaturityWall:
+    # Bucket codes per granularity are computed once and cached; each view is
+    # a single bincount over (bucket, group) pairs. Loans are weighted by
+    # cut-off balance from `financials`, falling back to the summary's
+    # original balance where none was found. The least recently used views are
+    # dropped past `max_views`.
+
+    def __init__(self, summary, financials=None, balance="balance", maturity="maturity_date", max_views=MAX_VIEWS):
+        self.frame = summary.reset_index(drop=True)
+        dates = self.frame[maturity].to_numpy(dtype="datetime64[M]")
+        self.months = np.where(np.isnat(dates), -1, dates.astype(np.int64))
+        weights = self.frame[balance].to_numpy(dtype=np.float64)
+        if financials is not None:
+            cut_off = financials["balance"].reindex(self.frame["loan_id"]).to_numpy(dtype=np.float64)
+            weights = np.where(np.isnan(cut_off), weights, cut_off)
+        self.balance = np.nan_to_num(weights)
+        self.lock = threading.Lock()
+        self.codes = {}
+        self.groups = {}
+        self.max_views = max_views
+        self.views = OrderedDict()
+
+    def granularity_codes(self, granularity):
+        if granularity not in self.codes:
+            self.codes[granularity] = bucket_codes(self.months, granularity)
+        return self.codes[granularity]
+
+    def group_codes(self, column):
+        if column not in self.groups:
+            codes, names = pd.factorize(self.frame[column].fillna("").astype(str))
+            self.groups[column] = (codes, [n or "Unknown" for n in names])
+        return self.groups[column]
+
+    def buckets(self, granularity="Year", breakdown=None, mask=None, key=None):
+        # Balance maturing per bucket (rows) and group (columns). Pass a
+        # hashable `key` alongside `mask` to cache filtered views.
+        cache_key = (granularity, breakdown, key) if key is not None or mask is None else None
+        with self.lock:
+            if cache_key is not None and cache_key in self.views:
+                self.views.move_to_end(cache_key)
+                return self.views[cache_key]
+
+        codes = self.granularity_codes(granularity)
+        valid = codes >= 0
+        if mask is not None:
+            valid = valid & mask
+        if breakdown:
+            groups, names = self.group_codes(breakdown)
+        else:
+            groups, names = np.zeros(len(codes), dtype=np.int64), ["Cut-off Balance"]
+
+        if not valid.any():
+            wall = pd.DataFrame(columns=names, dtype=np.float64)
+        else:
+            first, last = codes[valid].min(), codes[valid].max()
+            width = len(names)
+            flat = (codes[valid] - first) * width + groups[valid]
+            sums = np.bincount(flat, weights=self.balance[valid], minlength=(last - first + 1) * width)
+            wall = pd.DataFrame(
+                sums.reshape(last - first + 1, width),
+                index=[bucket_label(c, granularity) for c in range(first, last + 1)],
+                columns=names,
+            )
+            wall = wall.loc[:, wall.sum(axis=0) > 0] if breakdown else wall
+        wall.index.name = granularity
+
+        if cache_key is not None:
+            with self.lock:
+                self.views[cache_key] = wall
+                while len(self.views) > self.max_views:
+                    self.views.popitem(last=False)
+        return wall
+
+    def cumulative(self, wall):
+        total = wall.sum(axis=1).to_numpy()
+        return pd.DataFrame({
+            "Maturing": total,
+            "Cumulative": np.cumsum(total),
+            "Cumulative %": np.cumsum(total) / total.sum() * 100 if total.sum() else np.zeros(len(total)),
+        }, index=wall.index)
@@ -0,0 +1,155 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from ingest import get_in, to_number
+from schedule import annual_debt_service
+
+# ------------------ Reported Metrics ------------------
+
+METRICS = ["dscr_noi", "dscr_ncf", "debt_yield_noi", "debt_yield_ncf", "ltv", "maturity_ltv"]
+
+# (path, position in an "NOI / NCF" pair or None for a single value).
+REPORTED_PATHS = {
+    "dscr_noi": [
+        (("underwriting_financial_info", "uw_dscr_based_on_noi_ncf"), 0),
+        (("mortgaged_property_information", "dscr_based_on_underwritten_noi_ncf"), 0),
+        (("financial_information", "whole_loan", "uw_dscr", "noi"), None),
+        (("cash_flow_analysis", "uw", "noi_dscr"), None),
+    ],
+    "dscr_ncf": [
+        (("underwriting_financial_info", "uw_dscr_based_on_noi_ncf"), 1),
+        (("mortgaged_property_information", "dscr_based_on_underwritten_noi_ncf"), 1),
+        (("financial_information", "whole_loan", "uw_dscr", "ncf"), None),
+        (("financial_information", "uw_ncf_dscr", "whole_loan"), None),
+        (("financial_information", "uw_ncf_dscr"), None),
+        (("underwriting_and_financial_information", "uw_ncf_dscr"), None),
+    ],
+    "debt_yield_noi": [
+        (("underwriting_financial_info", "uw_debt_yield_based_on_noi_ncf"), 0),
+        (("mortgaged_property_information", "debt_yield_based_on_underwritten_noi_ncf"), 0),
+        (("financial_information", "whole_loan", "uw_debt_yield", "cut_off", "noi"), None),
+        (("financial_information", "uw_noi_debt_yield_percent", "senior_notes"), None),
+        (("financial_information", "uw_noi_debt_yield_percent", "whole_loan"), None),
+        (("financial_information", "uw_noi_debt_yield"), None),
+        (("underwriting_and_financial_information", "uw_noi_debt_yield"), None),
+    ],
+    "debt_yield_ncf": [
+        (("underwriting_financial_info", "uw_debt_yield_based_on_noi_ncf"), 1),
+        (("mortgaged_property_information", "debt_yield_based_on_underwritten_noi_ncf"), 1),
+        (("financial_information", "whole_loan", "uw_debt_yield", "cut_off", "ncf"), None),
+        (("financial_information", "uw_ncf_debt_yield"), None),
+    ],
+}
+
+# Largest |reported - recomputed| before a metric is flagged.
+TOLERANCES = {
+    "dscr_noi": 0.05,
+    "dscr_ncf": 0.05,
+    "debt_yield_noi": 0.25,
+    "debt_yield_ncf": 0.25,
+    "ltv": 1.0,
+    "maturity_ltv": 1.0,
+}
+
+PAIR_SPLIT_RE = re.compile(r"\s*/\s*")
+
+def reported_value(data, paths):
+    for path, position in paths:
+        val = get_in(data, path)
+        if isinstance(val, dict):
+            val = val.get("whole_loan")
+        if position is not None:
+            if not isinstance(val, str) or "/" not in val:
+                continue
+            parts = PAIR_SPLIT_RE.split(val.strip())
+            val = parts[position] if position < len(parts) else None
+        number = to_number(val)
+        if not np.isnan(number):
+            return number
+    return np.nan
+
+def build_reported_metrics(raw_data, summary):
+    # DSCR and debt yield come from the NOI/NCF pairs in the term sheets; LTVs
+    # reuse the summary's normalized columns.
+    table = pd.DataFrame(
+        [[reported_value(data, REPORTED_PATHS[m]) for m in REPORTED_PATHS] for data in raw_data.values()],
+        index=pd.Index(list(raw_data), name="loan_id"),
+        columns=list(REPORTED_PATHS),
+        dtype=np.float64,
+    )
+    ltvs = summary.set_index("loan_id")[["ltv", "maturity_ltv"]].astype(np.float64)
+    return table.join(ltvs)[METRICS]
+
+# ------------------ Recomputed Metrics ------------------
+
+def compute_metrics(noi, ncf, debt_service, senior_balance, balance, value, maturity_balance):
+    # Plain array math, so scenario code can call it with stressed inputs.
+    # Debt yield is on the senior (pari passu) notes, as the term sheets
+    # report it; LTVs are on the whole loan.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "dscr_noi": noi / debt_service,
+            "dscr_ncf": ncf / debt_service,
+            "debt_yield_noi": noi / senior_balance * 100,
+            "debt_yield_ncf": ncf / senior_balance * 100,
+            "ltv": balance / value * 100,
+            "maturity_ltv": maturity_balance / value * 100,
+        }
+
+# CMBS interest accrues Actual/360, so a year of IO payments is 365/360 of
+# the 30/360 schedule's interest.
+ACTUAL_360 = 365 / 360
+
+def underwritten_debt_service(schedule, loan_terms):
+    # Twelve times the first post-IO payment; IO loans use a year of interest.
+    io = np.nan_to_num(loan_terms["io_months"].to_numpy(dtype=np.float64)).astype(np.int64)
+    term = np.nan_to_num(loan_terms["term_months"].to_numpy(dtype=np.float64)).astype(np.int64)
+    months = schedule["debt_service"].shape[1]
+    column = np.clip(np.minimum(io, term - 1), 0, max(months - 1, 0))
+    if not months:
+        return np.full(len(io), np.nan)
+    rows = np.arange(len(io))
+    payment = schedule["debt_service"][rows, column]
+    interest_only = schedule["principal"][rows, column] == 0
+    annual = np.where(interest_only, payment * 12 * ACTUAL_360, payment * 12)
+    return np.where(payment > 0, annual, annual_debt_service(schedule, 1))
+
+def whole_loan_scale(financials, loan_terms, loan_ids):
+    # Note-level schedules are scaled up to the whole loan pro rata, which
+    # assumes companion notes share the note's rate and amortization.
+    fin = financials.reindex(loan_ids)
+    terms = loan_terms.reindex(loan_ids)
+    return (fin["whole_loan_balance"] / terms["balance"]).to_numpy(dtype=np.float64)
+
+def whole_loan_debt_service(financials, loan_terms, schedule, loan_ids):
+    # Underwritten annual debt service on the whole loan, aligned to `loan_ids`.
+    note_ds = pd.Series(underwritten_debt_service(schedule, loan_terms), index=loan_terms.index).reindex(loan_ids)
+    return note_ds.to_numpy(dtype=np.float64) * whole_loan_scale(financials, loan_terms, loan_ids)
+
+def build_metrics(reported, financials, loan_terms, schedule, tolerances=TOLERANCES):
+    loan_ids = reported.index
+    fin = financials.reindex(loan_ids)
+    scale = whole_loan_scale(financials, loan_terms, loan_ids)
+    balloon = pd.Series(schedule["balloon"], index=schedule["loan_ids"]).reindex(loan_ids)
+    recomputed = compute_metrics(
+        fin["noi"].to_numpy(dtype=np.float64),
+        fin["ncf"].to_numpy(dtype=np.float64),
+        whole_loan_debt_service(financials, loan_terms, schedule, loan_ids),
+        fin["senior_balance"].to_numpy(dtype=np.float64),
+        fin["whole_loan_balance"].to_numpy(dtype=np.float64),
+        fin["appraised_value"].to_numpy(dtype=np.float64),
+        balloon.to_numpy(dtype=np.float64) * scale,
+    )
+
+    table = pd.DataFrame(index=loan_ids)
+    flagged = np.zeros(len(loan_ids), dtype=bool)
+    for metric in METRICS:
+        table[f"{metric}_reported"] = reported[metric].to_numpy()
+        table[f"{metric}_recomputed"] = recomputed[metric]
+        with np.errstate(invalid="ignore"):
+            table[f"{metric}_flag"] = np.abs(table[f"{metric}_reported"] - table[f"{metric}_recomputed"]) > tolerances[metric]
+        flagged |= table[f"{metric}_flag"].to_numpy()
+    table["flagged"] = flagged
+    return table
@@ -0,0 +1,194 @@
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ------------------ Metric Types ------------------
+
+# Rerun and view latency (seconds) and per-rerun payload (bytes) buckets.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTE_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2)
+
+log = logging.getLogger("cmbs.metrics")
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+def number_text(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    # Cumulative buckets per label set, as the Prometheus text format expects.
+
+    def __init__(self, name, help, buckets):
+        self.lock = threading.Lock()
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            counts, total = self.series.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.series[key] = (counts, total + value)
+
+    def lines(self):
+        with self.lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self.series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(series.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{label_text(key + (('le', number_text(bound)),))} {count}")
+            lines.append(f"{self.name}_sum{label_text(key)} {number_text(total)}")
+            lines.append(f"{self.name}_count{label_text(key)} {counts[-1]}")
+        return lines
+
+def sample_lines(name, kind, help, samples):
+    # Gauges and counters read at scrape time: samples is [(labels dict, value)].
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{label_text(sorted(labels.items()))} {number_text(value)}")
+    return lines
+
+# ------------------ Registry ------------------
+
+class MetricsRegistry:
+    # Histograms observed by reruns plus collectors called at scrape time,
+    # each returning sample_lines() output for state owned elsewhere (the
+    # shared cache, the dataset, the session manager).
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.collectors = []
+
+    def histogram(self, name, help, buckets):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(name, help, buckets)
+            return self.histograms[name]
+
+    def collect(self, collector):
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self):
+        with self.lock:
+            histograms = list(self.histograms.values())
+            collectors = list(self.collectors)
+        lines = []
+        for histogram in histograms:
+            lines += histogram.lines()
+        for collector in collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+# ------------------ Export ------------------
+
+def serve(registry, port, host="127.0.0.1"):
+    # GET /metrics on a daemon thread. The export is optional: when the port
+    # can't be bound (e.g. another worker already holds it) this logs a
+    # warning and returns None rather than failing the app.
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        log.warning("metrics endpoint disabled: cannot listen on %s:%s (%s)", host, port, e)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
+
+def write_file(registry, path, interval):
+    # Rewrites `path` every `interval` seconds (node_exporter textfile style);
+    # the rename keeps a scrape from reading a partial file.
+    def loop():
+        while True:
+            temp = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(temp, "w") as f:
+                    f.write(registry.render())
+                os.replace(temp, path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    except OSError as e:
+        log.warning("metrics file disabled: cannot create %s (%s)", os.path.dirname(path), e)
+        return None
+    thread = threading.Thread(target=loop, daemon=True, name="metrics-file")
+    thread.start()
+    return thread
+
+# ------------------ Collectors ------------------
+
+def cache_collector(cache):
+    def collect():
+        stats = cache.stats()
+        lines = []
+        for counter in ["hits", "misses", "evictions"]:
+            lines += sample_lines(
+                f"cmbs_cache_{counter}_total", "counter", f"Shared cache {counter} by entry kind.",
+                [({"kind": row["kind"]}, row[counter]) for row in stats["kinds"]],
+            )
+        lines += sample_lines("cmbs_cache_bytes", "gauge", "Bytes held by the shared cache.", [({}, stats["bytes"])])
+        lines += sample_lines("cmbs_cache_budget_bytes", "gauge", "Shared cache byte budget.", [({}, stats["budget"])])
+        lines += sample_lines("cmbs_cache_entries", "gauge", "Entries in the shared cache.", [({}, stats["entries"])])
+        return lines
+    return collect
+
+def dataset_collector(dataset):
+    def collect():
+        status = dataset.status()
+        return (
+            sample_lines("cmbs_dataset_version", "gauge", "Current dataset version.", [({}, status["version"])])
+            + sample_lines("cmbs_dataset_loans", "gauge", "Loans in the current dataset.", [({}, status["loans"])])
+            + sample_lines(
+                "cmbs_dataset_load_seconds", "gauge", "Duration of the last dataset load or reload.",
+                [({}, status["load_seconds"])],
+            )
+        )
+    return collect
+
+def active_sessions():
+    # Streamlit 1.35 has no public accessor for the session manager.
+    from streamlit import runtime
+    if not runtime.exists():
+        return None
+    manager = getattr(runtime.get_instance(), "_session_mgr", None)
+    return manager.num_active_sessions() if manager is not None else None
+
+def session_collector():
+    def collect():
+        sessions = active_sessions()
+        samples = [({}, sessions)] if sessions is not None else []
+        return sample_lines("cmbs_active_sessions", "gauge", "Connected browser sessions.", samples)
+    return collect
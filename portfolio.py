@@ -0,0 +1,171 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Portfolio Statistics ------------------
+
+# (summary column, label) for every balance-weighted average on the panel.
+STAT_METRICS = [
+    ("dscr", "DSCR"),
+    ("debt_yield", "Debt Yield"),
+    ("ltv", "Cut-off LTV"),
+    ("maturity_ltv", "Maturity LTV"),
+    ("interest_rate", "Coupon"),
+    ("occupancy", "Occupancy"),
+]
+WEIGHT_COLUMN = "balance"
+# Filter signatures kept per engine; the engine is shared by every session.
+MAX_ENTRIES = 64
+
+# Sort options for the summary table: label -> summary column.
+SORT_COLUMNS = {
+    "Balance": "balance",
+    "Interest Rate": "interest_rate",
+    "DSCR": "dscr",
+    "Debt Yield": "debt_yield",
+    "Cut-off LTV": "ltv",
+    "Occupancy": "occupancy",
+    "Maturity Date": "maturity_date",
+}
+
+def freeze_filters(filters):
+    return tuple(sorted((column, tuple(sorted(map(str, allowed)))) for column, allowed in filters.items() if allowed))
+
+def filter_mask(frame, filters):
+    mask = np.ones(len(frame), dtype=bool)
+    for column, allowed in filters.items():
+        if allowed:
+            mask &= frame[column].astype(str).isin([str(a) for a in allowed]).to_numpy()
+    return mask
+
+def sort_order(frame, column, descending=False):
+    # Stable row positions with missing values last, as in the SQL store.
+    values = frame[column]
+    order = values.sort_values(ascending=not descending, na_position="last", kind="stable").index
+    return frame.index.get_indexer(order)
+
+def row_matches(row, filters):
+    return all(str(row.get(column)) in {str(a) for a in allowed} for column, allowed in filters.items() if allowed)
+
+class PortfolioStats:
+    # Weighted averages are kept as cached numerator/denominator sums per
+    # filter signature, so a changed loan only adjusts the affected sums.
+    # The least recently used signatures are dropped past `max_entries`.
+
+    def __init__(self, summary, metrics=STAT_METRICS, weight=WEIGHT_COLUMN, max_entries=MAX_ENTRIES):
+        self.metrics = [column for column, _ in metrics]
+        self.labels = dict(metrics)
+        self.weight = weight
+        self.lock = threading.Lock()
+        self.frame = summary.reset_index(drop=True).copy()
+        self.positions = {loan_id: i for i, loan_id in enumerate(self.frame["loan_id"])}
+        self.active = np.ones(len(self.frame), dtype=bool)
+        self.w, self.wx, self.wp = self.contributions(self.frame)
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def contributions(self, frame):
+        w = np.nan_to_num(frame[self.weight].to_numpy(dtype=np.float64))
+        x = frame[self.metrics].to_numpy(dtype=np.float64)
+        present = ~np.isnan(x)
+        return w, np.where(present, x, 0.0) * w[:, None], present * w[:, None]
+
+    def entry(self, filters):
+        # Caller holds the lock.
+        key = freeze_filters(filters)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        mask = filter_mask(self.frame, filters) & self.active
+        entry = {
+            "filters": dict(key),
+            "mask": mask,
+            "num": mask @ self.wx,
+            "den": mask @ self.wp,
+            "balance": float(mask @ self.w),
+            "loans": int(mask.sum()),
+        }
+        self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def compute(self, filters):
+        with self.lock:
+            return self.result(self.entry(filters))
+
+    def result(self, entry):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages = np.where(entry["den"] > 0, entry["num"] / entry["den"], np.nan)
+        stats = {self.labels[column]: float(value) for column, value in zip(self.metrics, averages)}
+        stats["Loans"] = entry["loans"]
+        stats["Balance"] = entry["balance"]
+        return stats
+
+    def mask(self, filters, loan_ids=None):
+        # Aligned to `loan_ids` when given; after removals the engine keeps
+        # inactive slots, so its own row order no longer matches the summary.
+        with self.lock:
+            mask = self.entry(filters)["mask"]
+            if loan_ids is None:
+                return mask.copy()
+            positions = np.array([self.positions.get(loan_id, -1) for loan_id in loan_ids], dtype=np.int64)
+            return np.where(positions >= 0, mask[positions], False)
+
+    def update(self, loan_id, row):
+        # Adds or replaces one loan and patches every cached aggregate.
+        with self.lock:
+            row = dict(row, loan_id=loan_id)
+            i = self.positions.get(loan_id)
+            if i is None:
+                i = len(self.frame)
+                self.frame.loc[i] = pd.Series(row)
+                self.positions[loan_id] = i
+                w, wx, wp = self.contributions(self.frame.iloc[[i]])
+                self.w = np.concatenate([self.w, w])
+                self.wx = np.vstack([self.wx, wx])
+                self.wp = np.vstack([self.wp, wp])
+                self.active = np.append(self.active, True)
+                for entry in self.entries.values():
+                    entry["mask"] = np.append(entry["mask"], False)
+            else:
+                for column, value in row.items():
+                    self.frame.at[i, column] = value
+
+            old_w, old_wx, old_wp = self.w[i], self.wx[i].copy(), self.wp[i].copy()
+            new_w, new_wx, new_wp = (a[0] for a in self.contributions(self.frame.iloc[[i]]))
+            self.w[i], self.wx[i], self.wp[i] = new_w, new_wx, new_wp
+
+            current = self.frame.iloc[i].to_dict()
+            for entry in self.entries.values():
+                if entry["mask"][i]:
+                    entry["num"] = entry["num"] - old_wx
+                    entry["den"] = entry["den"] - old_wp
+                    entry["balance"] -= old_w
+                    entry["loans"] -= 1
+                included = row_matches(current, entry["filters"])
+                if included:
+                    entry["num"] = entry["num"] + new_wx
+                    entry["den"] = entry["den"] + new_wp
+                    entry["balance"] += new_w
+                    entry["loans"] += 1
+                entry["mask"][i] = included
+
+    def remove(self, loan_id):
+        # Drops the loan from every cached aggregate; its row stays as an
+        # inactive slot so positions never shift.
+        with self.lock:
+            i = self.positions.pop(loan_id, None)
+            if i is None:
+                return
+            for entry in self.entries.values():
+                if entry["mask"][i]:
+                    entry["num"] = entry["num"] - self.wx[i]
+                    entry["den"] = entry["den"] - self.wp[i]
+                    entry["balance"] -= self.w[i]
+                    entry["loans"] -= 1
+                    entry["mask"][i] = False
+            self.active[i] = False
@@ -0,0 +1,204 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from ingest import get_in
+
+# ------------------ Call Protection Grammar ------------------
+
+CALL_PROTECTION_PATHS = [
+    ("call_protection",),
+    ("mortgage_loan_information", "call_protection"),
+    ("mortgage_loan_information", "prepayment_provisions"),
+    ("prepayment_provisions",),
+]
+
+UNKNOWN, LOCKOUT, DEFEASANCE, YIELD_MAINTENANCE, YM_OR_DEFEASANCE, PENALTY, OPEN = range(7)
+KIND_LABELS = ["Unknown", "Lockout", "Defeasance", "Yield Maintenance", "YM or Defeasance", "Penalty", "Open"]
+
+# Splits on "," and "/" outside parentheses: "L(2/3),Y1(90),Q(7)".
+SEGMENT_SPLIT_RE = re.compile(r"[,/](?![^(]*\))")
+SEGMENT_RE = re.compile(r"^(?P<code>[^()]*)\(\s*(?P<count>[^()]*)\)\s*$")
+# OCR splits two-digit counts ("2/3", "2.5") and reads "O" as "0" or "Q".
+SPLIT_COUNT_RE = re.compile(r"^(\d)\s*[./]\s*(\d)$")
+FLOOR_RE = re.compile(r"(?:GR?TR?|YM?)(\d+(?:\.\d+)?)")
+PENALTY_RE = re.compile(r"^(\d+(?:\.\d+)?)%$")
+
+def segment_months(count):
+    count = count.strip()
+    match = SPLIT_COUNT_RE.match(count)
+    if match:
+        return float(match.group(1) + match.group(2))
+    return float(count) if re.fullmatch(r"\d+", count) else np.nan
+
+def segment_kind(code):
+    # Returns (kind, YM floor or penalty percent).
+    code = re.sub(r"\s+", "", code.upper())
+    if not code:
+        return UNKNOWN, np.nan
+    match = PENALTY_RE.match(code)
+    if match:
+        return PENALTY, float(match.group(1))
+    if "YM" in code or re.match(r"^Y\d", code):
+        match = FLOOR_RE.search(code)
+        floor = float(match.group(1)) if match else 0.0
+        if re.search(r"(?:OR|/)D(?:EF)?$|^D(?:EF)?OR", code):
+            return YM_OR_DEFEASANCE, floor
+        return YIELD_MAINTENANCE, floor
+    if code.startswith("L"):
+        return LOCKOUT, np.nan
+    if code in {"D", "DEF", "DEFEASANCE"}:
+        return DEFEASANCE, np.nan
+    if code in {"O", "0", "Q", "OPEN"}:
+        return OPEN, np.nan
+    return UNKNOWN, np.nan
+
+@lru_cache(maxsize=None)
+def parse_call_protection(text):
+    # "GRTR 0.5% or YM(25), GRTR 0.5% or YM or D(89), O(6)" ->
+    # ((YIELD_MAINTENANCE, 25, 0.5), (YM_OR_DEFEASANCE, 89, 0.5), (OPEN, 6, nan))
+    segments = []
+    for part in SEGMENT_SPLIT_RE.split(text or ""):
+        match = SEGMENT_RE.match(part.strip())
+        if not match:
+            continue
+        kind, floor = segment_kind(match.group("code"))
+        count = match.group("count")
+        if kind == UNKNOWN and not match.group("code").strip():
+            # "(B6)": code and count ran together; keep the letters and let
+            # fill_segments recover the count from the term.
+            kind, floor = segment_kind(re.sub(r"\d", "", count))
+            count = ""
+        segments.append((kind, segment_months(count), floor))
+    return tuple(segments)
+
+def fill_segments(segments, term_months):
+    # Gives a single unreadable count whatever the term leaves over.
+    counts = [months for _, months, _ in segments]
+    missing = [i for i, months in enumerate(counts) if np.isnan(months)]
+    if len(missing) == 1 and not np.isnan(term_months):
+        rest = term_months - np.nansum(counts)
+        if rest > 0:
+            kind, _, floor = segments[missing[0]]
+            segments = segments[:missing[0]] + ((kind, rest, floor),) + segments[missing[0] + 1:]
+    return segments
+
+def segment_label(segments):
+    return ", ".join(
+        f"{KIND_LABELS[kind]}{f' {floor:g}%' if kind in (YIELD_MAINTENANCE, YM_OR_DEFEASANCE, PENALTY) and floor else ''}"
+        f" ({'?' if np.isnan(months) else int(months)})"
+        for kind, months, floor in segments
+    )
+
+# ------------------ Protection Schedules ------------------
+
+def call_protection_text(data):
+    for path in CALL_PROTECTION_PATHS:
+        val = get_in(data, path)
+        if isinstance(val, str) and val.strip():
+            return val.strip()
+    return ""
+
+def protection_schedule(texts, term_months, months=None):
+    # loans x months kind codes (int8) and YM floor / penalty percent.
+    parsed = [fill_segments(parse_call_protection(t), term) for t, term in zip(texts, term_months)]
+    months = int(months or max([np.nansum([m for _, m, _ in p]) for p in parsed] + [0]))
+    kinds = np.full((len(parsed), months), UNKNOWN, dtype=np.int8)
+    floors = np.full((len(parsed), months), np.nan)
+    for i, segments in enumerate(parsed):
+        start = 0
+        for kind, count, floor in segments:
+            if np.isnan(count):
+                break
+            end = min(start + int(count), months)
+            kinds[i, start:end] = kind
+            floors[i, start:end] = floor
+            start = end
+    return {"segments": parsed, "kinds": kinds, "floors": floors}
+
+def call_protection_texts(raw_data):
+    return pd.Series(
+        [call_protection_text(data) for data in raw_data.values()],
+        index=pd.Index(list(raw_data), name="loan_id"), name="text", dtype=object,
+    )
+
+def build_call_protection(texts, loan_terms):
+    # `texts` is call_protection_texts() output, in loan order.
+    terms = loan_terms.reindex(texts.index)["term_months"].to_numpy(dtype=np.float64)
+    protection = protection_schedule(list(texts), terms)
+    protection["loan_ids"] = texts.index.to_numpy()
+    protection["texts"] = list(texts)
+    return protection
+
+# ------------------ Prepayment Cost ------------------
+
+def parse_curve(curve):
+    # DataFrame or mapping of tenor (years) -> yield (%).
+    if isinstance(curve, pd.DataFrame):
+        curve = dict(zip(curve.iloc[:, 0], curve.iloc[:, 1]))
+    points = sorted((float(t), float(y)) for t, y in curve.items() if pd.notna(t) and pd.notna(y))
+    return np.array([p[0] for p in points]), np.array([p[1] for p in points]) / 100
+
+def prepayment_costs(schedule, protection, curve, as_of):
+    # Cost to prepay every loan on `as_of`, as one loans x months pass over the
+    # remaining payments: YM is the larger of the floor and the PV premium of
+    # payments through the open date; defeasance is the cost of Treasuries
+    # replicating them.
+    tenors, yields = parse_curve(curve)
+    as_of = np.datetime64(as_of, "D")
+    first = schedule["first_payment"]
+    # Payments made by `as_of`: whole months elapsed, plus this month's
+    # payment once its day has passed.
+    months_elapsed = (as_of.astype("datetime64[M]") - first.astype("datetime64[M]")).astype(np.int64)
+    day_passed = (as_of - as_of.astype("datetime64[M]").astype("datetime64[D]")) >= (first - first.astype("datetime64[M]").astype("datetime64[D]"))
+    paid = np.where(np.isnat(first), 0, np.clip(months_elapsed + day_passed, 0, None))
+    n_loans, months = schedule["debt_service"].shape
+    kinds = np.zeros((n_loans, months), dtype=np.int8)
+    floors = np.full((n_loans, months), np.nan)
+    width = min(months, protection["kinds"].shape[1])
+    kinds[:, :width] = protection["kinds"][:, :width]
+    floors[:, :width] = protection["floors"][:, :width]
+
+    rows = np.arange(n_loans)
+    current = np.clip(paid, 0, months - 1)
+    kind_now = np.where(paid < months, kinds[rows, current], OPEN)
+    floor_now = np.nan_to_num(floors[rows, current])
+    balance = np.where(paid > 0, schedule["balance"][rows, np.clip(paid - 1, 0, months - 1)],
+                       schedule["balance"][:, 0] + schedule["principal"][:, 0])
+
+    # YM and defeasance run to the first open month (or maturity).
+    period = np.arange(months)[None, :]
+    open_months = np.where(kinds == OPEN, period, months)
+    open_months = np.where(open_months >= paid[:, None], open_months, months).min(axis=1)
+    remaining = (period >= paid[:, None]) & (period < open_months[:, None])
+    t = (period - paid[:, None] + 1) / 12
+    y = np.interp(t, tenors, yields) if len(tenors) else np.zeros_like(t)
+    discount = (1 + y / 12) ** (-t * 12)
+    cash = np.where(remaining, schedule["debt_service"], 0.0)
+    last = np.clip(open_months - 1, 0, months - 1)
+    balloon = np.where(open_months > paid, schedule["balance"][rows, last], 0.0)
+    pv = (cash * discount).sum(axis=1) + balloon * discount[rows, last]
+
+    # When Treasuries yield more than the coupon the replacement portfolio
+    # costs less than the balance; the loan is still paid off at par, so
+    # neither YM nor defeasance goes below zero.
+    premium = np.maximum(pv - balance, 0.0)
+    ym = np.maximum(premium, floor_now / 100 * balance)
+    defeasance = premium
+    cost = np.select(
+        [kind_now == OPEN, kind_now == YIELD_MAINTENANCE, kind_now == DEFEASANCE,
+         kind_now == YM_OR_DEFEASANCE, kind_now == PENALTY],
+        [0.0, ym, defeasance, np.minimum(ym, defeasance), floor_now / 100 * balance],
+        default=np.nan,
+    )
+    return pd.DataFrame({
+        "loan_id": schedule["loan_ids"],
+        "status": [KIND_LABELS[k] for k in kind_now],
+        "months_to_open": np.clip(open_months - paid, 0, None),
+        "balance": balance,
+        "yield_maintenance": np.where(np.isin(kind_now, [YIELD_MAINTENANCE, YM_OR_DEFEASANCE]), ym, np.nan),
+        "defeasance": np.where(np.isin(kind_now, [DEFEASANCE, YM_OR_DEFEASANCE]), defeasance, np.nan),
+        "prepayment_cost": cost,
+    })
@@ -0,0 +1,191 @@
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Imported before the first paint, so only the standard library here.
+
+# ------------------ Collapsed Stacks ------------------
+
+# Stacks deeper than this are cut at the root end. Unfolding a cProfile call
+# graph stops following callers once a branch carries under 1/MAX_STACKS of
+# the profiled time (its time stays on the partial stack), which bounds the
+# output at about MAX_STACKS stacks.
+MAX_DEPTH = 128
+MAX_STACKS = 5000
+
+def frame_label(filename, lineno, name):
+    # One flame-graph frame; ";" separates frames in the collapsed format.
+    label = f"{name} ({os.path.basename(filename)}:{lineno})" if filename != "~" else name
+    return label.replace(";", ",")
+
+def sampled_stack(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        code = frame.f_code
+        stack.append(frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+def collapsed_text(stacks):
+    # Brendan Gregg's folded format ("root;...;leaf count"), read by
+    # flamegraph.pl, speedscope and most flame-graph viewers.
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+def stats_stacks(stats, unit=1e-6):
+    # cProfile keeps caller -> callee edges rather than stacks, so each
+    # function's own time is pushed up its callers in proportion to the time
+    # each caller spent in it. Counts are in `unit` seconds (microseconds).
+    stacks = Counter()
+    floor = max(unit, sum(entry[2] for entry in stats.values()) / MAX_STACKS)
+
+    def climb(func, seconds, chain, seen):
+        callers = {c: edge for c, edge in stats[func][4].items() if c in stats and c not in seen}
+        total = sum(edge[3] for edge in callers.values())
+        if not callers or total <= 0 or len(chain) >= MAX_DEPTH:
+            stacks[";".join(frame_label(*f) for f in reversed(chain))] += seconds
+            return
+        unfollowed = 0.0
+        for caller, edge in callers.items():
+            share = seconds * edge[3] / total
+            if share >= floor:
+                climb(caller, share, chain + [caller], seen | {caller})
+            else:
+                unfollowed += share
+        if unfollowed:
+            stacks[";".join(frame_label(*f) for f in reversed(chain))] += unfollowed
+
+    for func, (_, _, own, _, _) in stats.items():
+        if own > 0:
+            climb(func, own, [func], {func})
+    return Counter({stack: int(round(seconds / unit)) for stack, seconds in stacks.items() if seconds >= unit})
+
+# ------------------ Sampler ------------------
+
+class Sampler:
+    # One daemon thread for the process. Reruns register on start; once one
+    # has been running longer than `threshold` seconds its thread's stack is
+    # sampled every `interval` seconds until it finishes. Reruns that finish
+    # under the threshold are never sampled, and the thread sleeps while
+    # nothing is due.
+
+    def __init__(self, threshold, interval):
+        self.condition = threading.Condition()
+        self.threshold = threshold
+        self.interval = interval
+        self.running = {}
+        self.thread = None
+
+    def watch(self, thread_id):
+        with self.condition:
+            self.running[thread_id] = (time.perf_counter(), Counter())
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.loop, daemon=True, name="rerun-sampler")
+                self.thread.start()
+            self.condition.notify()
+
+    def finish(self, thread_id):
+        # The rerun's samples ({stack: count}), empty if it stayed fast.
+        with self.condition:
+            _, samples = self.running.pop(thread_id, (None, Counter()))
+            return samples
+
+    def loop(self):
+        while True:
+            with self.condition:
+                now = time.perf_counter()
+                due = [t for t, (started, _) in self.running.items() if now - started >= self.threshold]
+                if not due:
+                    starts = [started for started, _ in self.running.values()]
+                    self.condition.wait(min(starts) + self.threshold - now if starts else None)
+                    continue
+            frames = sys._current_frames()
+            with self.condition:
+                for thread_id in due:
+                    if thread_id not in frames:
+                        # The rerun's thread died without finishing (e.g. an
+                        # exception); nothing will collect it.
+                        self.running.pop(thread_id, None)
+                    elif thread_id in self.running:
+                        self.running[thread_id][1][sampled_stack(frames[thread_id])] += 1
+            del frames
+            time.sleep(self.interval)
+
+# ------------------ Profiler ------------------
+
+class RerunProfiler:
+    # Captures a profile of one rerun: cProfile for the whole rerun when the
+    # session asks (?profile=1), otherwise stack samples of the slow tail when
+    # the rerun passes CMBS_PROFILE_THRESHOLD. Captures are kept newest first,
+    # up to `limit`, and also written to `folder` when one is set.
+
+    def __init__(self, threshold=None, interval=0.005, limit=20, folder=None):
+        self.lock = threading.Lock()
+        self.sampler = Sampler(threshold, interval) if threshold else None
+        self.captures = deque(maxlen=limit)
+        self.folder = folder
+        self.count = 0
+
+    def begin(self, requested):
+        profiler = None
+        if requested:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif self.sampler is not None:
+            self.sampler.watch(threading.get_ident())
+        return {"started": time.perf_counter(), "profiler": profiler}
+
+    def end(self, rerun, **context):
+        # Returns the capture for this rerun, or None when it was not profiled.
+        seconds = time.perf_counter() - rerun["started"]
+        profiler = rerun["profiler"]
+        if profiler is not None:
+            profiler.disable()
+            profiler.create_stats()
+            capture = {
+                "trigger": "query", "kind": "cprofile",
+                "prof": marshal.dumps(profiler.stats), "collapsed": collapsed_text(stats_stacks(profiler.stats)),
+            }
+        elif self.sampler is not None:
+            samples = self.sampler.finish(threading.get_ident())
+            if not samples:
+                return None
+            capture = {"trigger": "threshold", "kind": "sampled", "prof": None, "collapsed": collapsed_text(samples)}
+        else:
+            return None
+        with self.lock:
+            self.count += 1
+            capture.update(id=self.count, created=time.time(), seconds=seconds, **context)
+            self.captures.appendleft(capture)
+        if self.folder:
+            self.save(capture)
+        return capture
+
+    def save(self, capture):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(capture["created"]))
+        base = os.path.join(self.folder, f"{stamp}-{capture['id']}-{capture.get('loan_id') or 'all'}-v{capture.get('version')}")
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(base + ".collapsed", "w") as f:
+                f.write(capture["collapsed"])
+            if capture["prof"] is not None:
+                with open(base + ".prof", "wb") as f:
+                    f.write(capture["prof"])
+        except OSError:
+            pass
+
+    def recent(self):
+        with self.lock:
+            return list(self.captures)
+
+def file_name(capture, extension):
+    return f"rerun-{capture['id']}-{capture.get('loan_id') or 'all'}-v{capture.get('version')}.{extension}"
+
+PROFILER = RerunProfiler(
+    threshold=float(os.environ["CMBS_PROFILE_THRESHOLD"]) if os.environ.get("CMBS_PROFILE_THRESHOLD") else None,
+    interval=float(os.environ.get("CMBS_PROFILE_INTERVAL_MS", "5")) / 1000,
+    folder=os.environ.get("CMBS_PROFILE_DIR"),
+)
@@ -0,0 +1,203 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Rating Scales ------------------
+
+# Notch 1 is the top of every scale; 0 means not rated (NR, N/A, NAV, blank).
+NOT_RATED = 0
+
+SP_SCALE = [
+    "AAA", "AA+", "AA", "AA-", "A+", "A", "A-", "BBB+", "BBB", "BBB-",
+    "BB+", "BB", "BB-", "B+", "B", "B-", "CCC+", "CCC", "CCC-", "CC", "C", "D"
+]
+MOODYS_SCALE = [
+    "Aaa", "Aa1", "Aa2", "Aa3", "A1", "A2", "A3", "Baa1", "Baa2", "Baa3",
+    "Ba1", "Ba2", "Ba3", "B1", "B2", "B3", "Caa1", "Caa2", "Caa3", "Ca", "C"
+]
+
+SP_NOTCHES = {symbol: i + 1 for i, symbol in enumerate(SP_SCALE)}
+MOODYS_NOTCHES = {symbol: i + 1 for i, symbol in enumerate(MOODYS_SCALE)}
+
+INVESTMENT_GRADE_MAX = SP_NOTCHES["BBB-"]
+
+AGENCIES = ["sp", "moodys", "fitch", "kbra", "dbrs"]
+
+AGENCY_ALIASES = {
+    "s&p": "sp",
+    "sp": "sp",
+    "moody's": "moodys",
+    "moodys": "moodys",
+    "fitch": "fitch",
+    "kbra": "kbra",
+    "dbrs": "dbrs",
+    "dbrs_morningstar": "dbrs",
+    "dbrs morningstar": "dbrs",
+}
+
+# Slash strings without agency labels ("A- / Baa1 / BBB", "Caa1/NR/B") list
+# Moody's first when the first symbol is on the Moody's scale.
+SP_FIRST_ORDER = ["sp", "moodys", "fitch"]
+MOODYS_FIRST_ORDER = ["moodys", "sp", "fitch"]
+
+# (list path, rent share field, tenant name field, rating field), in the order
+# get_top_tenant searches the tenant lists.
+TENANT_SOURCES = [
+    ("top_largest_tenants_by_ubr.tenants", "percent_of_total_base_rent", "tenant", "rating"),
+    ("largest_tenants_based_on_uw_base_rent.tenants", "percent_of_total_uw_base_rent", "tenant_name", "credit_rating"),
+    ("major_tenant.tenants", "percent_of_total_annual_uw_base_rent", "name", "credit_rating"),
+    ("tenant_summary.tenants", "percent_of_total_uw_base_rent", "name", "credit_rating"),
+    ("tenant_summary.ten_largest_tenants", "percent_of_total_uw_base_rent", "tenant", "credit_rating"),
+    ("top_tenant_summary.tenants", "percent_uw_base_rent", "name", "rating"),
+]
+
+CREDIT_ASSESSMENT_PATHS = ["credit_assessment", "mortgage_loan_information.credit_assessment"]
+
+# ------------------ Parsing ------------------
+
+def agency_key(name):
+    if not isinstance(name, str):
+        return None
+    return AGENCY_ALIASES.get(name.strip().lower().replace("’", "'"))
+
+def clean_symbol(value):
+    token = re.sub(r"\(sf\)|\bsf\b|\(\d+\)|\*", "", value, flags=re.I)
+    token = re.sub(r"\s*\(high\)", "+", token, flags=re.I)
+    token = re.sub(r"\s*\(low\)", "-", token, flags=re.I)
+    return token.strip()
+
+def parse_rating(value):
+    if not isinstance(value, str):
+        return NOT_RATED
+    token = clean_symbol(value)
+    if token in MOODYS_NOTCHES:
+        return MOODYS_NOTCHES[token]
+    if token.upper() in SP_NOTCHES:
+        return SP_NOTCHES[token.upper()]
+    if token.capitalize() in MOODYS_NOTCHES:
+        return MOODYS_NOTCHES[token.capitalize()]
+    return NOT_RATED
+
+def is_moodys_symbol(value):
+    token = clean_symbol(value)
+    return token in MOODYS_NOTCHES and token not in SP_NOTCHES
+
+def parse_rating_field(value):
+    notches = {}
+    if isinstance(value, dict):
+        for name, symbol in value.items():
+            key = agency_key(name)
+            if key:
+                notches[key] = parse_rating(symbol)
+        return notches
+    if not isinstance(value, str) or not value.strip():
+        return notches
+
+    parts = [p.strip() for p in value.split("/") if p.strip()]
+    if any(":" in p for p in parts):
+        for part in parts:
+            name, _, symbol = part.partition(":")
+            key = agency_key(name)
+            if key:
+                notches[key] = parse_rating(symbol)
+        return notches
+
+    order = MOODYS_FIRST_ORDER if is_moodys_symbol(parts[0]) else SP_FIRST_ORDER
+    for key, symbol in zip(order, parts):
+        notches[key] = parse_rating(symbol)
+    return notches
+
+def composite_notch(notches):
+    # One rating: use it. Two: the worse. Three or more: the second best.
+    notches = np.asarray(notches, dtype=np.int16)
+    if notches.ndim == 1:
+        notches = notches[None, :]
+    ranked = np.sort(np.where(notches > 0, notches, 999), axis=1)
+    count = (notches > 0).sum(axis=1)
+    pick = np.clip(np.minimum(count, 2) - 1, 0, None)
+    composite = ranked[np.arange(len(ranked)), pick]
+    return np.where(count > 0, composite, NOT_RATED).astype(np.int8)
+
+def notch_label(notch):
+    if 0 < notch <= len(SP_SCALE):
+        return SP_SCALE[notch - 1]
+    return "NR"
+
+# ------------------ Rating Table ------------------
+
+def get_path(data, path):
+    ref = data
+    for key in path.split("."):
+        if not isinstance(ref, dict):
+            return None
+        ref = ref.get(key)
+    return ref
+
+def parse_share(val):
+    try:
+        return float(str(val).replace("%", "").strip())
+    except:
+        return np.nan
+
+def tenant_rows(data):
+    for path, pct_field, name_field, rating_field in TENANT_SOURCES:
+        tenants = get_path(data, path)
+        if isinstance(tenants, list) and tenants:
+            shares = [parse_share(t.get(pct_field)) for t in tenants]
+            order = sorted(range(len(tenants)), key=lambda i: -np.nan_to_num(shares[i]))
+            for rank, i in enumerate(order, start=1):
+                t = tenants[i]
+                yield rank, t.get(name_field, ""), shares[i], t.get(rating_field)
+            return
+
+def build_rating_table(raw_data, manual_ratings=None):
+    manual_ratings = manual_ratings or {}
+    rows = []
+    for loan_id, data in raw_data.items():
+        for path in CREDIT_ASSESSMENT_PATHS:
+            assessment = get_path(data, path)
+            if assessment:
+                rows.append((loan_id, "loan", "", 0, np.nan, parse_rating_field(assessment)))
+                break
+        for rank, name, share, rating in tenant_rows(data):
+            if rank == 1 and loan_id in manual_ratings:
+                rating = manual_ratings[loan_id]
+            rows.append((loan_id, "tenant", name, rank, share, parse_rating_field(rating)))
+
+    notches = np.array(
+        [[r[5].get(agency, NOT_RATED) for agency in AGENCIES] for r in rows],
+        dtype=np.int8
+    ).reshape(len(rows), len(AGENCIES))
+
+    table = pd.DataFrame({
+        "loan_id": [r[0] for r in rows],
+        "kind": pd.Categorical([r[1] for r in rows], categories=["loan", "tenant"]),
+        "tenant": [r[2] for r in rows],
+        "rank": np.array([r[3] for r in rows], dtype=np.int16),
+        "rent_share": np.array([r[4] for r in rows], dtype=np.float64),
+    })
+    for i, agency in enumerate(AGENCIES):
+        table[agency] = notches[:, i]
+    table["composite"] = composite_notch(notches) if len(rows) else np.array([], dtype=np.int8)
+    return table.set_index("loan_id").sort_index(kind="stable")
+
+# ------------------ Rating Masks ------------------
+
+def investment_grade(notches):
+    return (notches > NOT_RATED) & (notches <= INVESTMENT_GRADE_MAX)
+
+def below(notches, symbol):
+    return notches > parse_rating(symbol)
+
+def top_tenants(table):
+    return table[(table["kind"] == "tenant") & (table["rank"] == 1)]
+
+def investment_grade_top_tenant(table):
+    top = top_tenants(table)
+    return top.index[investment_grade(top["composite"].to_numpy())].unique()
+
+def rent_share_below(table, symbol="BBB-"):
+    tenants = table[table["kind"] == "tenant"]
+    share = np.where(below(tenants["composite"].to_numpy(), symbol), tenants["rent_share"].to_numpy(), 0.0)
+    return pd.Series(np.nan_to_num(share), index=tenants.index).groupby(level=0).sum()
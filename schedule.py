@@ -0,0 +1,119 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# ------------------ Amortization Schedules ------------------
+
+# Monthly schedules use rate / 12 (30/360). Amortizing payments are the level
+# payment over the amortization term, starting after the IO period.
+SCHEDULE_ARRAYS = ["balance", "interest", "principal", "debt_service"]
+TERM_HASH_COLUMNS = ["rate", "balance", "term_months", "amortization_months", "io_months"]
+# Cached per-loan schedules beyond the current terms table, kept so a reload
+# that reverts a loan's terms does not recompute it.
+MAX_STALE_ROWS = 256
+
+def term_hashes(terms):
+    return pd.util.hash_pandas_object(terms[TERM_HASH_COLUMNS].astype(np.float64), index=False).to_numpy()
+
+def level_payment(balance, rate, months):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            rate > 0,
+            balance * rate / (1 - (1 + rate) ** -months),
+            balance / months,
+        )
+
+def schedule_arrays(terms, months=None):
+    # loans x months arrays in one pass. Column m is payment m + 1; "balance"
+    # is the balance after that payment and goes to 0 after the term.
+    b0 = terms["balance"].to_numpy(dtype=np.float64)
+    r = terms["rate"].to_numpy(dtype=np.float64) / 100 / 12
+    term = np.nan_to_num(terms["term_months"].to_numpy(dtype=np.float64)).astype(np.int64)
+    amort = terms["amortization_months"].to_numpy(dtype=np.float64)
+    io = np.nan_to_num(terms["io_months"].to_numpy(dtype=np.float64)).astype(np.int64)
+    amortizing = ~np.isnan(amort) & (amort > 0)
+    months = int(months or (term.max() if len(term) else 0))
+
+    period = np.arange(1, months + 1)[None, :]
+    # Amortizing payments made by the end of each period.
+    k = np.clip(period - io[:, None], 0, None) * amortizing[:, None]
+    payment = np.where(amortizing, level_payment(b0, r, np.where(amortizing, amort, 1.0)), 0.0)
+    growth_k = (1 + r[:, None]) ** k
+    with np.errstate(invalid="ignore", divide="ignore"):
+        paid = np.where(r[:, None] > 0, payment[:, None] * (growth_k - 1) / r[:, None], payment[:, None] * k)
+    balance_end = b0[:, None] * growth_k - paid
+    # Fully amortized loans land on rounding dust rather than exactly zero.
+    balance_end = np.where(balance_end < 0.005, 0.0, balance_end)
+    balance_begin = np.concatenate([b0[:, None], balance_end[:, :-1]], axis=1)
+
+    in_term = period <= term[:, None]
+    interest = np.where(in_term, balance_begin * r[:, None], 0.0)
+    principal = np.where(in_term, balance_begin - balance_end, 0.0)
+    balance_end = np.where(in_term, balance_end, 0.0)
+    return {
+        "balance": balance_end,
+        "interest": interest,
+        "principal": principal,
+        "debt_service": interest + principal,
+        "balloon": balance_end[np.arange(len(term)), np.clip(term, 1, months) - 1] if months else np.zeros(len(term)),
+    }
+
+class Schedules:
+    # Per-loan schedule rows are cached by a hash of the loan's terms, so a
+    # rebuilt terms table only computes the loans whose terms changed. Rows for
+    # hashes no longer in the terms table are dropped, least recently used
+    # first, past `max_stale`.
+
+    def __init__(self, max_stale=MAX_STALE_ROWS):
+        self.lock = threading.Lock()
+        self.max_stale = max_stale
+        self.rows = OrderedDict()
+
+    def build(self, terms):
+        hashes = term_hashes(terms).tolist()
+        months = int(np.nan_to_num(terms["term_months"].to_numpy(dtype=np.float64)).max()) if len(terms) else 0
+        with self.lock:
+            missing = [i for i, h in enumerate(hashes) if h not in self.rows or len(self.rows[h]["balance"]) < months]
+        if missing:
+            fresh = schedule_arrays(terms.iloc[missing], months)
+            with self.lock:
+                for j, i in enumerate(missing):
+                    self.rows[hashes[i]] = {name: fresh[name][j] for name in fresh}
+        with self.lock:
+            rows = [self.rows[h] for h in hashes]
+            self.prune(hashes)
+        schedule = {
+            name: np.vstack([row[name][:months] for row in rows]) if rows else np.empty((0, months))
+            for name in SCHEDULE_ARRAYS
+        }
+        schedule["balloon"] = np.array([row["balloon"] for row in rows], dtype=np.float64)
+        schedule["loan_ids"] = terms.index.to_numpy()
+        schedule["first_payment"] = terms["first_payment"].to_numpy(dtype="datetime64[D]")
+        return schedule
+
+    def prune(self, hashes):
+        # Caller holds the lock. Current hashes move to the back so stale rows
+        # are evicted first; the current terms are never evicted.
+        for h in hashes:
+            self.rows.move_to_end(h)
+        current = set(hashes)
+        while len(self.rows) > len(current) + self.max_stale:
+            self.rows.popitem(last=False)
+
+def annual_debt_service(schedule, year=1):
+    # Sum of payments in loan year `year` (payments 12 * (year - 1) + 1 .. 12 * year).
+    return schedule["debt_service"][:, 12 * (year - 1):12 * year].sum(axis=1)
+
+def loan_schedule(schedule, loan_id):
+    i = int(np.flatnonzero(schedule["loan_ids"] == loan_id)[0])
+    paid = schedule["debt_service"][i] > 0
+    months = np.arange(len(paid))
+    frame = pd.DataFrame({name: schedule[name][i] for name in ["interest", "principal", "debt_service", "balance"]})
+    first = schedule["first_payment"][i]
+    day = first - first.astype("datetime64[M]").astype("datetime64[D]")
+    dates = (first.astype("datetime64[M]") + months.astype("timedelta64[M]")).astype("datetime64[D]") + day
+    frame.insert(0, "payment_date", pd.to_datetime(dates))
+    frame.insert(0, "payment", months + 1)
+    return frame[paid]
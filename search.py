@@ -0,0 +1,253 @@
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+from startup import cache_path, write_json
+
+# ------------------ Tokenizing ------------------
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.&'][a-z0-9]+)*")
+STOP_WORDS = {"the", "of", "and", "a", "an", "to", "in", "on", "for", "by", "at", "or", "is", "as", "with"}
+MAX_PATHS_SHOWN = 5
+# The last query term matches as a prefix once it has MIN_PREFIX characters,
+# expanding to at most MAX_EXPANSIONS of its most common completions.
+MIN_PREFIX = 3
+MAX_EXPANSIONS = 64
+# Bumped whenever the saved layout changes; other versions are rebuilt.
+INDEX_FORMAT = 1
+# Least seconds between saves of an index kept up to date in place.
+SAVE_INTERVAL = 60.0
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+def string_leaves(node, path=()):
+    # Yields (path tuple, text) for every string leaf; list positions are ints.
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from string_leaves(value, path + (key,))
+    elif isinstance(node, list):
+        for i, value in enumerate(node):
+            yield from string_leaves(value, path + (i,))
+    elif isinstance(node, str) and node.strip():
+        yield path, node
+
+def path_label(path):
+    label = ""
+    for key in path:
+        label += f"[{key}]" if isinstance(key, int) else (f".{key}" if label else str(key))
+    return label
+
+def leaf_value(data, path):
+    # "" when the loan changed since it was indexed and the path is gone.
+    try:
+        for key in path:
+            data = data[key]
+    except (KeyError, IndexError, TypeError):
+        return ""
+    return data
+
+def content_hash(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+# ------------------ Inverted Index ------------------
+
+class SearchIndex:
+    # token -> {loan_id: term count} for ranking, plus each loan's own
+    # token -> {path_id: count} map for field paths and removal, so a changed
+    # loan is dropped and re-added without a full rebuild.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = defaultdict(dict)
+        self.loan_tokens = {}
+        self.hashes = {}
+        self.paths = []
+        self.path_ids = {}
+        self.vocabulary = []
+        self.dirty = False
+        self.saved_at = float("-inf")
+
+    def path_id(self, path):
+        i = self.path_ids.get(path)
+        if i is None:
+            i = self.path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        return i
+
+    def remove_loan(self, loan_id):
+        for token in self.loan_tokens.pop(loan_id, {}):
+            entries = self.postings.get(token)
+            if entries is not None:
+                entries.pop(loan_id, None)
+                if not entries:
+                    del self.postings[token]
+        self.hashes.pop(loan_id, None)
+
+    def add_loan(self, loan_id, data):
+        tokens = defaultdict(dict)
+        for path, text in string_leaves(data):
+            pid = self.path_id(path)
+            for token in tokenize(text):
+                paths = tokens[token]
+                paths[pid] = paths.get(pid, 0) + 1
+        for token, paths in tokens.items():
+            self.postings[token][loan_id] = sum(paths.values())
+        self.loan_tokens[loan_id] = dict(tokens)
+
+    def update(self, raw_data, loan_ids=None):
+        # Re-indexes loans whose content hash changed (only `loan_ids` when
+        # given) and drops loans no longer present; returns the count.
+        with self.lock:
+            changed = 0
+            for loan_id in set(self.hashes) - set(raw_data):
+                self.remove_loan(loan_id)
+                changed += 1
+            for loan_id in (raw_data if loan_ids is None else loan_ids):
+                data = raw_data.get(loan_id)
+                if data is None:
+                    continue
+                digest = content_hash(data)
+                if self.hashes.get(loan_id) == digest:
+                    continue
+                self.remove_loan(loan_id)
+                self.add_loan(loan_id, data)
+                self.hashes[loan_id] = digest
+                changed += 1
+            if changed:
+                self.vocabulary = sorted(self.postings)
+                self.dirty = True
+            return changed
+
+    def expand(self, token):
+        # Prefix matches from the sorted vocabulary (search-as-you-type).
+        if len(token) < MIN_PREFIX:
+            return [token]
+        start = bisect.bisect_left(self.vocabulary, token)
+        end = bisect.bisect_left(self.vocabulary, token + "\uffff")
+        tokens = self.vocabulary[start:end]
+        if len(tokens) > MAX_EXPANSIONS:
+            tokens = heapq.nlargest(MAX_EXPANSIONS, tokens, key=lambda t: len(self.postings[t]))
+        return tokens
+
+    def search(self, query, limit=50):
+        # Every query term must match (the last one as a prefix). Loans are
+        # ranked by summed idf x log(1 + term count); field paths are looked
+        # up only for the loans returned.
+        terms = tokenize(query)
+        if not terms:
+            return pd.DataFrame(columns=["loan_id", "score", "fields", "paths"])
+        with self.lock:
+            n_loans = max(len(self.loan_tokens), 1)
+            scores = None
+            used = []
+            for position, term in enumerate(terms):
+                tokens = self.expand(term) if position == len(terms) - 1 else [term]
+                used.extend(tokens)
+                term_scores = defaultdict(float)
+                for token in tokens:
+                    entries = self.postings.get(token, {})
+                    if not entries:
+                        continue
+                    idf = math.log(1 + n_loans / len(entries))
+                    for loan_id, count in entries.items():
+                        term_scores[loan_id] += idf * math.log1p(count)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {loan_id: s + term_scores[loan_id] for loan_id, s in scores.items() if loan_id in term_scores}
+                if not scores:
+                    break
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            rows = []
+            for loan_id, score in ranked:
+                matched = defaultdict(int)
+                own = self.loan_tokens[loan_id]
+                for token in used:
+                    for pid, count in own.get(token, {}).items():
+                        matched[pid] += count
+                paths = sorted(matched.items(), key=lambda item: -item[1])
+                rows.append((loan_id, score, len(paths), [self.paths[pid] for pid, _ in paths[:MAX_PATHS_SHOWN]]))
+        return pd.DataFrame(rows, columns=["loan_id", "score", "fields", "paths"])
+
+    # ------------------ Persistence ------------------
+
+    # Saved as plain JSON: paths as lists of keys and list positions, each
+    # loan's tokens as [token, [[path id, count], ...]] pairs. Postings are
+    # rebuilt from the loans on load.
+
+    def save(self, path):
+        with self.lock:
+            state = {
+                "format": INDEX_FORMAT,
+                "paths": [list(p) for p in self.paths],
+                "hashes": self.hashes,
+                "loans": {
+                    loan_id: [[token, [[pid, count] for pid, count in paths.items()]] for token, paths in tokens.items()]
+                    for loan_id, tokens in self.loan_tokens.items()
+                },
+            }
+            write_json(path, state)
+            self.dirty = False
+            self.saved_at = time.monotonic()
+
+    def save_due(self, path, interval=SAVE_INTERVAL):
+        # Saves once the index has changed and `interval` seconds have passed
+        # since the last save, so a run of reloads writes the file once.
+        with self.lock:
+            if not self.dirty or time.monotonic() - self.saved_at < interval:
+                return False
+        self.save(path)
+        return True
+
+    @classmethod
+    def load(cls, path):
+        # A missing, truncated, other-format or malformed file gives an empty
+        # index, which the next update() rebuilds in full; a partly loaded one
+        # is never returned.
+        try:
+            with open(path) as f:
+                state = json.load(f)
+            if state["format"] != INDEX_FORMAT:
+                raise ValueError("search index format changed")
+            index = cls()
+            for p in state["paths"]:
+                if not all(isinstance(key, (str, int)) for key in p):
+                    raise ValueError("bad search index path")
+                index.path_id(tuple(p))
+            for loan_id, digest in state["hashes"].items():
+                if not isinstance(digest, str):
+                    raise ValueError("bad search index hash")
+                index.hashes[loan_id] = digest
+            if set(index.hashes) != set(state["loans"]):
+                raise ValueError("search index hashes and loans disagree")
+            for loan_id, tokens in state["loans"].items():
+                own = {}
+                for token, paths in tokens:
+                    counts = {int(pid): int(count) for pid, count in paths}
+                    if not isinstance(token, str) or not all(0 <= pid < len(index.paths) for pid in counts):
+                        raise ValueError("bad search index token")
+                    own[token] = counts
+                    index.postings[token][loan_id] = sum(counts.values())
+                index.loan_tokens[loan_id] = own
+            index.vocabulary = sorted(index.postings)
+            return index
+        except Exception:
+            return cls()
+
+def index_path(data_path):
+    return cache_path(data_path, "search.json")
+
+def load_search_index(data_path, raw_data):
+    index = SearchIndex.load(index_path(data_path))
+    if index.update(raw_data):
+        index.save(index_path(data_path))
+    return index
@@ -0,0 +1,122 @@
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from comps import nearest
+
+# ------------------ Loan Features ------------------
+
+NUMERIC_FEATURES = ["sqft", "balance", "dscr", "debt_yield", "ltv", "occupancy", "term_months"]
+LOG_FEATURES = {"sqft", "balance"}
+# One-hot features and the weight of a mismatch relative to one standard deviation.
+CATEGORICAL_FEATURES = {"property_type": 1.5, "state": 0.75}
+
+def numeric_column(name, values):
+    values = np.asarray(values, dtype=np.float64)
+    if name in LOG_FEATURES:
+        return np.log(np.where(values > 0, values, np.nan))
+    return values
+
+class LoanIndex:
+    # Standardized numeric features plus weighted one-hot categories, searched
+    # with blocked top-k. Loans are added, replaced or removed in place; call
+    # rebuild() to refresh the standardization after large changes.
+
+    def __init__(self, frame):
+        self.lock = threading.Lock()
+        self.rebuild(frame)
+
+    def rebuild(self, frame):
+        with self.lock:
+            self.frame = frame.reset_index(drop=True).copy()
+            raw = np.column_stack([numeric_column(f, self.frame[f]) for f in NUMERIC_FEATURES]) \
+                if len(self.frame) else np.empty((0, len(NUMERIC_FEATURES)))
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                self.mean = np.nan_to_num(np.nanmean(raw, axis=0)) if len(raw) else np.zeros(len(NUMERIC_FEATURES))
+                std = np.nanstd(raw, axis=0) if len(raw) else np.ones(len(NUMERIC_FEATURES))
+            self.std = np.where((std > 0) & np.isfinite(std), std, 1.0)
+            self.categories = {
+                name: list(pd.unique(self.frame[name].fillna("").astype(str))) for name in CATEGORICAL_FEATURES
+            }
+            parts = [np.nan_to_num((raw - self.mean) / self.std)]
+            for name, weight in CATEGORICAL_FEATURES.items():
+                codes = pd.Index(self.categories[name]).get_indexer(self.frame[name].fillna("").astype(str))
+                parts.append(np.eye(len(self.categories[name]))[codes] * weight)
+            self.matrix = np.hstack(parts)
+            self.positions = {loan_id: i for i, loan_id in enumerate(self.frame["loan_id"])}
+            self.active = np.ones(len(self.frame), dtype=bool)
+
+    def vector(self, profile, with_weights=False):
+        # Features missing from `profile` get weight 0 so they never count.
+        values = np.array([
+            numeric_column(f, [profile[f]])[0] if profile.get(f) is not None else np.nan
+            for f in NUMERIC_FEATURES
+        ])
+        weights = [np.where(np.isnan(values), 0.0, 1.0)]
+        parts = [np.nan_to_num((values - self.mean) / self.std)]
+        for name, weight in CATEGORICAL_FEATURES.items():
+            vocab = self.categories[name]
+            one_hot = np.zeros(len(vocab))
+            value = profile.get(name)
+            if value is not None and str(value) in vocab:
+                one_hot[vocab.index(str(value))] = weight
+            parts.append(one_hot)
+            weights.append(np.full(len(vocab), 1.0 if value is not None else 0.0))
+        vector = np.concatenate(parts)
+        return (vector, np.concatenate(weights)) if with_weights else vector
+
+    def add_category(self, name, value):
+        # New category: append an all-zero one-hot column to every row.
+        offset = len(NUMERIC_FEATURES)
+        for other in CATEGORICAL_FEATURES:
+            offset += len(self.categories[other])
+            if other == name:
+                break
+        self.categories[name].append(value)
+        self.matrix = np.insert(self.matrix, offset, 0.0, axis=1)
+
+    def update(self, loan_id, row):
+        with self.lock:
+            row = dict(row, loan_id=loan_id)
+            for name in CATEGORICAL_FEATURES:
+                value = str(row.get(name) or "")
+                if value not in self.categories[name]:
+                    self.add_category(name, value)
+            vector = self.vector(row)
+            i = self.positions.get(loan_id)
+            if i is None:
+                self.positions[loan_id] = len(self.frame)
+                self.frame.loc[len(self.frame)] = pd.Series(row)
+                self.matrix = np.vstack([self.matrix, vector])
+                self.active = np.append(self.active, True)
+            else:
+                for column, value in row.items():
+                    self.frame.at[i, column] = value
+                self.matrix[i] = vector
+                self.active[i] = True
+
+    def remove(self, loan_id):
+        with self.lock:
+            i = self.positions.pop(loan_id, None)
+            if i is not None:
+                self.active[i] = False
+
+    def query(self, loan_id=None, profile=None, k=5):
+        # Top-k neighbours of a loan on the book (itself excluded) or of an
+        # ad-hoc profile mapping feature names to values.
+        with self.lock:
+            exclude = None
+            if loan_id is not None:
+                exclude = self.positions[loan_id]
+                profile = self.frame.iloc[exclude].to_dict()
+            point, weights = self.vector(profile, with_weights=True)
+            rows = np.flatnonzero(self.active)
+            if exclude is not None:
+                rows = rows[rows != exclude]
+            found, dist = nearest(self.matrix, point, k, weights, rows)
+            result = self.frame.iloc[found].copy()
+        result["distance"] = dist
+        return result
@@ -0,0 +1,201 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from stress import stress_inputs
+
+# ------------------ Simulation Parameters ------------------
+
+DEFAULT_PARAMS = {
+    "paths": 10000,
+    "block_paths": 250,
+    "seed": 7,
+    "noi_vol": 0.08,           # annual log-vol of NOI
+    "cap_rate_vol": 0.0050,    # annual cap-rate move per unit market shock
+    "market_weight": 0.35,     # share of NOI variance from the market factor
+    "type_weight": 0.25,       # share from the property-type factor
+    "refi_ltv": 80.0,          # maturity default above this LTV (%)
+    "liquidation_cost": 0.10,  # fraction of value lost on liquidation
+    "default_term_years": 10,  # horizon for loans without a maturity date
+}
+
+LOSS_BINS = 1000  # portfolio loss histogram over 0-100% of balance
+
+def freeze_params(params):
+    return tuple(sorted(params.items()))
+
+# ------------------ Simulation Inputs ------------------
+
+def simulation_inputs(summary, financials, loan_terms, schedule, as_of=None,
+                      default_term_years=DEFAULT_PARAMS["default_term_years"]):
+    x = stress_inputs(summary, financials, loan_terms, schedule)
+    as_of = np.datetime64(as_of or "today", "M")
+    maturity = summary["maturity_date"].to_numpy(dtype="datetime64[M]")
+    months = (maturity - as_of).astype(np.float64)
+    months[np.isnat(maturity)] = default_term_years * 12
+    type_codes, type_names = pd.factorize(summary["property_type"].fillna("other"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cap_rate = x["noi"] / x["value"]
+    usable = (x["noi"] > 0) & (x["value"] > 0) & (x["debt_service"] > 0) & (x["basis"] > 0)
+    return {
+        "noi": x["noi"],
+        "ncf_ratio": np.nan_to_num(x["ncf"] / np.where(x["noi"] > 0, x["noi"], np.nan), nan=1.0),
+        "cap_rate": cap_rate,
+        "basis": x["basis"],
+        "debt_service": x["debt_service"],
+        "balance": np.nan_to_num(summary["balance"].to_numpy(dtype=np.float64)),
+        "years": np.clip(np.ceil(months / 12), 1, None).astype(np.int64),
+        "type_codes": type_codes,
+        "type_count": len(type_names),
+        "usable": usable,
+    }
+
+# ------------------ Block Simulation ------------------
+
+def empty_aggregates(n_loans):
+    return {
+        "paths": 0,
+        "term_defaults": np.zeros(n_loans),
+        "maturity_defaults": np.zeros(n_loans),
+        "loss_sum": np.zeros(n_loans),
+        "loss_sq_sum": np.zeros(n_loans),
+        "portfolio_hist": np.zeros(LOSS_BINS, dtype=np.int64),
+        "portfolio_loss_sum": 0.0,
+        "portfolio_loss_sq_sum": 0.0,
+        "portfolio_loss_max": 0.0,
+    }
+
+def simulate_block(inputs, params, seed, n_paths):
+    # Walks n_paths x loans forward one year at a time and returns only the
+    # per-loan and portfolio aggregates, so memory is bounded by the block.
+    rng = np.random.default_rng(seed)
+    x = inputs
+    n_loans = len(x["noi"])
+    horizon = int(x["years"].max()) if n_loans else 0
+    a = np.sqrt(params["market_weight"])
+    b = np.sqrt(params["type_weight"])
+    c = np.sqrt(max(1.0 - params["market_weight"] - params["type_weight"], 0.0))
+    vol = params["noi_vol"]
+
+    log_noi = np.zeros((n_paths, n_loans))
+    cap = np.broadcast_to(x["cap_rate"], (n_paths, n_loans)).copy()
+    alive = np.broadcast_to(x["usable"], (n_paths, n_loans)).copy()
+    term_default = np.zeros((n_paths, n_loans), dtype=bool)
+    maturity_default = np.zeros((n_paths, n_loans), dtype=bool)
+    loss = np.zeros((n_paths, n_loans))
+
+    for year in range(horizon):
+        market = rng.standard_normal((n_paths, 1))
+        sector = rng.standard_normal((n_paths, x["type_count"]))[:, x["type_codes"]]
+        shock = a * market + b * sector + c * rng.standard_normal((n_paths, n_loans))
+        log_noi += vol * shock - vol ** 2 / 2
+        # Cap rates widen when the market factor is weak.
+        cap = np.maximum(cap - params["cap_rate_vol"] * market, 0.01)
+
+        noi = x["noi"] * np.exp(log_noi)
+        value = noi / cap
+        dscr = noi * x["ncf_ratio"] / x["debt_service"]
+        at_maturity = x["years"] - 1 == year
+
+        term = alive & (dscr < 1.0)
+        refi = alive & ~term & at_maturity & (x["basis"] / value * 100 > params["refi_ltv"])
+        defaulted = term | refi
+        # Whole-loan loss on liquidation, allocated pro rata to the note.
+        recovery = value * (1 - params["liquidation_cost"])
+        whole_loss = np.clip(x["basis"] - recovery, 0.0, x["basis"])
+        loss = np.where(defaulted, whole_loss * x["balance"] / x["basis"], loss)
+        term_default |= term
+        maturity_default |= refi
+        alive &= ~defaulted & ~at_maturity
+
+    total_balance = x["balance"].sum()
+    portfolio_loss = loss.sum(axis=1) / total_balance if total_balance > 0 else np.zeros(n_paths)
+    bins = np.clip((portfolio_loss * LOSS_BINS).astype(np.int64), 0, LOSS_BINS - 1)
+    return {
+        "paths": n_paths,
+        "term_defaults": term_default.sum(axis=0).astype(np.float64),
+        "maturity_defaults": maturity_default.sum(axis=0).astype(np.float64),
+        "loss_sum": loss.sum(axis=0),
+        "loss_sq_sum": (loss ** 2).sum(axis=0),
+        "portfolio_hist": np.bincount(bins, minlength=LOSS_BINS),
+        "portfolio_loss_sum": float(portfolio_loss.sum()),
+        "portfolio_loss_sq_sum": float((portfolio_loss ** 2).sum()),
+        "portfolio_loss_max": float(portfolio_loss.max()) if n_paths else 0.0,
+    }
+
+def merge_aggregates(total, block):
+    for key, value in block.items():
+        if key == "portfolio_loss_max":
+            total[key] = max(total[key], value)
+        else:
+            total[key] = total[key] + value
+    return total
+
+# Worker processes get the inputs once through the pool initializer.
+WORKER_STATE = {}
+
+def init_worker(inputs, params):
+    WORKER_STATE["inputs"] = inputs
+    WORKER_STATE["params"] = params
+
+def run_worker_block(seed, n_paths):
+    return simulate_block(WORKER_STATE["inputs"], WORKER_STATE["params"], seed, n_paths)
+
+def block_plan(params):
+    # One child seed per block, so results don't depend on the worker count.
+    sizes = [params["block_paths"]] * (params["paths"] // params["block_paths"])
+    if params["paths"] % params["block_paths"]:
+        sizes.append(params["paths"] % params["block_paths"])
+    seeds = np.random.SeedSequence(params["seed"]).spawn(len(sizes))
+    return list(zip(seeds, sizes))
+
+def simulate(inputs, params=None, workers=None):
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    plan = block_plan(params)
+    total = empty_aggregates(len(inputs["noi"]))
+    workers = min(workers or os.cpu_count() or 1, len(plan))
+    if workers <= 1:
+        for seed, n_paths in plan:
+            merge_aggregates(total, simulate_block(inputs, params, seed, n_paths))
+        return total
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(inputs, params)) as pool:
+        for block in pool.map(run_worker_block, *zip(*plan)):
+            merge_aggregates(total, block)
+    return total
+
+# ------------------ Results ------------------
+
+def loan_results(total, loan_ids):
+    n = max(total["paths"], 1)
+    mean = total["loss_sum"] / n
+    return pd.DataFrame({
+        "loan_id": loan_ids,
+        "term_default_prob": total["term_defaults"] / n * 100,
+        "maturity_default_prob": total["maturity_defaults"] / n * 100,
+        "expected_loss": mean,
+        "loss_std": np.sqrt(np.maximum(total["loss_sq_sum"] / n - mean ** 2, 0.0)),
+    })
+
+def portfolio_results(total, quantiles=(0.5, 0.95, 0.99, 0.999)):
+    n = max(total["paths"], 1)
+    mean = total["portfolio_loss_sum"] / n
+    cdf = np.cumsum(total["portfolio_hist"]) / n
+    stats = {
+        "paths": total["paths"],
+        "expected_loss_pct": mean * 100,
+        "loss_std_pct": np.sqrt(max(total["portfolio_loss_sq_sum"] / n - mean ** 2, 0.0)) * 100,
+        "max_loss_pct": total["portfolio_loss_max"] * 100,
+    }
+    for q in quantiles:
+        # Upper edge of the histogram bin holding the quantile.
+        stats[f"p{q * 100:g}_loss_pct"] = (np.searchsorted(cdf, q) + 1) / LOSS_BINS * 100
+    return stats
+
+def loss_distribution(total):
+    n = max(total["paths"], 1)
+    hist = pd.Series(total["portfolio_hist"] / n * 100, index=np.arange(LOSS_BINS) / LOSS_BINS * 100)
+    hist.index.name = "portfolio_loss_pct"
+    last = np.flatnonzero(total["portfolio_hist"])
+    return hist.iloc[:last[-1] + 1] if len(last) else hist.iloc[:1]
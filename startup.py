@@ -0,0 +1,158 @@
+import builtins
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Imported first by app.py, so only the standard library here: everything
+# heavier loads after the first paint.
+
+# ------------------ Cache Files ------------------
+
+def cache_path(data_path, suffix):
+    # Persisted next to the data, e.g. data/.cache/dataset.<suffix> for a
+    # directory or data/.cache/master_combined_loans.<suffix> for a single file.
+    if os.path.isdir(data_path):
+        return os.path.join(data_path, ".cache", "dataset." + suffix)
+    folder, name = os.path.split(data_path)
+    return os.path.join(folder, ".cache", os.path.splitext(name)[0] + "." + suffix)
+
+def write_json(path, obj):
+    # Written beside the target and renamed over it, so readers never see a
+    # half-written file.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "w") as f:
+        json.dump(obj, f)
+    os.replace(temp, path)
+
+# ------------------ Startup Profile ------------------
+
+class StartupProfile:
+    # One per process. Times are seconds since the first script run imported
+    # this module: inclusive import time per module, then named milestones
+    # (first_paint, data_loaded, ready, rendered), each kept the first time
+    # it is reached.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.modules = {}
+        self.marks = {}
+        self.saved = False
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def imports(self):
+        # Times each not-yet-loaded module imported directly inside the block
+        # (nested imports count toward their importer). Other threads and
+        # later reruns import untimed.
+        original = builtins.__import__
+        thread = threading.get_ident()
+        depth = [0]
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if depth[0] or level or name in sys.modules or threading.get_ident() != thread:
+                return original(name, globals, locals, fromlist, level)
+            depth[0] += 1
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                depth[0] -= 1
+                self.record(name, time.perf_counter() - start)
+
+        builtins.__import__ = timed_import
+        try:
+            yield
+        finally:
+            builtins.__import__ = original
+
+    def record(self, module, seconds):
+        with self.lock:
+            self.modules.setdefault(module, seconds)
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.setdefault(name, self.elapsed())
+
+    def reached(self, name):
+        with self.lock:
+            return name in self.marks
+
+    def report(self):
+        with self.lock:
+            return {
+                "started_at": self.started_at,
+                "pid": os.getpid(),
+                "modules": dict(sorted(self.modules.items(), key=lambda item: -item[1])),
+                "marks": dict(sorted(self.marks.items(), key=lambda item: item[1])),
+            }
+
+    def save(self, path):
+        # Once per process, after the first full render.
+        with self.lock:
+            if self.saved:
+                return
+            self.saved = True
+        try:
+            write_json(path, self.report())
+        except OSError:
+            pass
+
+PROFILE = StartupProfile()
+
+class LazyModule:
+    # Stands in for a module until an attribute is first read, then imports
+    # it and records the import time in the startup profile.
+
+    def __init__(self, name, profile=PROFILE):
+        self.name = name
+        self.profile = profile
+        self.module = None
+
+    def __getattr__(self, attr):
+        if self.module is None:
+            start = time.perf_counter()
+            loaded = self.name in sys.modules
+            self.module = importlib.import_module(self.name)
+            if not loaded:
+                self.profile.record(self.name, time.perf_counter() - start)
+        return getattr(self.module, attr)
+
+# ------------------ First Paint ------------------
+
+class FirstPaint:
+    # The last rendered default summary (headline metrics and table HTML),
+    # persisted so a fresh process can paint it before the corpus is loaded.
+    # Written once per dataset version; a stale copy is shown as such and
+    # replaced by the live view as soon as it is ready.
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.path = path
+        self.version = None
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, version, metrics, table_html):
+        with self.lock:
+            if version == self.version:
+                return
+            self.version = version
+        try:
+            write_json(self.path, {"saved_at": time.time(), "metrics": metrics, "table_html": table_html})
+        except OSError:
+            # Read-only data directory: workers just start without a snapshot.
+            pass
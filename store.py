@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from portfolio import STAT_METRICS, WEIGHT_COLUMN
+
+# ------------------ Schema ------------------
+
+# Indexed column sets per table; every table also gets one on loan_id.
+INDEXES = {
+    "loans": [("maturity_date",), ("property_type",), ("state",), ("issuer",)],
+    "notes": [("maturity",)],
+}
+
+def store_tables(summary, tables):
+    # The normalized model as flat frames keyed by loan_id.
+    ratings = tables["ratings"]
+    return {
+        "loans": summary,
+        "notes": tables["loan_terms"].reset_index(),
+        "cash_flow": tables["financials"].reset_index(),
+        "tenants": ratings[ratings["kind"] == "tenant"].drop(columns="kind").reset_index(),
+        "rollover": tables["rollover"],
+        "lease_comps": tables["lease_comps"],
+        "sales_comps": tables["sales_comps"],
+    }
+
+def column_type(series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(series):
+        return "REAL"
+    return "TEXT"
+
+def sql_values(series):
+    # Dates as ISO text so they sort and compare in SQL; NaN/NaT as NULL.
+    if pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime("%Y-%m-%d")
+    values = series.astype(object).where(series.notna(), None).tolist()
+    return [v if v is None or isinstance(v, (str, int, float)) else str(v) for v in values]
+
+def sql_rows(frame):
+    return list(zip(*[sql_values(frame[column]) for column in frame.columns]))
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+# ------------------ Ingest ------------------
+
+def connect(path, read_only=False):
+    if read_only:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+class StoreWriter:
+    # The single writing connection. A full load recreates every table; with
+    # loan_ids only those loans' rows are deleted and re-inserted. Each write
+    # is one transaction, so WAL readers see the old version or the new one.
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = connect(path)
+
+    def write(self, summary, tables, version, loan_ids=None):
+        frames = store_tables(summary, tables)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name, frame in frames.items():
+                    if loan_ids is None:
+                        self.create(name, frame)
+                        rows = frame
+                    else:
+                        ids = [(loan_id,) for loan_id in loan_ids]
+                        self.conn.executemany(f"DELETE FROM {quote(name)} WHERE loan_id = ?", ids)
+                        rows = frame[frame["loan_id"].isin(loan_ids)]
+                    if len(rows):
+                        marks = ", ".join("?" * len(frame.columns))
+                        self.conn.executemany(f"INSERT INTO {quote(name)} VALUES ({marks})", sql_rows(rows))
+                self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (int(version),))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def create(self, name, frame):
+        columns = ", ".join(f"{quote(c)} {column_type(frame[c])}" for c in frame.columns)
+        self.conn.execute(f"DROP TABLE IF EXISTS {quote(name)}")
+        self.conn.execute(f"CREATE TABLE {quote(name)} ({columns})")
+        for index_columns in [("loan_id",)] + INDEXES.get(name, []):
+            index = f"{name}_{'_'.join(index_columns)}"
+            self.conn.execute(f"CREATE INDEX {quote(index)} ON {quote(name)} ({', '.join(map(quote, index_columns))})")
+
+# ------------------ Query Layer ------------------
+
+class LoanStore:
+    # One read-only connection shared by every session. sqlite3 connections
+    # are not safe to use from two threads at once, so queries take a lock.
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        self.conn = connect(path, read_only=True)
+        self.columns = {}
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return pd.read_sql_query(sql, self.conn, params=list(params))
+
+    def table_columns(self, table):
+        if table not in self.columns:
+            with self.lock:
+                rows = self.conn.execute(f"PRAGMA table_info({quote(table)})").fetchall()
+            self.columns[table] = [row[1] for row in rows]
+        return self.columns[table]
+
+    def where(self, filters, table="loans"):
+        # Dashboard filters ({column: allowed values}) as a parameterized WHERE.
+        known = set(self.table_columns(table))
+        clauses, params = [], []
+        for column, allowed in filters.items():
+            if not allowed:
+                continue
+            if column not in known:
+                raise KeyError(f"{table} has no column {column!r}")
+            clauses.append(f"{quote(column)} IN ({', '.join('?' * len(allowed))})")
+            params.extend(str(a) for a in allowed)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def loans(self, filters, order_by=None, descending=False, columns=("loan_id",)):
+        where, params = self.where(filters)
+        known = set(self.table_columns("loans"))
+        sql = f"SELECT {', '.join(quote(c) for c in columns if c in known)} FROM loans{where}"
+        if order_by in known:
+            sql += f" ORDER BY {quote(order_by)} IS NULL, {quote(order_by)} {'DESC' if descending else 'ASC'}, rowid"
+        return self.query(sql, params)
+
+    def stats(self, filters, metrics=STAT_METRICS, weight=WEIGHT_COLUMN):
+        # Same balance-weighted averages as PortfolioStats: a loan counts
+        # toward a metric only where that metric is present.
+        where, params = self.where(filters)
+        w = quote(weight)
+        averages = [
+            f"TOTAL({w} * {quote(column)}) / NULLIF(TOTAL(CASE WHEN {quote(column)} IS NOT NULL THEN {w} END), 0)"
+            for column, _ in metrics
+        ]
+        row = self.query(f"SELECT COUNT(*), TOTAL({w}), {', '.join(averages)} FROM loans{where}", params).iloc[0]
+        stats = {label: float(value) if pd.notna(value) else np.nan for (_, label), value in zip(metrics, row.iloc[2:])}
+        stats["Loans"] = int(row.iloc[0])
+        stats["Balance"] = float(row.iloc[1])
+        return stats
+
+    def version(self):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
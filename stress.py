@@ -0,0 +1,137 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from metrics import whole_loan_debt_service
+
+# ------------------ Scenarios ------------------
+
+# noi_haircut: fraction of NOI lost; cap_rate_shift: decimal cap-rate widening;
+# occupancy_drop: occupancy points lost (rent falls in proportion).
+SCENARIO_COLUMNS = ["noi_haircut", "cap_rate_shift", "occupancy_drop"]
+
+DEFAULT_THRESHOLDS = {"dscr": 1.25, "debt_yield": 8.0, "ltv": 75.0}
+# Scenario sets kept per engine; the engine is shared by every session.
+MAX_RESULTS = 64
+
+def scenario_grid(noi_haircuts=(0.0,), cap_rate_shifts=(0.0,), occupancy_drops=(0.0,)):
+    return pd.DataFrame(
+        list(itertools.product(noi_haircuts, cap_rate_shifts, occupancy_drops)),
+        columns=SCENARIO_COLUMNS,
+        dtype=np.float64,
+    )
+
+def scenario_label(row):
+    return f"NOI -{row['noi_haircut']:.0%} / Cap +{row['cap_rate_shift'] * 10000:.0f}bp / Occ -{row['occupancy_drop']:.0f}pt"
+
+def freeze_scenarios(scenarios):
+    return tuple(map(tuple, scenarios[SCENARIO_COLUMNS].to_numpy(dtype=np.float64).tolist()))
+
+# ------------------ Stress Engine ------------------
+
+def stress_inputs(summary, financials, loan_terms, schedule):
+    # Aligns the financials to the summary rows. Annual debt service is the
+    # underwritten schedule's, scaled to the whole loan; loans without a usable
+    # schedule fall back to interest-only on the whole loan. Debt yield is on
+    # the senior notes, LTV on the whole loan.
+    fin = financials.reindex(summary["loan_id"])
+    noi = fin["noi"].to_numpy(dtype=np.float64)
+    ncf = fin["ncf"].fillna(fin["noi"]).to_numpy(dtype=np.float64)
+    basis = fin["whole_loan_balance"].to_numpy(dtype=np.float64)
+    senior = fin["senior_balance"].fillna(fin["whole_loan_balance"]).to_numpy(dtype=np.float64)
+    rate = summary["interest_rate"].to_numpy(dtype=np.float64) / 100
+    debt_service = whole_loan_debt_service(financials, loan_terms, schedule, summary["loan_id"])
+    with np.errstate(invalid="ignore"):
+        debt_service = np.where(debt_service > 0, debt_service, basis * rate)
+    return {
+        "noi": noi,
+        "ncf": ncf,
+        "value": fin["appraised_value"].to_numpy(dtype=np.float64),
+        "basis": basis,
+        "senior_basis": senior,
+        "debt_service": debt_service,
+        "occupancy": summary["occupancy"].to_numpy(dtype=np.float64),
+    }
+
+class StressEngine:
+    # Every metric is a scenarios x loans array from one broadcast; results
+    # are cached per scenario set, dropping the least recently used past
+    # `max_results`.
+
+    def __init__(self, summary, financials, loan_terms, schedule, max_results=MAX_RESULTS):
+        self.loan_ids = summary["loan_id"].to_numpy()
+        self.inputs = stress_inputs(summary, financials, loan_terms, schedule)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cap_rate = self.inputs["noi"] / self.inputs["value"]
+        # No appraised value or NOI means no implied cap rate; those loans get
+        # a NaN LTV rather than an infinite one.
+        self.cap_rate = np.where(np.isfinite(cap_rate) & (cap_rate > 0), cap_rate, np.nan)
+        self.lock = threading.Lock()
+        self.max_results = max_results
+        self.results = OrderedDict()
+
+    def run(self, scenarios):
+        key = freeze_scenarios(scenarios)
+        with self.lock:
+            if key in self.results:
+                self.results.move_to_end(key)
+                return self.results[key]
+
+        grid = np.array(key, dtype=np.float64).reshape(-1, len(SCENARIO_COLUMNS))
+        haircut, shift, drop = (grid[:, [i]] for i in range(len(SCENARIO_COLUMNS)))
+        x = self.inputs
+        occupancy = np.where(np.isnan(x["occupancy"]), 100.0, x["occupancy"])
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            occupancy_factor = np.clip((occupancy - drop) / occupancy, 0.0, 1.0)
+            noi = x["noi"] * (1 - haircut) * occupancy_factor
+            # Lost NOI comes straight out of cash flow; reserves don't shrink.
+            ncf = x["ncf"] - (x["noi"] - noi)
+            # A stressed value of zero or less is a real breach (infinite LTV);
+            # missing inputs stay NaN through to the ratio.
+            value = noi / (self.cap_rate + shift)
+            result = {
+                "scenarios": pd.DataFrame(grid, columns=SCENARIO_COLUMNS),
+                "dscr": ncf / x["debt_service"],
+                "debt_yield": noi / x["senior_basis"] * 100,
+                "ltv": np.where(np.isnan(value), np.nan, np.where(value > 0, x["basis"] / value * 100, np.inf)),
+            }
+
+        with self.lock:
+            self.results[key] = result
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+        return result
+
+    def breaches(self, result, thresholds=DEFAULT_THRESHOLDS):
+        # True where a loan crosses any threshold; NaN metrics never breach.
+        with np.errstate(invalid="ignore"):
+            return (
+                (result["dscr"] < thresholds["dscr"])
+                | (result["debt_yield"] < thresholds["debt_yield"])
+                | (result["ltv"] > thresholds["ltv"])
+            )
+
+    def breach_summary(self, result, thresholds=DEFAULT_THRESHOLDS, weights=None, mask=None):
+        breached = self.breaches(result, thresholds)
+        if mask is not None:
+            breached = breached & mask
+        weights = np.ones(breached.shape[1]) if weights is None else np.nan_to_num(weights)
+        table = result["scenarios"].copy()
+        table.insert(0, "scenario", table.apply(scenario_label, axis=1))
+        table["loans_breaching"] = breached.sum(axis=1)
+        table["balance_breaching"] = breached @ weights
+        return table
+
+    def loan_metrics(self, result, scenario, thresholds=DEFAULT_THRESHOLDS):
+        table = pd.DataFrame({
+            "loan_id": self.loan_ids,
+            "dscr": result["dscr"][scenario],
+            "debt_yield": result["debt_yield"][scenario],
+            "ltv": result["ltv"][scenario],
+        })
+        table["breach"] = self.breaches(result, thresholds)[scenario]
+        return table
@@ -0,0 +1,127 @@
+import argparse
+import copy
+import json
+import os
+import random
+import re
+
+# ------------------ Synthetic Corpus ------------------
+
+# A leaf is a dollar amount when the nearest key on its path (its own key,
+# then its parents') that names a money or a ratio field names a money one:
+# ("net_operating_income", "2019") scales, ("historical_occupancy", "2019")
+# and "base_rent_psf" or lease counts don't. Strings that are a whole currency amount
+# ("$1,250,000", "($3,200)") also scale when no key decides; free text is
+# never rewritten. Scaling every amount by one factor keeps sources/uses and
+# the reported financials consistent with each other.
+MONEY_KEYS = (
+    "balance", "value", "amount", "proceeds", "noi", "nob", "ncf", "cash_flow", "income", "price", "revenue",
+    "expense", "expenditure", "cost", "reserve", "rent", "tax", "insurance", "reimbursement", "concession",
+    "vacancy", "loss", "ti_lc", "tilc", "fee", "total",
+)
+RATIO_KEYS = (
+    "percent", "pct", "per_", "ratio", "dscr", "ltv", "yield", "rate", "occupancy",
+    "sf", "sq_ft", "sqft", "gla", "nra", "rentable", "area", "size", "units",
+    "months", "year", "leases", "number", "num_", "no_of", "market",
+)
+CURRENCY_RE = re.compile(r"^(\(?\s*-?\s*\$\s*)(\d[\d,]*(?:\.(\d+))?)(\s*\)?)$")
+RATE_KEYS = ("mortgage_rate", "interest_rate", "interest_rate_percent")
+STATES = ["NY", "CA", "TX", "FL", "IL", "GA", "VA", "NJ", "MA", "WA", "AZ", "CO", "NC", "PA", "OH"]
+PURPOSES = ["Acquisition", "Refinance", "Recapitalization"]
+LOANS_PER_DEAL = 40
+
+def money_path(path):
+    # True / False from the nearest deciding key, None when no key decides.
+    # Anything under an occupancy block is a percentage, whatever its key.
+    if any("occupancy" in str(key).lower() for key in path):
+        return False
+    for key in reversed(path):
+        key = str(key).lower()
+        if any(r in key for r in RATIO_KEYS):
+            return False
+        if any(m in key for m in MONEY_KEYS):
+            return True
+    return None
+
+def scale_currency(text, factor):
+    match = CURRENCY_RE.match(text.strip())
+    if not match:
+        return text
+    prefix, number, cents, suffix = match.groups()
+    decimals = len(cents) if cents else 0
+    return f"{prefix}{float(number.replace(',', '')) * factor:,.{decimals}f}{suffix}"
+
+def scale_money(node, factor, path=()):
+    if isinstance(node, dict):
+        return {k: scale_money(v, factor, path + (k,)) for k, v in node.items()}
+    if isinstance(node, list):
+        return [scale_money(v, factor, path) for v in node]
+    if isinstance(node, (int, float)) and not isinstance(node, bool) and money_path(path):
+        scaled = node * factor
+        return int(round(scaled)) if isinstance(node, int) else round(scaled, 2)
+    if isinstance(node, str) and money_path(path) is not False:
+        return scale_currency(node, factor)
+    return node
+
+def shift_rate(value, shift):
+    # 3.2678 or "2.786025%" moved by `shift` points; anything else unchanged.
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(value + shift, 4)
+    if isinstance(value, str) and re.fullmatch(r"\s*\d+(?:\.\d+)?\s*%\s*", value):
+        return f"{float(value.strip().rstrip('%')) + shift:.4f}%"
+    return value
+
+def synthetic_loan(template, loan_id, rng):
+    # A template loan under a new id with its dollar amounts scaled, rate,
+    # purpose and state varied, so filters, sorts and rankings see a spread.
+    # Rate and purpose are varied wherever the template keeps them: at the
+    # top level or under mortgage_loan_information.
+    loan = scale_money(copy.deepcopy(template), rng.uniform(0.25, 4.0))
+    loan["loan_id"] = loan_id
+    loan.pop("file_name", None)
+    shift, purpose = rng.uniform(-1.0, 2.5), rng.choice(PURPOSES)
+    for section in (loan, loan.get("mortgage_loan_information")):
+        if not isinstance(section, dict):
+            continue
+        for key in RATE_KEYS:
+            if section.get(key) is not None:
+                section[key] = shift_rate(section[key], shift)
+        if "loan_purpose" in section:
+            section["loan_purpose"] = purpose
+    info = loan.get("mortgaged_property_info")
+    if isinstance(info, dict) and isinstance(info.get("location"), str):
+        city = info["location"].split(",")[0]
+        info["location"] = f"{city}, {rng.choice(STATES)}"
+    if isinstance(loan.get("borrower_sponsor"), str):
+        loan["borrower_sponsor"] = f"{loan['borrower_sponsor']} {rng.randint(1, 500)}"
+    return loan
+
+def generate(templates, out_dir, loans, seed=0, loans_per_deal=LOANS_PER_DEAL):
+    # Writes `loans` synthetic loans as deal files (deal-0000.json, ...) in
+    # `out_dir`, in the directory layout Dataset reads. The same templates
+    # and seed always give the same corpus.
+    rng = random.Random(seed)
+    ids = sorted(templates)
+    os.makedirs(out_dir, exist_ok=True)
+    for deal, start in enumerate(range(0, loans, loans_per_deal)):
+        deal_loans = {}
+        for i in range(start, min(start + loans_per_deal, loans)):
+            loan_id = f"syn{deal:04d}-{i:06d}"
+            deal_loans[loan_id] = synthetic_loan(templates[ids[i % len(ids)]], loan_id, rng)
+        with open(os.path.join(out_dir, f"deal-{deal:04d}.json"), "w", encoding="utf-8") as f:
+            json.dump(deal_loans, f)
+    return out_dir
+
+def read_templates(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic loan corpus built from the sample loans.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--loans", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--templates", default=os.path.join("data", "master_combined_loans.json"))
+    args = parser.parse_args()
+    generate(read_templates(args.templates), args.out_dir, args.loans, args.seed)
+    print(f"{args.loans} loans written to {args.out_dir}")
@@ -0,0 +1,161 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ratings import build_rating_table
+from ingest import (
+    build_sources_uses, check_sources_uses, build_escrows,
+    build_occupancy_history, build_occupancy_panel, occupancy_changes, occupancy_trend,
+    build_financials, build_loan_terms, build_rollover
+)
+from exposure import build_exposure
+from prepayment import build_call_protection, call_protection_texts
+from comps import build_comps, CompIndex, LEASE_FEATURES, SALES_FEATURES
+
+# ------------------ Per-Loan Tables ------------------
+
+# Parsed straight from each loan's JSON, so a changed loan's rows can be
+# rebuilt on their own and spliced into the existing table.
+LOAN_TABLES = [
+    "ratings", "sources_uses", "escrows", "lease_comps", "sales_comps",
+    "occupancy_history", "financials", "loan_terms", "rollover", "call_protection_texts",
+]
+# Tables the builder sorts by loan_id rather than keeping file order.
+SORTED_TABLES = {"ratings"}
+# Loans unpacked at a time (packed datasets), so a full parse never holds
+# the whole book as JSON trees.
+PARSE_CHUNK = 1000
+
+def parse_tables(raw_data, manual_ratings):
+    loan_ids = list(raw_data)
+    parts = [
+        parse_chunk({i: raw_data[i] for i in loan_ids[start:start + PARSE_CHUNK]}, manual_ratings)
+        for start in range(0, max(len(loan_ids), 1), PARSE_CHUNK)
+    ]
+    if len(parts) == 1:
+        return parts[0]
+    tables = {}
+    for name in parts[0]:
+        frames = [part[name] for part in parts if len(part[name])] or [parts[0][name]]
+        table = pd.concat(frames) if len(frames) > 1 else frames[0]
+        if name in SORTED_TABLES:
+            table = table.sort_index(kind="stable")
+        elif table.index.name != "loan_id":
+            table = table.reset_index(drop=True)
+        tables[name] = table
+    return tables
+
+def parse_chunk(raw_data, manual_ratings):
+    tables = {}
+
+    # Numeric notch per agency plus composite for every rated tenant and loan.
+    tables["ratings"] = build_rating_table(raw_data, manual_ratings)
+
+    # Sources & uses line items for every loan.
+    tables["sources_uses"] = build_sources_uses(raw_data)
+
+    # One row per loan and reserve type with initial/monthly/cap and springing flag.
+    tables["escrows"] = build_escrows(raw_data)
+
+    # Lease and sales comps from every comp layout.
+    tables["lease_comps"], tables["sales_comps"] = build_comps(raw_data)
+
+    # Dated occupancy observations per loan.
+    tables["occupancy_history"] = build_occupancy_history(raw_data)
+
+    # Per-loan balance, whole-loan balance, UW NOI/NCF and appraised value.
+    tables["financials"] = build_financials(raw_data)
+
+    # Rate, balance, term/amortization/IO months and payment dates per loan.
+    tables["loan_terms"] = build_loan_terms(raw_data)
+
+    # Loans x years rollover rows.
+    tables["rollover"] = build_rollover(raw_data)
+
+    # Raw call protection strings, parsed into the month grid once derived.
+    tables["call_protection_texts"] = call_protection_texts(raw_data).to_frame()
+    return tables
+
+def splice(table, fresh, drop, loan_ids, sort=False):
+    # Drops the rows of `drop` loans, appends the re-parsed rows and restores
+    # the builder's loan order.
+    keyed_by_index = table.index.name == "loan_id"
+    ids = table.index if keyed_by_index else table["loan_id"]
+    parts = [table[~np.asarray(ids.isin(drop))]]
+    if fresh is not None and len(fresh):
+        parts.append(fresh)
+    table = pd.concat(parts) if len(parts) > 1 else parts[0]
+    if sort:
+        return table.sort_index(kind="stable")
+    ids = table.index if keyed_by_index else table["loan_id"]
+    order = np.argsort(pd.Index(loan_ids).get_indexer(ids), kind="stable")
+    table = table.iloc[order]
+    return table if keyed_by_index else table.reset_index(drop=True)
+
+# ------------------ Derived Tables ------------------
+
+def derive_tables(tables, raw_data):
+    # Cross-loan tables recomputed from the per-loan ones; all vectorized, so
+    # this stays cheap next to parsing.
+    tables = dict(tables)
+    loan_ids = list(raw_data)
+
+    # Sources & uses reconciled in one pass.
+    tables["sources_uses_checks"] = check_sources_uses(tables["sources_uses"])
+
+    # Comps indexed by property type and by nearest neighbor on size/date/rent
+    # (or price).
+    tables["lease_comp_index"] = CompIndex(tables["lease_comps"], LEASE_FEATURES)
+    tables["sales_comp_index"] = CompIndex(tables["sales_comps"], SALES_FEATURES)
+
+    # Loan x year occupancy panel (NaN for NAV) with its year-over-year deltas.
+    tables["occupancy_panel"] = build_occupancy_panel(tables["occupancy_history"], loan_ids)
+    tables["occupancy_changes"] = occupancy_changes(tables["occupancy_panel"])
+    tables["occupancy_trend"] = occupancy_trend(tables["occupancy_panel"])
+
+    # Call protection parsed into a loans x months lockout/YM/defeasance/open grid.
+    tables["call_protection"] = build_call_protection(tables["call_protection_texts"]["text"], tables["loan_terms"])
+
+    # Tenants x loans rent share, concentration and rollover-in-term exposure.
+    tables["exposure"] = build_exposure(tables["rollover"], tables["ratings"], tables["loan_terms"], tables["financials"])
+    return tables
+
+# ------------------ Table Store ------------------
+
+class TableStore:
+    # Tables for the latest dataset version. A newer version re-parses only
+    # the loans touched since, then recomputes the derived tables. The
+    # version it replaced is kept too (or an older one, parsed once on first
+    # request), so reruns still on an older snapshot don't re-parse the book.
+
+    def __init__(self, manual_ratings):
+        self.lock = threading.Lock()
+        self.manual_ratings = manual_ratings
+        self.version = None
+        self.tables = None
+        self.previous = (None, None)
+
+    def get(self, dataset, version, raw_data):
+        with self.lock:
+            if version == self.version:
+                return self.tables
+            if version == self.previous[0]:
+                return self.previous[1]
+            if self.tables is None or version < self.version:
+                parsed = parse_tables(raw_data, self.manual_ratings)
+            else:
+                touched = dataset.touched(self.version)
+                changed = {i: raw_data[i] for i in touched if i in raw_data}
+                fresh = parse_tables(changed, self.manual_ratings) if changed else {}
+                parsed = {
+                    name: splice(self.tables[name], fresh.get(name), touched, list(raw_data), name in SORTED_TABLES)
+                    for name in LOAN_TABLES
+                }
+            tables = derive_tables(parsed, raw_data)
+            if self.version is None or version > self.version:
+                self.previous = (self.version, self.tables)
+                self.version, self.tables = version, tables
+            else:
+                self.previous = (version, tables)
+            return tables
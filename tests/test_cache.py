@@ -0,0 +1,42 @@
+import numpy as np
+
+from cache import SharedCache, size_of
+
+def array(n):
+    return np.zeros(n, dtype=np.uint8)
+
+def test_get_builds_once_and_counts_hits():
+    cache = SharedCache(budget_bytes=10_000)
+    calls = []
+    build = lambda: calls.append(1) or array(100)
+    first = cache.get(("summary", 1), build)
+    assert cache.get(("summary", 1), build) is first
+    assert len(calls) == 1
+    kinds = {row["kind"]: row for row in cache.stats()["kinds"]}
+    assert kinds["summary"]["hits"] == 1 and kinds["summary"]["misses"] == 1
+
+def test_least_recently_used_is_evicted_within_budget():
+    item = size_of(array(1000))
+    cache = SharedCache(budget_bytes=2 * item)
+    cache.put(("a", 1), array(1000))
+    cache.put(("b", 1), array(1000))
+    cache.get(("a", 1), lambda: None)
+    cache.put(("c", 1), array(1000))
+    assert set(cache.entries) == {("a", 1), ("c", 1)}
+    stats = cache.stats()
+    assert stats["bytes"] <= stats["budget"]
+    assert {row["kind"]: row for row in stats["kinds"]}["b"]["evictions"] == 1
+
+def test_oversized_values_are_returned_but_not_kept():
+    cache = SharedCache(budget_bytes=100)
+    value = cache.get(("big", 1), lambda: array(1000))
+    assert len(value) == 1000
+    assert cache.stats()["entries"] == 0 and cache.bytes == 0
+
+def test_discard_drops_matching_keys():
+    cache = SharedCache(budget_bytes=10_000)
+    cache.put(("summary", 1), array(10))
+    cache.put(("summary", 2), array(10))
+    cache.discard(lambda key: key[1] < 2)
+    assert list(cache.entries) == [("summary", 2)]
+    assert cache.bytes == cache.sizes[("summary", 2)]
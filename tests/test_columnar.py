@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+
+from columnar import ColumnarStore, ColumnarWriter
+from tables import parse_tables
+
+RAW = {loan_id: {"cut_off_date_balance": 10.0} for loan_id in ["a", "b", "c"]}
+
+def summary(rate_c=4.0):
+    return pd.DataFrame({
+        "loan_id": ["a", "b", "c"],
+        "deal": ["D1", "D1", "D2"],
+        "issuer": ["X", "Y", "X"],
+        "balance": [10.0, 20.0, 30.0],
+        "interest_rate": [5.0, 3.0, rate_c],
+    })
+
+def display(rates):
+    calls = []
+    def rows(loan_ids):
+        calls.append(list(loan_ids))
+        return pd.DataFrame({"Loan ID": loan_ids, "Interest Rate": [f"{rates[i]:.2f}%" for i in loan_ids]})
+    return rows, calls
+
+def test_display_rows_follow_partial_writes(tmp_path):
+    root = str(tmp_path / "pq")
+    tables = parse_tables(RAW, {})
+    writer = ColumnarWriter(root, "deal")
+    rows, calls = display({"a": 5.0, "b": 3.0, "c": 4.0})
+    writer.write(summary(), tables, 1, display=rows)
+    assert sorted(calls) == [["a", "b"], ["c"]]
+
+    rows, calls = display({"c": 6.0})
+    writer.write(summary(rate_c=6.0), tables, 2, ["c"], display=rows)
+    assert calls == [["c"]]
+    assert sorted(os.listdir(root)) == ["v1", "v2"]
+
+    view = ColumnarStore(root, "deal").at(2)
+    ids = view.loans({}, "interest_rate", descending=True)["loan_id"].tolist()
+    assert ids == ["c", "a", "b"]
+    assert view.display(ids)["Interest Rate"].tolist() == ["6.00%", "5.00%", "3.00%"]
+    assert view.stats({"issuer": ["X"]}, metrics=[("interest_rate", "Coupon")])["Coupon"] == 5.75
+    assert ColumnarStore(root, "deal").at(1).display(["c"])["Interest Rate"].tolist() == ["4.00%"]
@@ -0,0 +1,35 @@
+from compact import COLUMNS, Compactor, LoanMap, to_columns
+
+LOANS = {
+    "a": {
+        "file_name": "a.json",
+        "property_name": "Tower",
+        "tenants": [{"name": "X", "sf": 100}, {"name": "Y", "sf": 200}],
+        "reserves": {"taxes": {"monthly": "Springing"}},
+    },
+    "b": {"property_name": "Plaza", "tenants": [{"name": "Z", "sf": None}], "notes": [1, "NAV", {"k": []}]},
+}
+
+def test_round_trip_drops_only_provenance_keys():
+    compactor = Compactor(LOANS.values())
+    for loan in LOANS.values():
+        expected = {k: v for k, v in loan.items() if k != "file_name"}
+        assert compactor.unpack(compactor.pack(loan)) == expected
+
+def test_tables_are_stored_as_columns():
+    packed = to_columns(LOANS["a"]["tenants"])
+    assert packed == {COLUMNS: [["name", "sf"], ["X", "Y"], [100, 200]]}
+    # Rows with differing keys stay a plain list.
+    assert to_columns([{"a": 1}, {"b": 2}]) == [{"a": 1}, {"b": 2}]
+
+def test_round_trip_without_dictionary():
+    compactor = Compactor()
+    assert compactor.dictionary == b""
+    assert compactor.unpack(compactor.pack(LOANS["b"])) == LOANS["b"]
+
+def test_loan_map_unpacks_on_access():
+    compactor = Compactor(LOANS.values())
+    loans = LoanMap({k: compactor.pack(v) for k, v in LOANS.items()}, compactor)
+    assert len(loans) == 2 and list(loans) == ["a", "b"] and "a" in loans
+    assert loans["b"] == LOANS["b"]
+    assert loans["a"] is not loans["a"]
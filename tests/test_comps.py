@@ -0,0 +1,36 @@
+import numpy as np
+
+from comps import LEASE_FEATURES, SALES_FEATURES, CompIndex, build_comps
+
+def lease(size, rent, date="2023-01-01"):
+    return {"tenant_name": "T", "tenant_size": size, "base_rent_psf": f"${rent:.2f}", "lease_start_date": date}
+
+RAW = {
+    "a": {
+        "comparable_office_leases": [lease(10_000, 50.0), lease(20_000, 60.0)],
+        "sales_comparables": {
+            "subject_property": {"property": "Subject", "sales_price": "$100,000,000", "total_building_area_sf": 200_000},
+            "comparable_properties": [{"property": "Comp", "sales_price": 90_000_000, "total_building_area_sf": 180_000}],
+        },
+    },
+    "b": {"comparable_office_leases": {"leases": [lease(10_500, 51.0)]}},
+}
+
+def test_build_comps_reads_each_layout():
+    leases, sales = build_comps(RAW)
+    assert leases.groupby("loan_id").size().to_dict() == {"a": 2, "b": 1}
+    assert (leases["property_type"] == "office").all()
+    assert leases["rent_psf"].tolist() == [50.0, 60.0, 51.0]
+    assert sales["is_subject"].tolist() == [True, False]
+    assert sales["price"].tolist() == [100_000_000, 90_000_000]
+    assert len(CompIndex(sales, SALES_FEATURES).table) == 2
+
+def test_query_leaves_out_the_subject_loan():
+    leases, _ = build_comps(RAW)
+    index = CompIndex(leases, LEASE_FEATURES)
+    point = {"size_sf": 10_000, "rent_psf": 50.0, "date": "2023-01-01"}
+    assert index.query(point, k=1)["loan_id"].tolist() == ["a"]
+    result = index.query(point, k=3, property_type="office", loan_id="a")
+    assert result["loan_id"].tolist() == ["b"]
+    assert np.isfinite(result["distance"]).all()
+    assert index.query(point, property_type="retail").empty
@@ -0,0 +1,55 @@
+import json
+import os
+
+from dataset import Dataset
+
+def write(path, loans):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(loans, f)
+
+def bump(path):
+    # Same-second rewrites can keep the mtime; move it so the scan sees them.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_refresh_tracks_touched_loans(tmp_path):
+    write(tmp_path / "deal1.json", {"a": {"rate": 1}, "b": {"rate": 2}})
+    write(tmp_path / "single.json", {"loan_id": "c", "rate": 3})
+    dataset = Dataset(str(tmp_path))
+    version, loans = dataset.snapshot()
+    assert version == 1 and sorted(loans) == ["a", "b", "c"]
+    assert dict(loans["a"]) == {"rate": 1}
+    assert dataset.refresh() == 0
+
+    write(tmp_path / "deal1.json", {"a": {"rate": 1}, "b": {"rate": 5}})
+    bump(tmp_path / "deal1.json")
+    os.remove(tmp_path / "single.json")
+    assert dataset.refresh() == 2
+    version, loans = dataset.snapshot()
+    assert version == 2 and loans["b"] == {"rate": 5} and "c" not in loans
+    assert sorted(dataset.touched(1)) == ["b", "c"]
+    assert dataset.touched(2) == []
+
+def test_malformed_file_keeps_previous_loans(tmp_path):
+    write(tmp_path / "deal.json", {"a": {"rate": 1}})
+    dataset = Dataset(str(tmp_path), compact=False)
+    (tmp_path / "deal.json").write_text("{", encoding="utf-8")
+    bump(tmp_path / "deal.json")
+    assert dataset.refresh() == 0
+    assert dataset.snapshot()[1] == {"a": {"rate": 1}}
+
+def test_sync_applies_changes_once(tmp_path):
+    write(tmp_path / "deal.json", {"a": {"rate": 1}, "b": {"rate": 2}})
+    dataset = Dataset(str(tmp_path))
+    engine = type("Engine", (), {})()
+    dataset.track(engine, 1)
+
+    write(tmp_path / "deal.json", {"a": {"rate": 9}})
+    bump(tmp_path / "deal.json")
+    dataset.refresh()
+    version, loans = dataset.snapshot()
+    calls = []
+    apply = lambda changed, removed: calls.append((changed, removed))
+    dataset.sync(engine, version, loans, apply)
+    dataset.sync(engine, version, loans, apply)
+    assert calls == [(["a"], ["b"])]
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from ingest import (
+    build_escrows, build_financials, build_loan_terms, build_occupancy_history, build_occupancy_panel,
+    build_rollover, build_sources_uses, check_sources_uses, occupancy_trend, to_date,
+)
+
+def sources_uses(sources, uses, total_sources=None):
+    block = {
+        "sources": {name: {"amount": amount} for name, amount in sources.items()},
+        "uses": {name: {"amount": amount} for name, amount in uses.items()},
+    }
+    if total_sources is not None:
+        block["total_sources"] = total_sources
+    return {"sources_and_uses": block}
+
+def test_unrounded_imbalance_is_flagged():
+    raw = {"n1967": sources_uses({"loan": 48_900_000, "equity": 28_991_897}, {"purchase": 77_887_897})}
+    checks = check_sources_uses(build_sources_uses(raw))
+    assert not checks.loc["n1967", "balanced"]
+    assert not checks.loc["n1967", "ok"]
+
+def test_thousands_rounding_is_tolerated():
+    raw = {"a": sources_uses(
+        {"loan": "$250,000,000", "equity": "$150,000,000"},
+        {"purchase": "$399,999,000", "costs": "$2,000"},
+        total_sources="$400,000,000",
+    )}
+    checks = check_sources_uses(build_sources_uses(raw))
+    assert checks.loc["a", "balanced"] and checks.loc["a", "sources_match_reported"]
+
+def test_exact_match_passes():
+    raw = {"a": sources_uses({"loan": 100.0}, {"payoff": 60.0, "costs": 40.0}, total_sources=100.0)}
+    assert check_sources_uses(build_sources_uses(raw)).loc["a", "ok"]
+    assert not np.isnan(check_sources_uses(build_sources_uses(raw)).loc["a", "total_uses"])
+
+def test_to_date_formats():
+    cases = {
+        "2031-01-01": "2031-01-01",
+        "1/6/2031": "2031-01-06",
+        "January 6, 2030": "2030-01-06",
+        "May 31 2030": "2030-05-31",
+        "Jan 6,2030": "2030-01-06",
+        "Aug-19": "2019-08-01",
+        "Dec. 2021": "2021-12-01",
+    }
+    for text, expected in cases.items():
+        assert to_date(text) == np.datetime64(expected), text
+    assert np.isnat(to_date("n/a"))
+
+def test_senior_balance_excludes_subordinate_notes():
+    notes = [
+        {"note": "Note A-1", "cut_off_date_balance": 75_000_000},
+        {"note": "Note A-2, Note A-3", "cut_off_date_balance": 66_000_000},
+        {"note": "Total Senior Notes", "cut_off_date_balance": 141_000_000},
+        {"note": "Note B", "cut_off_date_balance": 22_470_000},
+    ]
+    raw = {
+        "split": {"whole_loan_summary": {"notes": notes, "whole_loan": {"cut_off_date_balance": 163_470_000}}},
+        "single": {"cut_off_date_balance": 10_000_000},
+    }
+    financials = build_financials(raw)
+    assert financials.loc["split", "senior_balance"] == 141_000_000
+    assert financials.loc["single", "senior_balance"] == financials.loc["single", "whole_loan_balance"] == 10_000_000
+
+def test_escrows_normalize_reserve_types():
+    raw = {
+        "a": {"escrows_and_reserves": {
+            "RE Tax": {"initial": "$100,000", "monthly": "$10,000"},
+            "Insurance": {"initial": "Springing", "monthly": "Springing"},
+            "Replacement Reserves": {"upfront": 0, "monthly": "$2,500", "cap": "$60,000"},
+        }},
+        "b": {"reserves": [{"type": "TI/LC", "initial": "$1,000,000"}]},
+    }
+    escrows = build_escrows(raw).set_index(["loan_id", "reserve_type"])
+    assert escrows.loc[("a", "taxes"), "monthly"] == 10_000
+    assert escrows.loc[("a", "insurance"), "springing"]
+    assert np.isnan(escrows.loc[("a", "insurance"), "initial"])
+    assert escrows.loc[("a", "replacement_reserves"), "cap"] == 60_000
+    assert escrows.loc[("b", "ti_lc"), "initial"] == 1_000_000
+
+def test_occupancy_history_and_panel():
+    raw = {
+        "a": {
+            "historical_occupancy": {"2021": "90.0%", "2022": "92.5%", "current": "95.0%"},
+            "mortgaged_property_information": {"occupancy_date": "6/30/2023", "occupancy_percent": "95.0%"},
+        },
+        "b": {"occupancy_history": [{"date": "12/31/2022", "percent": "NAV"}, {"date": "2023-06-30", "occupancy": "88%"}]},
+    }
+    history = build_occupancy_history(raw)
+    # The current figure appears twice but is kept once.
+    assert history.groupby("loan_id").size().to_dict() == {"a": 3, "b": 2}
+    panel = build_occupancy_panel(history, ["a", "b", "c"])
+    assert panel.columns.tolist() == [2021, 2022, 2023]
+    assert panel.loc["a"].tolist() == [90.0, 92.5, 95.0]
+    assert panel.loc["c"].isna().all()
+    trend = occupancy_trend(panel)
+    assert trend.loc[2023, "occupancy"] == 91.5 and trend.loc[2023, "loans"] == 2
+
+def test_loan_terms_fill_missing_pieces():
+    raw = {
+        "io": {
+            "mortgage_rate": "5.50%", "original_principal_balance": "$50,000,000",
+            "loan_amortization_type": "Interest Only", "maturity_date": "1/6/2034", "first_payment_date": "2/6/2024",
+        },
+        "amort": {"mortgage_loan_information": {
+            "interest_rate": "6%", "original_term_months": "10 years",
+            "original_amortization_term_months": "360", "maturity_date": "2034-03-01",
+        }},
+    }
+    terms = build_loan_terms(raw)
+    assert terms.loc["io", "term_months"] == 120 and terms.loc["io", "io_months"] == 120
+    assert terms.loc["amort", "io_months"] == 0 and terms.loc["amort", "amortization_months"] == 360
+    assert terms.loc["amort", "first_payment"] == pd.Timestamp("2024-04-01")
+
+def test_rollover_buckets_and_cumulative_columns():
+    raw = {
+        "a": {"lease_rollover_schedule": {"schedule": [
+            {"year": "MTM", "percent_of_total_uw_base_rent": "1.0%", "annual_uw_base_rent": "$10"},
+            {"year": "2025", "percent_of_total_uw_base_rent": "20.0%", "annual_uw_base_rent": "$200"},
+            {"year": "Vacant"},
+            {"year": "2035 & Thereafter", "percent_of_total_uw_base_rent": "79.0%", "annual_uw_base_rent": "$790"},
+            {"year": "Total", "percent_of_total_uw_base_rent": "100%"},
+        ]}},
+        "b": {"lease_expiration_schedule": {"schedule": [
+            {"year": "2024", "cumulative_percent_base_rent_expiring": "10%"},
+            {"year": "2025", "cumulative_percent_base_rent_expiring": "35%"},
+        ]}},
+    }
+    rollover = build_rollover(raw)
+    a = rollover[rollover["loan_id"] == "a"]
+    assert a["label"].tolist() == ["MTM", "2025", "2035 & Thereafter"]
+    assert a["mtm"].tolist() == [True, False, False] and a["thereafter"].tolist() == [False, False, True]
+    assert np.isnan(a["year"].iloc[0]) and a["rent"].sum() == 1000.0
+    assert rollover[rollover["loan_id"] == "b"]["rent_pct"].tolist() == [10.0, 25.0]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from maturity import MaturityWall
+
+def summary():
+    return pd.DataFrame({
+        "loan_id": ["a", "b", "c", "d"],
+        "property_type": ["Office", "Retail", "Office", None],
+        "balance": [100.0, 200.0, 300.0, 400.0],
+        "maturity_date": pd.to_datetime(["2030-01-15", "2030-11-01", "2032-05-01", None]),
+    })
+
+def test_buckets_sum_balances_and_fill_gaps():
+    wall = MaturityWall(summary()).buckets("Year")
+    assert wall.index.tolist() == ["2030", "2031", "2032"]
+    assert wall["Cut-off Balance"].tolist() == [300.0, 0.0, 300.0]
+    quarters = MaturityWall(summary()).buckets("Quarter")
+    assert quarters.loc["2030Q4", "Cut-off Balance"] == 200.0
+
+def test_cut_off_balance_overrides_original():
+    financials = pd.DataFrame({"balance": [90.0, np.nan]}, index=pd.Index(["a", "b"], name="loan_id"))
+    wall = MaturityWall(summary(), financials).buckets("Year", breakdown="property_type")
+    assert wall.loc["2030", "Office"] == 90.0 and wall.loc["2030", "Retail"] == 200.0
+
+def test_filtered_views_are_cached_and_bounded():
+    wall = MaturityWall(summary(), max_views=2)
+    mask = np.array([True, False, True, True])
+    first = wall.buckets("Year", mask=mask, key="office")
+    assert wall.buckets("Year", mask=mask, key="office") is first
+    assert first["Cut-off Balance"].sum() == 400.0
+    # Unkeyed filtered views are never cached.
+    wall.buckets("Month", mask=mask)
+    wall.buckets("Year")
+    wall.buckets("Quarter")
+    assert len(wall.views) == 2 and ("Year", None, "office") not in wall.views
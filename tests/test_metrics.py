@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from metrics import build_metrics, build_reported_metrics, compute_metrics, reported_value, REPORTED_PATHS
+from schedule import Schedules
+
+LOANS = pd.Index(["a"], name="loan_id")
+
+def test_compute_metrics_uses_senior_balance_for_debt_yield():
+    metrics = compute_metrics(
+        noi=np.array([12.0]), ncf=np.array([10.0]), debt_service=np.array([5.0]),
+        senior_balance=np.array([100.0]), balance=np.array([120.0]),
+        value=np.array([200.0]), maturity_balance=np.array([90.0]),
+    )
+    assert metrics["dscr_noi"][0] == 2.4 and metrics["dscr_ncf"][0] == 2.0
+    assert metrics["debt_yield_noi"][0] == 12.0 and metrics["debt_yield_ncf"][0] == 10.0
+    assert metrics["ltv"][0] == 60.0 and metrics["maturity_ltv"][0] == 45.0
+
+def test_reported_pairs_and_nested_values():
+    data = {
+        "underwriting_financial_info": {"uw_dscr_based_on_noi_ncf": "2.10x / 1.95x"},
+        "financial_information": {"uw_noi_debt_yield_percent": {"senior_notes": "11.0%", "whole_loan": "9.0%"}},
+    }
+    assert reported_value(data, REPORTED_PATHS["dscr_noi"]) == 2.10
+    assert reported_value(data, REPORTED_PATHS["dscr_ncf"]) == 1.95
+    assert reported_value(data, REPORTED_PATHS["debt_yield_noi"]) == 11.0
+    assert np.isnan(reported_value({}, REPORTED_PATHS["debt_yield_ncf"]))
+
+def test_build_metrics_scales_the_note_to_the_whole_loan():
+    # A 50.0 interest-only note of a 100.0 whole loan with a 20.0 B-note.
+    terms = pd.DataFrame({
+        "rate": [6.0], "balance": [50.0], "term_months": [120.0], "amortization_months": [0.0],
+        "io_months": [120.0], "first_payment": pd.to_datetime(["2024-01-01"]),
+    }, index=LOANS)
+    financials = pd.DataFrame({
+        "noi": [12.0], "ncf": [11.0], "whole_loan_balance": [100.0],
+        "senior_balance": [80.0], "appraised_value": [200.0],
+    }, index=LOANS)
+    summary = pd.DataFrame({"loan_id": ["a"], "ltv": [50.0], "maturity_ltv": [50.0]})
+    raw = {"a": {"underwriting_financial_info": {
+        "uw_dscr_based_on_noi_ncf": "1.97x / 1.80x", "uw_debt_yield_based_on_noi_ncf": "15.0% / 13.75%",
+    }}}
+    table = build_metrics(build_reported_metrics(raw, summary), financials, terms, Schedules().build(terms))
+    debt_service = 100.0 * 0.06 * 365 / 360
+    assert table.loc["a", "dscr_noi_recomputed"] == pytest.approx(12.0 / debt_service)
+    assert table.loc["a", "debt_yield_noi_recomputed"] == pytest.approx(15.0)
+    assert table.loc["a", "maturity_ltv_recomputed"] == pytest.approx(50.0)
+    assert not table.loc["a", "flagged"]
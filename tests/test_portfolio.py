@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio import PortfolioStats, sort_order
+
+def summary():
+    return pd.DataFrame({
+        "loan_id": ["a", "b", "c"],
+        "property_type": ["Office", "Retail", "Office"],
+        "balance": [100.0, 300.0, 100.0],
+        "dscr": [2.0, 1.0, np.nan],
+        "debt_yield": [10.0, 8.0, 12.0],
+        "ltv": [50.0, 60.0, 70.0],
+        "maturity_ltv": [50.0, 60.0, 70.0],
+        "interest_rate": [5.0, 6.0, 7.0],
+        "occupancy": [90.0, 100.0, 80.0],
+    })
+
+def test_weighted_averages_skip_missing_values():
+    stats = PortfolioStats(summary()).compute({})
+    assert stats["Loans"] == 3 and stats["Balance"] == 500.0
+    assert stats["DSCR"] == pytest.approx((2.0 * 100 + 1.0 * 300) / 400)
+    assert stats["Coupon"] == pytest.approx((5.0 * 100 + 6.0 * 300 + 7.0 * 100) / 500)
+
+def test_update_and_remove_match_a_fresh_engine():
+    engine = PortfolioStats(summary())
+    office = {"property_type": ["Office"]}
+    engine.compute(office)
+    engine.update("b", {"property_type": "Office", "balance": 200.0, "dscr": 1.5})
+    engine.update("d", dict(summary().iloc[0].to_dict(), property_type="Office"))
+    engine.remove("a")
+
+    frame = summary().set_index("loan_id")
+    frame.loc["b", ["property_type", "balance", "dscr"]] = ["Office", 200.0, 1.5]
+    frame.loc["d"] = summary().iloc[0].drop("loan_id")
+    frame = frame.drop(index="a").reset_index()
+    assert engine.compute(office) == pytest.approx(PortfolioStats(frame).compute(office), nan_ok=True)
+    assert engine.mask(office, ["a", "b", "c", "d", "x"]).tolist() == [False, True, True, True, False]
+
+def test_filter_signatures_are_bounded():
+    engine = PortfolioStats(summary(), max_entries=2)
+    for value in ("Office", "Retail", "Hotel"):
+        engine.compute({"property_type": [value]})
+    assert len(engine.entries) == 2
+    assert (("property_type", ("Office",)),) not in engine.entries
+
+def test_sort_order_puts_missing_last():
+    assert sort_order(summary(), "dscr").tolist() == [1, 0, 2]
+    assert sort_order(summary(), "dscr", descending=True).tolist() == [0, 1, 2]
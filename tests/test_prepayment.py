@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from prepayment import (
+    build_call_protection, parse_call_protection, prepayment_costs,
+    DEFEASANCE, LOCKOUT, OPEN, YIELD_MAINTENANCE, YM_OR_DEFEASANCE,
+)
+from schedule import Schedules
+
+def test_ym_with_floor():
+    assert parse_call_protection("YM1(92)") == ((YIELD_MAINTENANCE, 92.0, 1.0),)
+
+def test_defeasance_or_ym():
+    assert parse_call_protection("D or YM1(78)") == ((YM_OR_DEFEASANCE, 78.0, 1.0),)
+
+def test_greater_of_ym_or_defeasance():
+    assert parse_call_protection("GRTR 0.5% or YM or D(89)") == ((YM_OR_DEFEASANCE, 89.0, 0.5),)
+
+def test_lockout_defeasance_open():
+    (lockout, defeasance, open_) = parse_call_protection("L(24),D(92),O(4)")
+    assert lockout[:2] == (LOCKOUT, 24.0) and np.isnan(lockout[2])
+    assert defeasance[:2] == (DEFEASANCE, 92.0) and np.isnan(defeasance[2])
+    assert open_[:2] == (OPEN, 4.0) and np.isnan(open_[2])
+
+def test_defeasance_never_negative():
+    # A 2% loan against a 10% curve: replacing its payments costs far less
+    # than the balance.
+    terms = pd.DataFrame({
+        "rate": [2.0],
+        "balance": [1_000_000.0],
+        "term_months": [120.0],
+        "amortization_months": [0.0],
+        "io_months": [120.0],
+        "first_payment": pd.to_datetime(["2021-01-01"]),
+    }, index=pd.Index(["a"], name="loan_id"))
+    protection = build_call_protection(pd.Series(["L(24),D(92),O(4)"], index=terms.index), terms)
+    costs = prepayment_costs(Schedules().build(terms), protection, {1: 10.0, 10: 10.0}, "2024-01-15")
+    assert costs.loc[0, "status"] == "Defeasance"
+    assert costs.loc[0, "defeasance"] == 0.0
+    assert costs.loc[0, "prepayment_cost"] == 0.0
@@ -0,0 +1,60 @@
+import numpy as np
+
+from ratings import (
+    NOT_RATED, SP_NOTCHES, below, build_rating_table, composite_notch, investment_grade, notch_label,
+    parse_rating, parse_rating_field,
+)
+
+def test_parse_rating_scales():
+    assert parse_rating("BBB-") == SP_NOTCHES["BBB-"]
+    assert parse_rating("Baa3") == SP_NOTCHES["BBB-"]
+    assert parse_rating("AA(sf)") == SP_NOTCHES["AA"]
+    assert parse_rating("BBB (high)") == SP_NOTCHES["BBB+"]
+    assert parse_rating("NR") == NOT_RATED
+    assert parse_rating(None) == NOT_RATED
+
+def test_parse_rating_field_layouts():
+    assert parse_rating_field({"S&P": "A", "Moody's": "A2"}) == {"sp": SP_NOTCHES["A"], "moodys": SP_NOTCHES["A"]}
+    assert parse_rating_field("Fitch: BBB / KBRA: A-") == {"fitch": SP_NOTCHES["BBB"], "kbra": SP_NOTCHES["A-"]}
+    assert parse_rating_field("A- / Baa1 / BBB") == {
+        "sp": SP_NOTCHES["A-"], "moodys": SP_NOTCHES["BBB+"], "fitch": SP_NOTCHES["BBB"],
+    }
+    # A Moody's symbol first means the string lists Moody's first.
+    assert parse_rating_field("Caa1/NR/B") == {
+        "moodys": SP_NOTCHES["CCC+"], "sp": NOT_RATED, "fitch": SP_NOTCHES["B"],
+    }
+    assert parse_rating_field("") == {}
+
+def test_composite_notch_rules():
+    a, bbb, bb = SP_NOTCHES["A"], SP_NOTCHES["BBB"], SP_NOTCHES["BB"]
+    notches = np.array([
+        [a, 0, 0],
+        [a, bb, 0],
+        [a, bbb, bb],
+        [0, 0, 0],
+    ])
+    assert composite_notch(notches).tolist() == [a, bb, bbb, NOT_RATED]
+    assert notch_label(bbb) == "BBB" and notch_label(NOT_RATED) == "NR"
+
+def test_rating_masks():
+    notches = np.array([SP_NOTCHES["BBB-"], SP_NOTCHES["BB+"], NOT_RATED])
+    assert investment_grade(notches).tolist() == [True, False, False]
+    assert below(notches, "BBB-").tolist() == [False, True, False]
+
+def test_build_rating_table_ranks_tenants_and_applies_manual_rating():
+    tenants = [
+        {"tenant": "Small", "percent_of_total_base_rent": "10%", "rating": "BBB"},
+        {"tenant": "Big", "percent_of_total_base_rent": "60%", "rating": "NR"},
+    ]
+    raw = {
+        "a": {"top_largest_tenants_by_ubr": {"tenants": tenants}, "credit_assessment": "AA / Aa2"},
+        "b": {},
+    }
+    table = build_rating_table(raw, manual_ratings={"a": "A"})
+    loan = table[table["kind"] == "loan"].loc["a"]
+    assert loan["composite"] == SP_NOTCHES["AA"]
+    tenant_rows = table[table["kind"] == "tenant"].loc["a"]
+    assert tenant_rows["tenant"].tolist() == ["Big", "Small"]
+    assert tenant_rows["rank"].tolist() == [1, 2]
+    assert tenant_rows["composite"].tolist() == [SP_NOTCHES["A"], SP_NOTCHES["BBB"]]
+    assert "b" not in table.index
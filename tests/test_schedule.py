@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from schedule import Schedules, annual_debt_service, loan_schedule
+
+def terms(rate=6.0, amortization=360.0, io=0.0, balance=1_000_000.0, index=("a",)):
+    n = len(index)
+    return pd.DataFrame({
+        "rate": [rate] * n,
+        "balance": [balance] * n,
+        "term_months": [120.0] * n,
+        "amortization_months": [amortization] * n,
+        "io_months": [io] * n,
+        "first_payment": pd.to_datetime(["2024-02-01"] * n),
+    }, index=pd.Index(list(index), name="loan_id"))
+
+def test_level_payment_amortization():
+    schedule = Schedules().build(terms())
+    r = 0.06 / 12
+    payment = 1_000_000 * r / (1 - (1 + r) ** -360)
+    np.testing.assert_allclose(schedule["debt_service"][0], payment)
+    np.testing.assert_allclose(schedule["principal"][0].sum() + schedule["balloon"][0], 1_000_000)
+    assert schedule["balance"][0, -1] == pytest.approx(schedule["balloon"][0])
+
+def test_interest_only_then_amortizing():
+    schedule = Schedules().build(terms(io=24.0))
+    assert (schedule["principal"][0, :24] == 0).all() and (schedule["principal"][0, 24:] > 0).all()
+    assert annual_debt_service(schedule, 1)[0] == pytest.approx(12 * 1_000_000 * 0.06 / 12)
+    frame = loan_schedule(schedule, "a")
+    assert len(frame) == 120
+    assert frame["payment_date"].iloc[12] == pd.Timestamp("2025-02-01")
+
+def test_zero_rate_and_full_interest_only():
+    schedule = Schedules().build(terms(rate=0.0, amortization=120.0))
+    np.testing.assert_allclose(schedule["debt_service"][0], 1_000_000 / 120)
+    assert schedule["balloon"][0] == 0.0
+    schedule = Schedules().build(terms(amortization=0.0, io=120.0))
+    assert schedule["balloon"][0] == 1_000_000
+
+def test_unchanged_terms_are_reused_and_stale_rows_pruned():
+    schedules = Schedules(max_stale=1)
+    first = schedules.build(terms(index=("a", "b")))
+    assert len(schedules.rows) == 1
+    schedules.build(terms(rate=5.0))
+    schedules.build(terms(rate=4.0))
+    assert len(schedules.rows) == 2
+    again = schedules.build(terms(rate=5.0))
+    assert len(schedules.rows) == 2
+    np.testing.assert_allclose(Schedules().build(terms(rate=5.0))["debt_service"], again["debt_service"])
+    assert first["loan_ids"].tolist() == ["a", "b"]
@@ -0,0 +1,36 @@
+from search import SearchIndex
+
+RAW = {
+    "a": {"borrower": "Acme Holdings", "tenants": [{"name": "Acme Foods"}, {"name": "Blue Bottle"}]},
+    "b": {"borrower": "Blue Sky Partners", "city": "Portland"},
+}
+
+def test_save_and_load_round_trip(tmp_path):
+    index = SearchIndex()
+    index.update(RAW)
+    path = tmp_path / "search.json"
+    index.save(str(path))
+    loaded = SearchIndex.load(str(path))
+    assert loaded.hashes == index.hashes
+    assert dict(loaded.postings) == dict(index.postings)
+    hits = loaded.search("blue")
+    assert set(hits["loan_id"]) == {"a", "b"}
+    assert ("tenants", 1, "name") in hits.set_index("loan_id").loc["a", "paths"]
+    assert loaded.update(RAW) == 0
+
+def test_malformed_file_gives_empty_index(tmp_path):
+    path = tmp_path / "search.json"
+    for text in ["", "{", '{"format": 1, "paths": [[{"x": 1}]], "hashes": {}, "loans": {}}', "\x80\x04K."]:
+        path.write_text(text)
+        assert SearchIndex.load(str(path)).hashes == {}
+
+def test_save_due_is_throttled(tmp_path):
+    path = str(tmp_path / "search.json")
+    index = SearchIndex()
+    assert not index.save_due(path)
+    index.update(RAW)
+    assert index.save_due(path, interval=60)
+    index.update({**RAW, "c": {"city": "Austin"}}, ["c"])
+    assert not index.save_due(path, interval=60)
+    assert index.save_due(path, interval=0)
+    assert "c" in SearchIndex.load(path).hashes
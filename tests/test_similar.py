@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from similar import LoanIndex
+
+def frame():
+    return pd.DataFrame({
+        "loan_id": ["a", "b", "c", "d"],
+        "property_type": ["Office", "Office", "Retail", "Office"],
+        "state": ["NY", "NY", "CA", "TX"],
+        "sqft": [100_000, 110_000, 5_000, 400_000],
+        "balance": [50e6, 55e6, 5e6, 200e6],
+        "dscr": [2.0, 2.1, 1.2, 1.5],
+        "debt_yield": [10.0, 10.5, 7.0, 8.0],
+        "ltv": [50.0, 52.0, 70.0, 60.0],
+        "occupancy": [95.0, 94.0, 80.0, 90.0],
+        "term_months": [120.0, 120.0, 60.0, 120.0],
+    })
+
+def test_query_excludes_the_loan_itself():
+    index = LoanIndex(frame())
+    result = index.query(loan_id="a", k=2)
+    assert result["loan_id"].tolist()[0] == "b"
+    assert "a" not in result["loan_id"].tolist()
+    assert (np.diff(result["distance"].to_numpy()) >= 0).all()
+
+def test_profile_ignores_missing_features():
+    index = LoanIndex(frame())
+    result = index.query(profile={"property_type": "Retail", "dscr": 1.2}, k=1)
+    assert result["loan_id"].tolist() == ["c"]
+
+def test_update_and_remove():
+    index = LoanIndex(frame())
+    row = frame().iloc[2].to_dict()
+    row.update(property_type="Hotel", state="FL")
+    index.update("e", row)
+    assert index.query(profile={"property_type": "Hotel"}, k=1)["loan_id"].tolist() == ["e"]
+    index.remove("e")
+    assert "e" not in index.query(profile={"property_type": "Hotel"}, k=5)["loan_id"].tolist()
+    index.update("a", dict(frame().iloc[3].to_dict(), loan_id="a"))
+    assert index.query(loan_id="d", k=1)["loan_id"].tolist() == ["a"]
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from portfolio import PortfolioStats
+from store import LoanStore, StoreWriter
+from tables import parse_tables
+
+RAW = {
+    "a": {"cut_off_date_balance": 10.0, "mortgage_rate": "5.0%"},
+    "b": {"cut_off_date_balance": 30.0, "mortgage_rate": "4.0%"},
+}
+
+def summary(dscr_b=2.0):
+    return pd.DataFrame({
+        "loan_id": ["a", "b"],
+        "issuer": ["X", "Y"],
+        "property_type": ["Office", "Retail"],
+        "balance": [10.0, 30.0],
+        "interest_rate": [5.0, 4.0],
+        "dscr": [1.5, dscr_b],
+        "debt_yield": [9.0, np.nan],
+        "ltv": [60.0, 50.0],
+        "maturity_ltv": [55.0, 50.0],
+        "occupancy": [90.0, 100.0],
+    })
+
+def test_stats_match_portfolio_stats(tmp_path):
+    path = str(tmp_path / "loans.db")
+    StoreWriter(path).write(summary(), parse_tables(RAW, {}), 1)
+    store = LoanStore(path)
+    for filters in [{}, {"issuer": ["Y"]}]:
+        sql, memory = store.stats(filters), PortfolioStats(summary()).compute(filters)
+        assert sql.keys() == memory.keys()
+        for label in sql:
+            np.testing.assert_allclose(sql[label], memory[label])
+
+def test_version_follows_incremental_writes(tmp_path):
+    path = str(tmp_path / "loans.db")
+    tables = parse_tables(RAW, {})
+    writer = StoreWriter(path)
+    writer.write(summary(), tables, 1)
+    store = LoanStore(path)
+    assert store.version() == 1
+    writer.write(summary(dscr_b=3.0), tables, 2, ["b"])
+    assert store.version() == 2
+    assert store.stats({"issuer": ["Y"]})["DSCR"] == 3.0
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from schedule import Schedules
+from stress import StressEngine, scenario_grid
+
+LOANS = pd.Index(["ok", "no_value", "no_noi"], name="loan_id")
+
+def loan_terms(balance=50.0, io_months=120):
+    return pd.DataFrame({
+        "rate": [5.0, 5.0, 5.0],
+        "balance": [balance] * 3,
+        "term_months": [120.0, 120.0, 120.0],
+        "amortization_months": [0.0, 0.0, 0.0],
+        "io_months": [float(io_months)] * 3,
+        "first_payment": pd.to_datetime(["2021-01-01"] * 3),
+    }, index=LOANS)
+
+def engine(terms=None, **kwargs):
+    summary = pd.DataFrame({
+        "loan_id": ["ok", "no_value", "no_noi"],
+        "interest_rate": [5.0, 5.0, 5.0],
+        "dscr": [2.0, 2.0, 2.0],
+        "occupancy": [95.0, 95.0, 95.0],
+    })
+    financials = pd.DataFrame({
+        "noi": [10.0, 10.0, np.nan],
+        "ncf": [9.0, 9.0, np.nan],
+        "whole_loan_balance": [50.0, 50.0, 50.0],
+        "senior_balance": [50.0, 50.0, 50.0],
+        "appraised_value": [100.0, np.nan, 100.0],
+    }, index=LOANS)
+    terms = loan_terms() if terms is None else terms
+    return StressEngine(summary, financials, terms, Schedules().build(terms), **kwargs)
+
+def test_missing_value_or_noi_never_breaches_ltv():
+    stress = engine()
+    result = stress.run(scenario_grid(noi_haircuts=(0.0, 0.5), cap_rate_shifts=(0.0, 0.02)))
+    assert np.isnan(result["ltv"][:, 1:]).all()
+    breached = stress.breaches(result, {"dscr": 0.0, "debt_yield": 0.0, "ltv": 60.0})
+    assert not breached[:, 1:].any()
+    summary = stress.breach_summary(result, {"dscr": 0.0, "debt_yield": 0.0, "ltv": 60.0})
+    assert (summary["loans_breaching"] <= 1).all()
+
+def test_wiped_out_value_breaches_ltv():
+    stress = engine()
+    result = stress.run(scenario_grid(noi_haircuts=(1.0,)))
+    assert np.isinf(result["ltv"][0, 0])
+    assert stress.breaches(result)[0, 0]
+
+def test_debt_service_comes_from_the_schedule():
+    # A 25.0 note of a 50.0 whole loan, interest-only at 5%: the note's
+    # Actual/360 year of interest doubled.
+    stress = engine(loan_terms(balance=25.0))
+    np.testing.assert_allclose(stress.inputs["debt_service"], 50.0 * 0.05 * 365 / 360)
+
+def test_debt_service_falls_back_to_interest_only():
+    terms = loan_terms()
+    terms.loc["no_noi", "rate"] = np.nan
+    stress = engine(terms)
+    assert stress.inputs["debt_service"][2] == 50.0 * 0.05
+
+def test_results_are_bounded():
+    stress = engine(max_results=2)
+    for haircut in (0.1, 0.2, 0.3):
+        stress.run(scenario_grid(noi_haircuts=(haircut,)))
+    assert len(stress.results) == 2
@@ -0,0 +1,126 @@
+import functools
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+# ------------------ Stage Timer ------------------
+
+# Reruns kept per stage for the rolling percentiles.
+WINDOW = 200
+# Stage names the dashboard reports, in pipeline order.
+STAGES = ["json_load", "find_nested", "tenant_ranking", "date_parsing", "formatting", "html"]
+
+log = logging.getLogger("cmbs.timing")
+
+def percentile(values, q):
+    # Nearest-rank percentile; None when nothing has been recorded.
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+class StageTimer:
+    # Per-stage wall time for the rerun on the current thread. A rerun opts in
+    # with begin(True); everywhere else a timed() function costs one
+    # thread-local lookup. Stage times are exclusive: a stage nested in
+    # another (date parsing inside formatting) is only counted once.
+    # Finished reruns feed a rolling window shared by every session; work on
+    # other threads (the dataset watcher) is not timed.
+
+    def __init__(self, window=WINDOW):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.history = defaultdict(lambda: deque(maxlen=window))
+
+    def begin(self, enabled):
+        # Payload bytes are counted on every rerun (they feed the metrics
+        # export); stage times only when enabled.
+        self.local.bytes = 0
+        if enabled:
+            self.local.run = defaultdict(lambda: [0.0, 0])
+            self.local.stack = []
+            self.local.started = time.perf_counter()
+        else:
+            self.local.run = None
+
+    def end(self, **context):
+        # Closes the rerun, adds it to the rolling window and logs it as one
+        # JSON line. Returns {stage: (seconds, calls)} plus the payload bytes.
+        run = getattr(self.local, "run", None)
+        if run is None:
+            return None
+        self.local.run = None
+        total = time.perf_counter() - self.local.started
+        stages = {name: tuple(entry) for name, entry in run.items()}
+        with self.lock:
+            for name, (seconds, _) in stages.items():
+                self.history[name].append(seconds)
+            self.history["rerun"].append(total)
+            self.history["markdown_bytes"].append(self.local.bytes)
+        result = {"rerun": total, "stages": stages, "markdown_bytes": self.local.bytes}
+        log.info(json.dumps({
+            "event": "rerun", **context, "rerun_ms": round(total * 1000, 3),
+            "markdown_bytes": self.local.bytes,
+            "stages": {name: {"ms": round(s * 1000, 3), "calls": c} for name, (s, c) in stages.items()},
+        }))
+        return result
+
+    def enter(self):
+        self.local.stack.append(0.0)
+        return time.perf_counter()
+
+    def leave(self, run, name, start):
+        elapsed = time.perf_counter() - start
+        stack = self.local.stack
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        entry = run[name]
+        entry[0] += elapsed - nested
+        entry[1] += 1
+
+    def timed(self, name):
+        def decorate(fn):
+            @functools.wraps(fn)
+            def timed_fn(*args, **kwargs):
+                run = getattr(self.local, "run", None)
+                if run is None:
+                    return fn(*args, **kwargs)
+                start = self.enter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.leave(run, name, start)
+            return timed_fn
+        return decorate
+
+    def payload(self, size):
+        self.local.bytes = getattr(self.local, "bytes", 0) + size
+
+    def payload_bytes(self):
+        return getattr(self.local, "bytes", 0)
+
+    def percentiles(self):
+        # Rolling p50/p95 per stage (seconds; bytes for markdown_bytes).
+        with self.lock:
+            history = {name: list(values) for name, values in self.history.items()}
+        return {
+            name: {"p50": percentile(values, 50), "p95": percentile(values, 95), "samples": len(values)}
+            for name, values in history.items()
+        }
+
+TIMER = StageTimer()
+
+def configure_log(path=None):
+    # One JSON object per line, to `path` or stderr. Safe to call every rerun.
+    with TIMER.lock:
+        if log.handlers:
+            return
+        handler = logging.FileHandler(path) if path else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False